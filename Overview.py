@@ -1,4 +1,11 @@
 import streamlit as st
+from bikes.models import preload
+from bikes.timing import end_page, start_page
+
+start_page("Overview")
+
+# Start loading the Simulator's model now so the first prediction doesn't wait for it
+preload()
 
 # Sidebar
 
@@ -19,4 +26,6 @@ st.markdown(
     itself, checking that data types were correct and that we fully understood how all normalized variables had been standardized. Then we moved on to exploration. Look 
      through the tabs on the left to learn more!
     """
-)
\ No newline at end of file
+)
+
+end_page()
@@ -0,0 +1,95 @@
+# Many sessions asking for one prediction each at the same time: every thread
+# calling model.predict on its own row, against the threads queueing their
+# rows for the shared micro-batcher (bikes/batcher.py). Rows are random
+# Simulator scenarios, so neither the prediction cache nor the lookup table
+# answers them.
+#
+#   python benchmarks/bench_batching.py [--model Model3] [--threads 1 8 32] [--max-wait-ms 0 5]
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.batcher import MicroBatcher
+from bikes.encoding import FEATURES
+from bikes.models import SIMULATOR_MODEL, get_model
+
+
+def random_rows(count, seed):
+    rng = np.random.default_rng(seed)
+    return [(rng.integers(1, 5), rng.integers(1, 13), rng.integers(0, 24), rng.integers(0, 7), rng.integers(0, 2),
+             rng.integers(1, 5), rng.random(), rng.random(), rng.random() * 0.8, rng.integers(1, 32))
+            for _ in range(count)]
+
+
+def run(threads, per_thread, predict):
+    """Run ``threads`` threads of ``per_thread`` back-to-back predictions; (requests/s, latencies in ms)."""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        rows = random_rows(per_thread, index)
+        barrier.wait()
+        mine = []
+        for row in rows:
+            start = time.perf_counter()
+            predict(tuple(float(value) for value in row))
+            mine.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(mine)
+
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return threads * per_thread / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-thread predictions against the micro-batcher.")
+    parser.add_argument("--model", default=SIMULATOR_MODEL)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=20, help="Predictions per thread.")
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[0, 5])
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    handle = get_model(args.model, wait=True)
+    columns = pd.Index(FEATURES)
+
+    def direct(row):
+        return float(handle.predict(pd.DataFrame([row], columns=columns))[0])
+
+    runs = [("per thread", direct, None)]
+    for wait in args.max_wait_ms:
+        batcher = MicroBatcher(f"bench-{wait}", args.max_batch, wait)
+        runs.append((f"batched, wait {wait:g} ms", lambda row, batcher=batcher: batcher.predict(handle, row), batcher))
+
+    print(f"{args.model}: {args.requests} predictions per thread")
+    print(f"{'threads':>7}  {'mode':<22} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'mean batch':>11}")
+    for threads in args.threads:
+        for label, predict, batcher in runs:
+            before = (batcher.requests, batcher.batches) if batcher else None
+            throughput, latencies = run(threads, args.requests, predict)
+            mean_batch = "-"
+            if batcher:
+                mean_batch = f"{(batcher.requests - before[0]) / max(1, batcher.batches - before[1]):.1f}"
+            cuts = statistics.quantiles(latencies, n=20)
+            p50, p95 = cuts[9], cuts[18]
+            print(f"{threads:>7}  {label:<22} {throughput:>8.0f} {p50:>9.1f} {p95:>9.1f} {mean_batch:>11}")
+
+
+if __name__ == "__main__":
+    main()
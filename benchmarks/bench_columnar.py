@@ -0,0 +1,66 @@
+# Compare loading the hourly data from CSV against the typed columnar files
+# written by bikes.columnar, for every column and for the five columns the
+# Type of User charts need. The data is replicated to see how each scales.
+#
+#   python benchmarks/bench_columnar.py [--repeat 3] [--scales 1 10 100]
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.data import HOURLY_CSV, load_csv
+from bikes.schema import COMPACT_DTYPES, HOURLY_DTYPES
+
+USER_COLUMNS = ['weekday', 'mnth', 'season', 'registered', 'casual']
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = func()
+        times.append(time.perf_counter() - start)
+    return min(times), frame.memory_usage(deep=True).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV against Parquet/Feather loading.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    hourly = load_csv(HOURLY_CSV, HOURLY_DTYPES)
+    dtypes = COMPACT_DTYPES['hourly']
+    print(f"{'rows':>10} {'reader':<22} {'file MB':>8} {'load (s)':>9} {'memory MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            data = pd.concat([hourly] * scale, ignore_index=True)
+            csv, parquet, feather = (Path(tmp) / f"hourly{suffix}" for suffix in (".csv", ".parquet", ".feather"))
+            data.to_csv(csv, index=False)
+            data.astype(dtypes).to_parquet(parquet, index=False)
+            data.astype(dtypes).to_feather(feather)
+
+            readers = [
+                ("csv", csv, lambda: pd.read_csv(csv, dtype=HOURLY_DTYPES)),
+                ("csv, 5 columns", csv,
+                 lambda: pd.read_csv(csv, usecols=USER_COLUMNS, dtype={c: HOURLY_DTYPES[c] for c in USER_COLUMNS})),
+                ("parquet", parquet, lambda: pd.read_parquet(parquet).astype(dtypes)),
+                ("parquet, 5 columns", parquet,
+                 lambda: pd.read_parquet(parquet, columns=USER_COLUMNS).astype({c: dtypes[c] for c in USER_COLUMNS})),
+                ("feather", feather, lambda: pd.read_feather(feather)),
+                ("feather, 5 columns", feather, lambda: pd.read_feather(feather, columns=USER_COLUMNS)),
+            ]
+            for label, path, read in readers:
+                seconds, memory = best_of(read, args.repeat)
+                print(f"{len(data):>10} {label:<22} {path.stat().st_size / 1e6:>8.1f} {seconds:>9.4f} {memory / 1e6:>10.1f}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
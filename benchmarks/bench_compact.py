@@ -0,0 +1,91 @@
+# Compare a fitted forest with its compact export (python -m bikes.compact):
+# file size, resident memory after loading, and predictions per second.
+#
+#   python -m bikes.compact --model Model3
+#   python benchmarks/bench_compact.py --model Model3 [--batch-sizes 1 100 10000]
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bikes.compact import TOLERANCE, compact_name
+from bikes.data import load_cleaned
+from bikes.schema import widen
+from bikes.encoding import FEATURES
+from bikes.models import get_model, model_path
+
+# Run in a fresh interpreter so each model's memory is measured on its own
+LOAD_SCRIPT = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+import bikes.compact, joblib, numpy, pandas, sklearn.ensemble
+before = rss_mb()
+start = time.perf_counter()
+model = joblib.load({path!r})
+print(json.dumps({{"load_s": time.perf_counter() - start, "rss_mb": rss_mb() - before}}))
+"""
+
+
+def measure_load(path):
+    output = subprocess.run([sys.executable, "-c", LOAD_SCRIPT.format(root=str(ROOT), path=str(path))],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def predictions_per_second(model, X, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(X)
+        times.append(time.perf_counter() - start)
+    return len(X) / min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a forest against its compact export.")
+    parser.add_argument("--model", default="Model3")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = [args.model, compact_name(args.model)]
+    models = {name: get_model(name).model for name in names}
+
+    X = widen(load_cleaned(), 'cleaned')[FEATURES]
+    difference = np.abs(models[names[0]].predict(X) - models[names[1]].predict(X)).max()
+    print(f"max |difference| over the hourly data: {difference:.2e} (tolerance {TOLERANCE:g})")
+    if difference > TOLERANCE:
+        sys.exit("compact model does not match the original")
+
+    batches = {size: pd.concat([X] * (size // len(X) + 1), ignore_index=True).sample(size, random_state=0)
+               for size in args.batch_sizes}
+    rows = []
+    for name in names:
+        row = {'model': name, 'file_mb': model_path(name).stat().st_size / 1e6}
+        row.update(measure_load(model_path(name)))
+        for size, batch in batches.items():
+            row[f"rows/s @{size}"] = predictions_per_second(models[name], batch, args.repeat)
+        rows.append(row)
+    print(pd.DataFrame(rows).set_index('model').round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Compare recomputing the Model page's correlation matrix with DataFrame.corr()
+# against bikes.correlation's running statistics, when one more day of hourly
+# rows arrives. The hourly data is replicated to stand in for longer history.
+#
+#   python benchmarks/bench_correlation.py [--repeat 5] [--scales 1 10 100]
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.correlation import CORRELATION_COLUMNS, RunningCorrelation
+from bikes.data import load_hourly
+from bikes.schema import widen
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the running correlation matrix.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    hourly = widen(load_hourly(), 'hourly')
+    new_day = hourly.tail(24)
+    print(f"{'rows':>10} {'corr() (s)':>11} {'+1 day (s)':>11} {'read (s)':>9} {'max diff':>9}")
+    for scale in args.scales:
+        history = pd.concat([hourly] * scale, ignore_index=True)
+        grown = pd.concat([history, new_day], ignore_index=True)
+        state = RunningCorrelation(CORRELATION_COLUMNS).update(history)
+
+        full = best_of(lambda: grown[CORRELATION_COLUMNS].corr(), args.repeat)
+        incremental = best_of(lambda: state.copy().update(new_day), args.repeat)
+        updated = state.copy().update(new_day)
+        read = best_of(updated.correlation, args.repeat)
+        diff = np.abs(updated.correlation().values - grown[CORRELATION_COLUMNS].corr().values).max()
+        print(f"{len(grown):>10} {full:>11.4f} {incremental:>11.5f} {read:>9.5f} {diff:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
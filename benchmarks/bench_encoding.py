@@ -0,0 +1,153 @@
+# Per-row cost of encoding Simulator inputs: the old scalar if/elif functions
+# called once per row against bikes.encoding.encode on whole columns.
+#
+#   python benchmarks/bench_encoding.py [--rows 1 1000 100000]
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.encoding import DAYS_OF_WEEK, FEATURES, INPUTS, SEASON_MONTHS, SEASONS, WEATHER, encode, encode_frame
+
+
+# The Simulator's original encoders, kept here as the baseline
+
+def change_season(data):
+    if data == "Winter":
+        return 1
+    elif data == "Spring":
+        return 2
+    elif data == "Summer":
+        return 3
+    else:
+        return 4
+
+
+def change_month(data):
+    if data == "January":
+        return 1
+    elif data == "February":
+        return 2
+    elif data == "March":
+        return 3
+    elif data == "April":
+        return 4
+    elif data == "May":
+        return 5
+    elif data == "June":
+        return 6
+    elif data == "July":
+        return 7
+    elif data == "August":
+        return 8
+    elif data == "September":
+        return 9
+    elif data == "October":
+        return 10
+    elif data == "November":
+        return 11
+    elif data == "December":
+        return 12
+
+
+def change_day_of_week(data):
+    if data == "Monday":
+        return 1
+    elif data == "Tuesday":
+        return 2
+    elif data == "Wednesday":
+        return 3
+    elif data == "Thursday":
+        return 4
+    elif data == "Friday":
+        return 5
+    elif data == "Saturday":
+        return 6
+    else:
+        return 0
+
+
+def change_weekday(data):
+    if data in [1,5]:
+        return 0
+    else:
+        return 1
+
+
+def change_weather(data):
+    if data == "Clear; or Partly Cloudy":
+        return 1
+    elif data == "Misty and Cloudy; or Misty":
+        return 2
+    elif data == "Light Snow; or Light Rain and Scattered Clouds with or without Thunderstorm":
+        return 3
+    else:
+        return 4
+
+
+def change_workingday(data1, data2):
+    if data1 == 0 and data2 == 0:
+        return 0
+    else:
+        return 1
+
+
+def old_encode_row(season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather):
+    weekday = change_weekday(change_day_of_week(day_of_week))
+    return [change_season(season), change_month(month), hour, weekday, change_workingday(0, weekday),
+            change_weather(weather), temperature_feel/50, humidity/100, wind/67, day]
+
+
+def old_encode(raw):
+    return pd.DataFrame([old_encode_row(*row) for row in raw.itertuples(index=False)], columns=FEATURES)
+
+
+def random_inputs(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        season = rng.choice(SEASONS)
+        rows.append([season, rng.choice(SEASON_MONTHS[season]), rng.randint(1, 28), rng.randint(0, 23),
+                     rng.choice(DAYS_OF_WEEK), rng.randint(0, 50), rng.randint(0, 100), rng.randint(0, 67),
+                     rng.choice(WEATHER)])
+    return pd.DataFrame(rows, columns=INPUTS)
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the table-driven input encoder.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'if/elif (us/row)':>17} {'encode (us/row)':>16} {'speedup':>8}")
+    for count in args.rows:
+        raw = random_inputs(count)
+        pd.testing.assert_frame_equal(old_encode(raw), encode_frame(raw), check_dtype=False)
+        if count == 1:
+            # The Simulator's case: one scenario, scalars in and scalars out
+            row = raw.iloc[0].tolist()
+            old = best_of(lambda: old_encode_row(*row), args.repeat * 100)
+            new = best_of(lambda: encode(*row), args.repeat * 100)
+        else:
+            old = best_of(lambda: old_encode(raw), args.repeat)
+            new = best_of(lambda: encode_frame(raw), args.repeat)
+        print(f"{count:>8} {old / count * 1e6:>17.2f} {new / count * 1e6:>16.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
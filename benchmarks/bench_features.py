@@ -0,0 +1,70 @@
+# Compare the old row-wise .apply(lambda ...) transforms with bikes.features
+# on the hourly dataset, as is and replicated to check how the gap scales.
+#
+#   python benchmarks/bench_features.py [--repeat 5] [--scales 1 100]
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.data import load_hourly
+from bikes.schema import widen
+from bikes.features import day_of_month, unscale_weather, yes_no
+
+
+def change_legend(data):
+    if data == 0:
+        return 'No'
+    else:
+        return 'Yes'
+
+
+def old_transforms(data):
+    out = pd.DataFrame(index=data.index)
+    out['day'] = data['dteday'].apply(lambda x: str(x)[-2:])
+    out['atemp'] = data['atemp'].apply(lambda x: x*50)
+    out['Humidity'] = data['hum'].apply(lambda x: x*100)
+    out['Windspeed'] = data['windspeed'].apply(lambda x: x*67)
+    out['Working Day'] = data['workingday'].apply(change_legend)
+    return out
+
+
+def new_transforms(data):
+    out = unscale_weather(data)
+    out.insert(0, 'day', day_of_month(data['dteday']))
+    out['Working Day'] = yes_no(data['workingday'])
+    return out
+
+
+def best_of(func, data, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized feature transforms.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    args = parser.parse_args()
+
+    hourly = widen(load_hourly(), 'hourly')
+    print(f"{'rows':>10} {'apply (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for scale in args.scales:
+        data = pd.concat([hourly] * scale, ignore_index=True)
+        pd.testing.assert_frame_equal(old_transforms(data), new_transforms(data))
+        old = best_of(old_transforms, data, args.repeat)
+        new = best_of(new_transforms, data, args.repeat)
+        print(f"{len(data):>10} {old:>10.4f} {new:>15.4f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Compare the model families the Simulator can use: R^2 on the held-out test
+# set (real_pred.csv, the split bikes.train also holds out), file size, load
+# time and memory in a fresh process, and prediction latency for one row and
+# for a batch. The table is saved to model_comparison.csv for the Model page.
+#
+#   python -m bikes.train --name Model3-hgb --model-type hgb --publish
+#   python benchmarks/bench_models.py [--models Model3 Model3-hgb] [--batch-size 10000]
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_compact import measure_load
+from bikes.data import MODEL_COMPARISON_CSV, REAL_PRED_CSV, REAL_PRED_DTYPES, load_csv
+from bikes.encoding import FEATURES
+from bikes.models import available_models, get_model, model_path
+
+
+def latency_ms(model, X, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(X)
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Simulator's model families side by side.")
+    parser.add_argument("--models", nargs="+", help="Default: every model the Simulator offers.")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=50, help="Single-row predictions timed per model.")
+    parser.add_argument("--out", type=Path, default=MODEL_COMPARISON_CSV)
+    args = parser.parse_args()
+
+    test = load_csv(REAL_PRED_CSV, REAL_PRED_DTYPES)
+    X, y = test[FEATURES], test['real']
+    one = X.iloc[[0]]
+    batch = X.sample(args.batch_size, replace=True, random_state=0)
+
+    rows = []
+    for name in args.models or available_models():
+        model = get_model(name, wait=True).model
+        load = measure_load(model_path(name))
+        rows.append({
+            'model': name,
+            'type': type(model).__name__,
+            'test R2': r2_score(y, model.predict(X)),
+            'file (MB)': model_path(name).stat().st_size / 1e6,
+            'memory (MB)': load['rss_mb'],
+            'load (s)': load['load_s'],
+            'one row (ms)': latency_ms(model, one, args.repeat),
+            f'{args.batch_size} rows (ms)': latency_ms(model, batch, max(3, args.repeat // 10)),
+        })
+    report = pd.DataFrame(rows)
+    print(report.round(4).to_string(index=False))
+    report.to_csv(args.out, index=False)
+    print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
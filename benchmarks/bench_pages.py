@@ -0,0 +1,303 @@
+# Render the app's pages headlessly with Streamlit's AppTest and time what a
+# user does on them: the first run, a rerun, every option of every radio and
+# selectbox, the Simulator's sliders (to their maximum, then minimum) and its
+# buttons. Each interaction records wall time, peak traced memory, net memory
+# and net allocated blocks (tracemalloc), and each page the process's peak RSS.
+#
+# Every scale runs in a fresh process on a copy of the app whose hourly,
+# cleaned and prediction rows are replicated that many times (instants
+# renumbered, days unchanged), with the aggregates and columnar files rebuilt
+# for it. Pages run in order in one process, like one server, so later pages
+# find what earlier ones cached. The JSON report records the commit and
+# library versions so runs can be compared:
+#
+#   python benchmarks/bench_pages.py [--scales 1 10 100] [--pages Weather Simulator] [--out pages.json]
+#   python benchmarks/bench_pages.py --compare before.json after.json
+#
+# tracemalloc slows Python-heavy code down; --no-trace-memory times without it.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The Diagnostics page reports on the server itself, so it is left out
+PAGES = ["Overview.py"] + [f"pages/{path.name}" for path in sorted((ROOT / "pages").glob("*.py"))
+                           if not path.stem.endswith("Diagnostics")]
+
+# Datasets replicated per scale; the first column of the hourly file is its instant
+DATASETS = ["bike-sharing_hourly.csv", "cleaned_data.csv", "real_pred.csv"]
+RENUMBERED = "bike-sharing_hourly.csv"
+
+COPIED = ["bikes", "pages", ".streamlit", "Overview.py"]
+SKIPPED = {".git", "artifacts", "aggregates", "columnar", "benchmarks", "__pycache__", "requests.jsonl"}
+
+VERSIONED = ["streamlit", "pandas", "numpy", "sklearn", "plotly", "pyarrow"]
+
+
+def page_name(page):
+    return Path(page).stem.lstrip("0123456789 ")
+
+
+def replicate(source, dest, scale, renumber=False):
+    """Write ``source``'s rows ``scale`` times to ``dest``, renumbering the first column if asked."""
+    with open(source) as f:
+        header = f.readline()
+        rows = f.readlines()
+    with open(dest, "w") as f:
+        f.write(header)
+        instant = 0
+        for _ in range(scale):
+            if not renumber:
+                f.writelines(rows)
+                continue
+            for row in rows:
+                instant += 1
+                f.write(f"{instant},{row.split(',', 1)[1]}")
+
+
+def prepare(app_dir, scale, stores=True):
+    """Copy the app to ``app_dir`` with its datasets replicated ``scale`` times."""
+    for item in ROOT.iterdir():
+        target = app_dir / item.name
+        if item.name in SKIPPED or item.name in DATASETS:
+            continue
+        if item.name in COPIED:
+            # Copied rather than linked, so bikes.data.ROOT is the copy
+            if item.is_dir():
+                shutil.copytree(item, target, ignore=shutil.ignore_patterns("__pycache__"))
+            else:
+                shutil.copy2(item, target)
+        elif item.is_file():
+            target.symlink_to(item)
+    for name in DATASETS:
+        replicate(ROOT / name, app_dir / name, scale, renumber=name == RENUMBERED)
+    if stores:
+        env = dict(os.environ, PYTHONPATH=str(app_dir))
+        for module in ("bikes.aggregates", "bikes.columnar"):
+            subprocess.run([sys.executable, "-m", module], cwd=app_dir, env=env, check=True,
+                           stdout=subprocess.DEVNULL)
+
+
+def measure(action, trace_memory):
+    if trace_memory:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    at = action()
+    result = {'seconds': time.perf_counter() - start, 'net_blocks': sys.getallocatedblocks() - blocks}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        result.update(peak_mb=(peak - before) / 1e6, net_mb=(current - before) / 1e6)
+    result['errors'] = [exception.value for exception in at.exception]
+    return result
+
+
+def find(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    return None
+
+
+def interactions(at):
+    """(description, action) for each widget interaction, looked up again when it runs."""
+    def choose(kind, label, value):
+        return lambda: find(at, kind, label).set_value(value).run()
+
+    def click(label):
+        return lambda: find(at, 'button', label).click().run()
+
+    for kind in ('radio', 'selectbox'):
+        for label in [widget.label for widget in getattr(at, kind)]:
+            # Options can depend on earlier choices, so read them when the widget is reached
+            widget = find(at, kind, label)
+            if widget is None:
+                continue
+            original = widget.value
+            for option in list(widget.options):
+                widget = find(at, kind, label)
+                if widget is not None and option in widget.options:
+                    yield f"{kind} {label!r} = {option!r}", choose(kind, label, option)
+            # Back to the default (e.g. the Simulator's grid rather than its upload), unless that was no choice
+            widget = find(at, kind, label)
+            if original is not None and widget is not None and widget.value != original:
+                yield f"{kind} {label!r} = {original!r}", choose(kind, label, original)
+    for label in [widget.label for widget in at.slider]:
+        widget = find(at, 'slider', label)
+        cast = type(widget.value[0]) if isinstance(widget.value, tuple) else type(widget.value)
+        low, high = cast(widget.min), cast(widget.max)
+        values = [(low, low), (low, high)] if isinstance(widget.value, tuple) else [high, low]
+        for value in values:
+            yield f"slider {label!r} = {value!r}", choose('slider', label, value)
+    for label in [widget.label for widget in at.button]:
+        yield f"button {label!r}", click(label)
+
+
+def run_pages(app_dir, pages, trace_memory, timeout):
+    """Run ``pages`` of the app in ``app_dir`` in this process; one row per interaction."""
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(app_dir)
+    sys.path.insert(0, str(app_dir))
+    if trace_memory:
+        tracemalloc.start()
+    rows = []
+    for page in pages:
+        at = AppTest.from_file(str(app_dir / page), default_timeout=timeout)
+        steps = [("first run", at.run), ("rerun", at.run)]
+        page_rows = []
+        for description, action in steps:
+            page_rows.append(dict(measure(action, trace_memory), interaction=description))
+        for description, action in interactions(at):
+            page_rows.append(dict(measure(action, trace_memory), interaction=description))
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        rows += [dict(row, page=page_name(page), peak_rss_mb=peak_rss) for row in page_rows]
+    return rows
+
+
+def run_scale(scale, pages, trace_memory, timeout, stores):
+    """Prepare a copy of the app at ``scale`` and run the pages on it in a fresh process."""
+    with tempfile.TemporaryDirectory(prefix=f"bench-pages-{scale}x-") as tmp:
+        app_dir = Path(tmp) / "app"
+        app_dir.mkdir()
+        start = time.perf_counter()
+        prepare(app_dir, scale, stores)
+        prepare_seconds = time.perf_counter() - start
+        out = Path(tmp) / "rows.json"
+        command = [sys.executable, __file__, "--worker", str(app_dir), "--worker-out", str(out),
+                   "--timeout", str(timeout), "--pages", *pages]
+        if not trace_memory:
+            command.append("--no-trace-memory")
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        with open(out) as f:
+            rows = json.load(f)
+        with open(app_dir / RENUMBERED) as f:
+            hourly_rows = sum(1 for _ in f) - 1
+    return {'scale': scale, 'hourly_rows': hourly_rows, 'prepare_seconds': prepare_seconds,
+            'interactions': [dict(row, scale=scale) for row in rows]}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def versions():
+    found = {'python': platform.python_version()}
+    for module in VERSIONED:
+        try:
+            found[module] = __import__(module).__version__
+        except ImportError:
+            found[module] = None
+    return found
+
+
+def page_summary(report):
+    import pandas as pd
+
+    rows = pd.DataFrame([row for run in report['runs'] for row in run['interactions']])
+    if 'peak_mb' not in rows:
+        rows['peak_mb'] = float('nan')
+    first = rows[rows['interaction'] == "first run"].set_index(['scale', 'page'])['seconds']
+    grouped = rows[~rows['interaction'].isin(["first run", "rerun"])].groupby(['scale', 'page'])
+    summary = pd.DataFrame({'first run (s)': first,
+                            'interactions': grouped.size(),
+                            'median (s)': grouped['seconds'].median(),
+                            'max (s)': grouped['seconds'].max(),
+                            'peak traced (MB)': rows.groupby(['scale', 'page'])['peak_mb'].max(),
+                            'peak RSS (MB)': rows.groupby(['scale', 'page'])['peak_rss_mb'].max(),
+                            'errors': rows.groupby(['scale', 'page'])['errors'].apply(lambda e: sum(map(len, e)))})
+    return summary.fillna({'interactions': 0})
+
+
+def compare(before_path, after_path):
+    """Print per-page and per-interaction changes between two reports."""
+    import pandas as pd
+
+    reports = []
+    for path in (before_path, after_path):
+        with open(path) as f:
+            reports.append(json.load(f))
+    before, after = reports
+    print(f"before: {before['commit']} ({before['created']})  after: {after['commit']} ({after['created']})")
+
+    pages = page_summary(before).join(page_summary(after), lsuffix=" before", rsuffix=" after", how='outer')
+    for column in ('first run (s)', 'median (s)', 'peak RSS (MB)'):
+        pages[f"{column} ratio"] = pages[f"{column} after"] / pages[f"{column} before"]
+    print(pages[[column for column in pages.columns if column.split(" ")[0] in ('first', 'median', 'peak')
+                 and 'traced' not in column]].round(3).to_string())
+
+    keys = ['scale', 'page', 'interaction']
+    rows = [pd.DataFrame([row for run in report['runs'] for row in run['interactions']]).set_index(keys)['seconds']
+            for report in reports]
+    changes = pd.DataFrame({'before (s)': rows[0], 'after (s)': rows[1]})
+    changes['ratio'] = changes['after (s)'] / changes['before (s)']
+    print("\nLargest changes per interaction:")
+    print(changes.dropna().sort_values('ratio', key=lambda ratio: -abs(ratio - 1)).head(15).round(3).to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rendering and interacting with every page of the app.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="How many times to replicate the datasets.")
+    parser.add_argument("--pages", nargs="+", default=PAGES,
+                        help="Page scripts, or page names such as Weather.")
+    parser.add_argument("--out", default="bench_pages.json", help="Where to write the JSON report.")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds one script run may take.")
+    parser.add_argument("--trace-memory", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--no-stores", action="store_true",
+                        help="Don't build the aggregates and columnar files, so pages compute from the csv files.")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two reports instead.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.worker:
+        rows = run_pages(Path(args.worker), args.pages, args.trace_memory, args.timeout)
+        with open(args.worker_out, "w") as f:
+            json.dump(rows, f)
+        return
+
+    by_name = {page_name(page): page for page in PAGES}
+    pages = [by_name.get(page, page) for page in args.pages]
+    report = {
+        'commit': _git("rev-parse", "--short", "HEAD"),
+        'dirty': bool(_git("status", "--porcelain", "--untracked-files=no")),
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'versions': versions(),
+        'trace_memory': args.trace_memory,
+        'stores': not args.no_stores,
+        'pages': pages,
+        'runs': [],
+    }
+    for scale in args.scales:
+        print(f"{scale}x ...", flush=True)
+        report['runs'].append(run_scale(scale, pages, args.trace_memory, args.timeout, not args.no_stores))
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+
+    print(page_summary(report).round(3).to_string())
+    print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Throughput of a large batch prediction in process against the worker pool
+# (bikes/pool.py) at 1, 2, 4 and N workers, plus how long a thread standing in
+# for the server's other sessions is held up while the batch runs. Startup
+# (spawning the workers and loading the model) is reported separately.
+#
+#   python benchmarks/bench_pool.py [--model Model3] [--rows 100000] [--workers 1 2 4 8]
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.encoding import FEATURES
+from bikes.models import SIMULATOR_MODEL, get_model
+from bikes.pool import InferencePool
+
+
+def random_scenarios(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'season': rng.integers(1, 5, rows), 'mnth': rng.integers(1, 13, rows), 'hr': rng.integers(0, 24, rows),
+        'weekday': rng.integers(0, 7, rows), 'workingday': rng.integers(0, 2, rows),
+        'weathersit': rng.integers(1, 5, rows), 'atemp': rng.random(rows), 'hum': rng.random(rows),
+        'windspeed': rng.random(rows) * 0.8, 'day': rng.integers(1, 32, rows),
+    })[FEATURES].astype('float64')
+
+
+def timed(predict, X):
+    """Seconds to score ``X``, and the longest a 1 ms ticker thread was held up meanwhile."""
+    stalls = []
+    done = threading.Event()
+
+    def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            time.sleep(0.001)
+            stalls.append(time.perf_counter() - start - 0.001)
+
+    thread = threading.Thread(target=ticker)
+    thread.start()
+    start = time.perf_counter()
+    predict(X)
+    seconds = time.perf_counter() - start
+    done.set()
+    thread.join()
+    return seconds, max(stalls, default=0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch predictions across worker processes.")
+    parser.add_argument("--model", default=SIMULATOR_MODEL)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count()}))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    handle = get_model(args.model, wait=True)
+    X = random_scenarios(args.rows)
+    print(f"{args.model}: {args.rows:,} rows on {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'startup (s)':>12} {'best (s)':>9} {'rows/s':>10} {'max stall (ms)':>15}")
+    for workers in args.workers:
+        startup = 0.0
+        if workers <= 1:
+            predict = handle.predict
+        else:
+            pool = InferencePool(handle, workers)
+            start = time.perf_counter()
+            pool.predict(X.head(workers))
+            startup = time.perf_counter() - start
+            predict = pool.predict
+        runs = [timed(predict, X) for _ in range(args.repeat)]
+        best = min(seconds for seconds, stall in runs)
+        stall = max(stall for seconds, stall in runs)
+        print(f"{workers:>7} {startup:>12.2f} {best:>9.2f} {args.rows / best:>10,.0f} {stall:>15.1f}")
+        if workers > 1:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Compute every EDA aggregate two ways over the hourly and cleaned Parquet
+# files replicated 1x/10x/100x: pandas (read the files, then groupby, what the
+# pages do when an aggregate isn't stored) and DuckDB (SQL over the files,
+# BIKES_AGGREGATE_ENGINE=duckdb). Each engine and scale runs in a fresh
+# process, so its peak RSS is its own.
+#
+#   python -m bikes.columnar
+#   python benchmarks/bench_query.py [--scales 1 10 100] [--threads 4]
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes import query
+from bikes.aggregates import AGGREGATES, compute_aggregate, finalize_aggregate
+from bikes.columnar import COLUMNAR_DIR, _stored_path
+from bikes.schema import CLEANED_DTYPES, HOURLY_DTYPES
+
+
+def replicate(name, scale, out_dir):
+    frame = pd.read_parquet(_stored_path(name, COLUMNAR_DIR))
+    path = Path(out_dir) / f"{name}-{scale}x.parquet"
+    pd.concat([frame] * scale, ignore_index=True).to_parquet(path, index=False)
+    return path, len(frame) * scale
+
+
+def run_pandas(hourly_path, cleaned_path):
+    hourly = pd.read_parquet(hourly_path).astype(HOURLY_DTYPES)
+    cleaned = pd.read_parquet(cleaned_path).astype(CLEANED_DTYPES)
+    for name in AGGREGATES:
+        compute_aggregate(name, hourly, cleaned)
+
+
+def run_duckdb(hourly_path, cleaned_path):
+    sources = {'hourly': f"SELECT * FROM {query._scan([hourly_path])}",
+               'cleaned': f"SELECT * FROM {query._scan([cleaned_path])}"}
+    for name in AGGREGATES:
+        finalize_aggregate(name, query.partial(name, sources))
+
+
+ENGINES = {'pandas': run_pandas, 'duckdb': run_duckdb}
+
+
+def worker(engine, hourly_path, cleaned_path):
+    start = time.perf_counter()
+    ENGINES[engine](hourly_path, cleaned_path)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EDA aggregates with pandas against DuckDB.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--threads", type=int, help="DuckDB threads (default: one per core).")
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+    if _stored_path('hourly', COLUMNAR_DIR) is None or _stored_path('cleaned', COLUMNAR_DIR) is None:
+        parser.exit(1, "Build the columnar files first: python -m bikes.columnar\n")
+
+    engines = list(ENGINES) if query.available() else ['pandas']
+    if len(engines) < len(ENGINES):
+        print("DuckDB is not installed (pip install duckdb); timing pandas only")
+    env = dict(os.environ, BIKES_DUCKDB_THREADS=str(args.threads)) if args.threads else None
+    print(f"{'scale':>5} {'rows':>10} {'engine':>7} {'time (s)':>9} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            hourly_path, rows = replicate('hourly', scale, tmp)
+            cleaned_path, _ = replicate('cleaned', scale, tmp)
+            for engine in engines:
+                result = subprocess.run([sys.executable, __file__, "--worker", engine, str(hourly_path), str(cleaned_path)],
+                                        capture_output=True, text=True, check=True, env=env)
+                measured = json.loads(result.stdout.strip().splitlines()[-1])
+                print(f"{scale:>5} {rows:>10,} {engine:>7} {measured['seconds']:>9.2f} {measured['peak_rss_mb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Time the Weather page's trendline three ways: plotly's trendline='lowess'
+# (what the page did on every rerun), the stored aggregate it reads now, and
+# the binned smoother on its own. The daily data is replicated with a little
+# jitter to see how each scales with more history.
+#
+#   python benchmarks/bench_smoothing.py [--repeat 3] [--scales 1 10 100]
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import plotly.express as px
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.aggregates import load_aggregate
+from bikes.smoothing import binned, lowess
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Weather page trendlines.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--max-lowess-points", type=int, default=10_000,
+                        help="Skip LOWESS above this many points (it gets very slow).")
+    args = parser.parse_args()
+
+    daily = load_aggregate('daily_weather')
+    load_aggregate('daily_weather_trend')
+    stored = best_of(lambda: load_aggregate('daily_weather_trend'), args.repeat)
+    print(f"stored trendline (cached read): {stored * 1e6:.1f} us\n")
+
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8} {'plotly lowess (s)':>18} {'lowess (s)':>11} {'binned (s)':>11} {'mean gap':>9}")
+    for scale in args.scales:
+        x = np.tile(daily['atemp'].to_numpy(), scale) + rng.normal(0, 0.1, len(daily) * scale)
+        y = np.tile(daily['cnt'].to_numpy(), scale)
+        if len(x) <= args.max_lowess_points:
+            plotly_time = best_of(lambda: px.scatter(x=x, y=y, trendline='lowess'), args.repeat)
+            lowess_time = best_of(lambda: lowess(x, y), args.repeat)
+            # How far the binned curve is from LOWESS on average, in rentals
+            reference = lowess(x, y)
+            curve = binned(x, y)
+            gap = np.mean(np.abs(np.interp(curve['x'], reference['x'], reference['y']) - curve['y']))
+            timings = f"{plotly_time:>18.3f} {lowess_time:>11.3f}"
+        else:
+            timings, gap = f"{'-':>18} {'-':>11}", np.nan
+        binned_time = best_of(lambda: binned(x, y), args.repeat)
+        print(f"{len(x):>8} {timings} {binned_time:>11.4f} {gap:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Compare the exhaustive grid search (python -m bikes.train) with successive
+# halving (--search halving) on the same grid: wall time, forest fits, the
+# setting chosen, and how long each took to first reach a target CV R^2.
+# Halving then runs again on a wider grid, where its disk cache means only the
+# new settings are fitted.
+#
+#   python benchmarks/bench_tuning.py [--max-depth 20 21 22 23 24] [--min-samples-leaf 1 2 4] [--target-r2 0.84]
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.train import CV_FOLDS, LEGACY_DEPTHS, train
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exhaustive against successive-halving tuning.")
+    parser.add_argument("--max-depth", type=int, nargs="+", default=LEGACY_DEPTHS)
+    parser.add_argument("--min-samples-leaf", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[100])
+    parser.add_argument("--extra-depth", type=int, nargs="+", default=[18, 26],
+                        help="Depths added for the cached rerun.")
+    parser.add_argument("--cv", type=int, default=CV_FOLDS)
+    parser.add_argument("--target-r2", type=float, default=0.84)
+    parser.add_argument("--jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    grid = dict(n_estimators=args.n_estimators, min_samples_leaf=args.min_samples_leaf, cv=args.cv,
+                n_jobs=args.jobs, target_r2=args.target_r2)
+    print(f"{'search':<22} {'fits':>5} {'total (s)':>10} {'to target (s)':>14} {'CV R^2':>7} {'test R^2':>9}  best")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runs = [
+            ("grid", dict(search='grid', max_depth=args.max_depth)),
+            ("halving", dict(search='halving', max_depth=args.max_depth, cache_dir=cache_dir)),
+            ("halving, wider, cached", dict(search='halving', max_depth=args.max_depth + args.extra_depth,
+                                            cache_dir=cache_dir)),
+        ]
+        for label, options in runs:
+            metadata = train(**grid, **options)['metadata']
+            reached = metadata['time_to_target']
+            reached = "-" if reached is None else f"{reached:.1f}"
+            print(f"{label:<22} {metadata['fits']:>5} {metadata['search_seconds']:>10.1f} {reached:>14} "
+                  f"{metadata['cv_r2']:>7.4f} {metadata['test_r2']:>9.4f}  {metadata['best_params']}")
+
+
+if __name__ == "__main__":
+    main()
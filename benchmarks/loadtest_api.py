@@ -0,0 +1,100 @@
+# Load test for the prediction service (bikes/api.py). Start it first:
+#
+#   uvicorn bikes.api:app --port 8000
+#   python benchmarks/loadtest_api.py --requests 2000 --concurrency 8
+#   python benchmarks/loadtest_api.py --batch-size 168
+#
+# Each worker thread keeps one connection open and sends requests back to
+# back. Reports latency percentiles and overall throughput.
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+import sys
+from pathlib import Path
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bikes.encoding import DAYS_OF_WEEK, SEASON_MONTHS, SEASONS, WEATHER
+
+
+def random_scenario(rng):
+    season = rng.choice(SEASONS)
+    return {
+        'season': season,
+        'month': rng.choice(SEASON_MONTHS[season]),
+        'day': rng.randint(1, 28),
+        'hour': rng.randint(0, 23),
+        'day_of_week': rng.choice(DAYS_OF_WEEK),
+        'temperature_feel': rng.randint(0, 50),
+        'humidity': rng.randint(0, 100),
+        'wind': rng.randint(0, 67),
+        'weather': rng.choice(WEATHER),
+    }
+
+
+def worker(url, count, batch_size, seed, latencies, errors):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    path = "/predict/batch" if batch_size > 1 else "/predict"
+    for _ in range(count):
+        if batch_size > 1:
+            body = {'scenarios': [random_scenario(rng) for _ in range(batch_size)]}
+        else:
+            body = random_scenario(rng)
+        payload = json.dumps(body)
+        start = time.perf_counter()
+        try:
+            connection.request("POST", path, payload, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(1)
+    connection.close()
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the prediction service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=1000, help="Total number of requests.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of client threads.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Scenarios per request; >1 uses /predict/batch.")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    latencies, errors = [], []
+    per_worker = [args.requests // args.concurrency + (i < args.requests % args.concurrency)
+                  for i in range(args.concurrency)]
+    threads = [threading.Thread(target=worker, args=(url, count, args.batch_size, i, latencies, errors))
+               for i, count in enumerate(per_worker)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"requests:     {len(latencies)} ({len(errors)} failed), {args.concurrency} concurrent, batch size {args.batch_size}")
+    print(f"p50 latency:  {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"p99 latency:  {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"throughput:   {len(latencies) / elapsed:.1f} requests/s ({len(latencies) * args.batch_size / elapsed:.1f} predictions/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Shared helpers for the Streamlit pages: data loading, models and prediction.
@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from bikes import query
+from bikes.cache import LRUCache
+from bikes.data import CLEANED_CSV, HOURLY_CSV, ROOT, fingerprint, load_csv
+from bikes.features import clean_hourly, day_of_month, unscale_weather, yes_no
+from bikes.partitions import SLICE_CACHE_SIZE, load_slice, slice_version
+from bikes.schema import CLEANED_DTYPES, HOURLY_DTYPES
+from bikes.smoothing import trendlines
+from bikes.timing import cache_lookup, span
+
+# Every chart on the EDA pages is drawn from a small grouped table. They only
+# change when a new CSV lands, so they are built once (python -m bikes.aggregates)
+# into one Parquet file per aggregate under aggregates/, next to a manifest with
+# the content hash of the CSVs they were built from.
+#
+# load_aggregate() reads the stored table when the manifest still matches the
+# CSVs, and otherwise computes it from the data layer. Either way the result is
+# kept in memory for the rest of the process.
+#
+# Each aggregate is defined as per-group totals that add up across chunks of
+# rows, plus a final step that turns them into the charted table. That lets
+# python -m bikes.ingest fold new hourly records into the store as they
+# arrive instead of re-aggregating the whole history.
+#
+# With a selection (a bikes.partitions.Slice) the same definitions run over
+# just that slice of the partitioned data instead, so the cost follows the
+# slice. Counts add up across the selected stations; means are per station
+# and hour.
+#
+# Aggregates that aren't stored are computed with pandas, or with
+# BIKES_AGGREGATE_ENGINE=duckdb as SQL over the Parquet files (bikes.query)
+# when DuckDB is installed and the files are current.
+
+STORE_DIR = ROOT / "aggregates"
+MANIFEST = "manifest.json"
+
+ENGINES = ['pandas', 'duckdb']
+ENGINE = os.environ.get("BIKES_AGGREGATE_ENGINE", "pandas")
+
+
+def _sources(hourly_path=HOURLY_CSV, cleaned_path=CLEANED_CSV):
+    return {
+        'hourly': fingerprint(hourly_path),
+        'cleaned': fingerprint(cleaned_path),
+    }
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """How one aggregate is built.
+
+    ``partial(hourly, cleaned)`` returns per-group totals (sums and row
+    counts, indexed by group) over some rows of the data; the partials of
+    separate chunks of rows add up (combine_partials). ``finalize(partial)``
+    turns the totals into the table the pages chart.
+    """
+    partial: Callable
+    finalize: Callable
+
+
+def _sums(frame, by, columns):
+    # Per-group sums of ``columns`` plus the number of rows in 'rows'
+    grouped = frame.groupby(by)
+    partial = grouped[columns].sum()
+    partial['rows'] = grouped.size()
+    return partial
+
+
+def _total(source, by):
+    # Rentals per value of ``by``, e.g. per season
+    return Aggregate(
+        partial=lambda hourly, cleaned: _sums(hourly if source == 'hourly' else cleaned, by, ['cnt']),
+        finalize=lambda partial: partial[['cnt']].reset_index(),
+    )
+
+
+def _users_by(data, period):
+    # Registered and casual totals per period stacked vertically, with each
+    # type's share of that period's total in 'weight' (for stacked % bars)
+    reg = data.groupby(period)[['registered']].sum().reset_index()
+    reg['TYPE'] = 'Registered'
+    reg['user'] = reg['registered']
+    reg = reg.drop('registered', axis=1)
+
+    cas = data.groupby(period)[['casual']].sum().reset_index()
+    cas['TYPE'] = 'Casual'
+    cas['user'] = cas['casual']
+    cas = cas.drop('casual', axis=1)
+
+    total = pd.concat((reg, cas), ignore_index=True)
+    total['weight'] = total['user'] / total.groupby([period])['user'].transform('sum')
+    return total
+
+
+def _users(period):
+    # Sums per period are all _users_by() needs, so it runs on the totals
+    return Aggregate(
+        partial=lambda hourly, cleaned: _sums(hourly, period, ['registered', 'casual']),
+        finalize=lambda partial: _users_by(partial.reset_index(), period),
+    )
+
+
+def _hourly_profile(partial):
+    # Mean rentals per hour, split by year and working day
+    profile = partial.reset_index()
+    return pd.DataFrame({
+        'yr': profile['yr'].astype('float64'),
+        'Working Day': yes_no(profile['workingday'].astype('float64')),
+        'hr': profile['hr'].astype('float64'),
+        'cnt': profile['cnt'] / profile['rows'],
+        })
+
+
+def _daily_weather_sums(hourly, cleaned):
+    year_data = unscale_weather(hourly)
+    year_data[['yr', 'mnth', 'cnt']] = hourly[['yr', 'mnth', 'cnt']]
+    year_data['day'] = day_of_month(hourly['dteday'])
+    return _sums(year_data, ["yr", "mnth", "day"], ['atemp', 'cnt', 'Windspeed', 'Humidity'])
+
+
+def _daily_weather(partial):
+    # One row per calendar day: mean temperature feel (C), humidity (%) and
+    # windspeed (knots), and the day's total rentals
+    daily = partial[['atemp', 'cnt', 'Windspeed', 'Humidity']].copy()
+    for column in ['atemp', 'Windspeed', 'Humidity']:
+        daily[column] = partial[column] / partial['rows']
+    return daily.reset_index(drop=True)
+
+
+def _daily_weather_trend(partial):
+    # Trendlines of daily rentals against temperature feel, one set of rows
+    # per smoother in 'method'
+    daily = _daily_weather(partial)
+    return trendlines(daily['atemp'], daily['cnt']).rename(columns={'x': 'atemp', 'y': 'cnt'})
+
+
+def _user_totals(partial):
+    return pd.DataFrame({'TYPE': ['Casual', 'Registered'],
+                         'user': [partial['casual'].sum(), partial['registered'].sum()]})
+
+
+# Every aggregate the pages chart, by name. cleaned_data.csv is row-aligned
+# with the hourly file, so the count tables built from it serve every page
+# that charts them.
+AGGREGATES = {
+    'season_counts': _total('cleaned', 'season'),
+    'month_counts': _total('cleaned', 'mnth'),
+    'weekday_counts': _total('cleaned', 'weekday'),
+    'weather_counts': _total('cleaned', 'weathersit'),
+    'day_avg_counts': Aggregate(
+        partial=lambda hourly, cleaned: _sums(cleaned, 'day', ['cnt']),
+        finalize=lambda partial: (partial['cnt'] / partial['rows']).rename('cnt').reset_index()),
+    'workingday_counts': _total('hourly', 'workingday'),
+    'workingday_hours': Aggregate(
+        partial=lambda hourly, cleaned: _sums(hourly, 'workingday', ['cnt']),
+        finalize=lambda partial: partial['rows'].sort_values(ascending=False, kind='stable')
+                                                .reset_index(name='count')),
+    'hourly_profile': Aggregate(
+        partial=lambda hourly, cleaned: _sums(hourly, ["yr", "workingday", "hr"], ['cnt']),
+        finalize=_hourly_profile),
+    'daily_weather': Aggregate(partial=_daily_weather_sums, finalize=_daily_weather),
+    'daily_weather_trend': Aggregate(partial=_daily_weather_sums, finalize=_daily_weather_trend),
+    'user_totals': Aggregate(
+        partial=lambda hourly, cleaned: _sums(hourly.assign(all=0), 'all', ['casual', 'registered']),
+        finalize=_user_totals),
+    'users_by_weekday': _users('weekday'),
+    'users_by_month': _users('mnth'),
+    'users_by_season': _users('season'),
+}
+
+_cache = {}
+_slice_cache = LRUCache(SLICE_CACHE_SIZE * len(AGGREGATES))
+_lock = threading.Lock()
+
+
+def _full_width():
+    # The CSVs at their parsed dtypes rather than the compact ones the pages
+    # share, so float sums and means come out exactly as they always have
+    return load_csv(HOURLY_CSV, HOURLY_DTYPES), load_csv(CLEANED_CSV, CLEANED_DTYPES)
+
+
+def partial_aggregate(name, hourly, cleaned):
+    """Totals behind aggregate ``name`` over the given rows of hourly and cleaned data."""
+    return AGGREGATES[name].partial(hourly, cleaned)
+
+
+def combine_partials(*partials):
+    """Add up partials of the same aggregate computed over separate rows."""
+    frame = pd.concat(partials)
+    return frame.groupby(level=list(range(frame.index.nlevels))).sum()
+
+
+def finalize_aggregate(name, partial):
+    return AGGREGATES[name].finalize(partial)
+
+
+def compute_aggregate(name, hourly=None, cleaned=None):
+    if hourly is None or cleaned is None:
+        hourly, cleaned = _full_width()
+    return finalize_aggregate(name, partial_aggregate(name, hourly, cleaned))
+
+
+def query_aggregate(name, selection=None):
+    """Aggregate ``name`` computed by DuckDB, or None when it can't run (see bikes.query)."""
+    if not query.available():
+        return None
+    sources = query.bundled_sources() if selection is None else query.slice_sources(selection)
+    if sources is None:
+        return None
+    return finalize_aggregate(name, query.partial(name, sources))
+
+
+def _compute(name, selection=None):
+    frame = query_aggregate(name, selection) if ENGINE == 'duckdb' else None
+    if frame is not None:
+        return frame
+    if selection is None:
+        with span("groupby"):
+            return compute_aggregate(name)
+    hourly = load_slice(selection)
+    with span("groupby"):
+        return compute_aggregate(name, hourly, clean_hourly(hourly))
+
+
+def _read_manifest(store_dir):
+    try:
+        with open(Path(store_dir) / MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_stored(name, sources, store_dir):
+    manifest = _read_manifest(store_dir)
+    if manifest is None or manifest.get('sources') != sources or name not in manifest.get('aggregates', []):
+        return None
+    try:
+        return pd.read_parquet(Path(store_dir) / f"{name}.parquet")
+    except (OSError, ImportError, ValueError):
+        # Missing file or no Parquet engine installed: compute it instead
+        return None
+
+
+def slice_aggregate(name, selection):
+    """Aggregate ``name`` over the partitions in ``selection``, cached until they change."""
+    key = (name, selection)
+    version = slice_version(selection)
+    entry = _slice_cache.get(key)
+    if entry is not None and entry[0] == version:
+        cache_lookup('aggregates', True)
+        return entry[1]
+    cache_lookup('aggregates', False)
+    frame = _compute(name, selection)
+    _slice_cache.put(key, (version, frame))
+    return frame
+
+
+def load_aggregate(name, store_dir=STORE_DIR, selection=None):
+    """Return the aggregate table ``name`` for the current data files.
+
+    With a ``selection`` (bikes.partitions.Slice), computes it over that
+    slice of the partitioned data instead. The frame is shared between
+    sessions; copy it before modifying.
+    """
+    if name not in AGGREGATES:
+        raise KeyError(f"Unknown aggregate: {name}")
+    if selection is not None:
+        return slice_aggregate(name, selection)
+    sources = _sources()
+    key = (name, str(store_dir))
+
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == sources:
+        cache_lookup('aggregates', True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == sources:
+            cache_lookup('aggregates', True)
+            return entry[1]
+        cache_lookup('aggregates', False)
+        with span("aggregate read"):
+            frame = _read_stored(name, sources, store_dir)
+        if frame is None:
+            frame = _compute(name)
+        _cache[key] = (sources, frame)
+        return frame
+
+
+def write_store(tables, sources, store_dir=STORE_DIR):
+    """Write aggregate tables (name -> frame) and a manifest saying which CSVs they came from.
+
+    Each file is written under a temporary name and moved into place, so a
+    page reading the store never sees a half-written table.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    for name, frame in tables.items():
+        tmp = store_dir / f".{name}.parquet.tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, store_dir / f"{name}.parquet")
+
+    manifest = {
+        'sources': sources,
+        'aggregates': list(tables),
+        'built_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    tmp = store_dir / f".{MANIFEST}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, store_dir / MANIFEST)
+    return manifest
+
+
+def build_store(store_dir=STORE_DIR, names=None, engine=None):
+    """Compute aggregates from the current CSVs and write them to ``store_dir``."""
+    names = list(AGGREGATES) if names is None else list(names)
+    tables = {}
+    if (engine or ENGINE) == 'duckdb':
+        tables = {name: query_aggregate(name) for name in names}
+    if any(tables.get(name) is None for name in names):
+        hourly, cleaned = _full_width()
+        tables = {name: compute_aggregate(name, hourly, cleaned) for name in names}
+    return write_store(tables, _sources(), store_dir)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _slice_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed aggregate store for the EDA pages.")
+    parser.add_argument("--out", default=str(STORE_DIR), help="Directory to write the store to.")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE,
+                        help="duckdb queries the columnar files (falls back to pandas if it can't).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = build_store(args.out, engine=args.engine)
+    print(f"Built {len(manifest['aggregates'])} aggregates in {time.perf_counter() - start:.2f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
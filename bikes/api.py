@@ -0,0 +1,109 @@
+import argparse
+from contextlib import asynccontextmanager
+from typing import List, Literal
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from bikes import pool
+from bikes.encoding import DAYS_OF_WEEK, INPUTS, SEASON_MONTHS, SEASONS, WEATHER, encode_frame, encode_inputs
+from bikes.models import SIMULATOR_MODEL, get_model
+from bikes.predict import predict_one, validate_features
+
+# HTTP access to the Simulator's model for jobs that don't go through Streamlit.
+#
+#   uvicorn bikes.api:app --port 8000        (or: python -m bikes.api)
+#
+# Requests take the same inputs as the Simulator page and go through the same
+# encoding. The model is loaded once at startup and shared by every request.
+
+MODEL_NAME = SIMULATOR_MODEL
+
+MONTHS = sorted({month for months in SEASON_MONTHS.values() for month in months})
+
+
+class Scenario(BaseModel):
+    season: Literal[tuple(SEASONS)]
+    month: Literal[tuple(MONTHS)]
+    day: int = Field(ge=1, le=31)
+    hour: int = Field(ge=0, le=23)
+    day_of_week: Literal[tuple(DAYS_OF_WEEK)]
+    temperature_feel: float = Field(ge=0, le=50, description="Temperature feel in Celsius")
+    humidity: float = Field(ge=0, le=100, description="Humidity in %")
+    wind: float = Field(ge=0, le=67, description="Wind speed in knots")
+    weather: Literal[tuple(WEATHER)]
+
+
+class Batch(BaseModel):
+    scenarios: List[Scenario] = Field(min_length=1, max_length=100_000)
+
+
+class Prediction(BaseModel):
+    prediction: float
+    model_version: str
+
+
+class BatchPrediction(BaseModel):
+    predictions: List[float]
+    model_version: str
+
+
+def _predict(scenarios):
+    raw = pd.DataFrame([scenario.model_dump() for scenario in scenarios], columns=INPUTS)
+    try:
+        X = validate_features(encode_frame(raw))
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    handle = get_model(MODEL_NAME)
+    return pool.predict(handle, X).tolist(), handle.version
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the model before accepting requests so none of them pays for it
+    get_model(MODEL_NAME)
+    yield
+
+
+app = FastAPI(title="Bike rental predictions", lifespan=lifespan)
+
+
+@app.get("/health")
+def health():
+    handle = get_model(MODEL_NAME)
+    return {'status': 'ok', 'model': handle.name, 'model_version': handle.version}
+
+
+# Plain (non-async) handlers run in FastAPI's thread pool, so a slow
+# prediction doesn't stall the event loop for other requests.
+@app.post("/predict", response_model=Prediction)
+def predict(scenario: Scenario):
+    try:
+        features = encode_inputs(**scenario.model_dump())
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    # Single scenarios go through the shared prediction cache
+    version = get_model(MODEL_NAME).version
+    return Prediction(prediction=predict_one(features, MODEL_NAME), model_version=version)
+
+
+@app.post("/predict/batch", response_model=BatchPrediction)
+def predict_many(batch: Batch):
+    predictions, version = _predict(batch.scenarios)
+    return BatchPrediction(predictions=predictions, model_version=version)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the Simulator's model over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("bikes.api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pandas as pd
+
+from bikes.encoding import FEATURES
+from bikes.timing import span
+
+# Coalesces single-scenario predictions from concurrent sessions into one
+# model.predict call. Each Streamlit session (and each /predict request of
+# bikes.api) runs in its own thread; a forest scores one row in about the
+# time it scores a few hundred, so instead of every thread calling predict on
+# its own row, they queue their rows for a worker thread per model. The
+# worker takes the first waiting row, collects whatever else arrives within
+# MAX_WAIT_MS (up to MAX_BATCH rows), scores them together and hands each
+# caller its prediction.
+#
+# A lone request therefore waits up to MAX_WAIT_MS longer; set it to 0 to
+# batch only the requests already queued, or BIKES_MICRO_BATCH=0 to predict
+# in the caller's thread as before. A caller that hasn't had its answer after
+# TIMEOUT_S seconds (a stuck or dead worker) predicts its row itself, and a
+# dead worker thread is restarted by the next request.
+
+ENABLED = os.environ.get("BIKES_MICRO_BATCH", "1") != "0"
+MAX_BATCH = int(os.environ.get("BIKES_BATCH_MAX_SIZE", 256))
+MAX_WAIT_MS = float(os.environ.get("BIKES_BATCH_MAX_WAIT_MS", 5))
+TIMEOUT_S = float(os.environ.get("BIKES_BATCH_TIMEOUT_S", 10))
+
+
+class MicroBatcher:
+    """Scores rows queued from any thread in batches, on one worker thread."""
+
+    def __init__(self, name, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, timeout_s=TIMEOUT_S):
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout_s
+        self.requests = 0
+        self.batches = 0
+        self.largest = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, handle, key):
+        """Queue one row (a tuple of FEATURES values) for ``handle``'s model; returns a Future."""
+        if not self._thread.is_alive():
+            with self._lock:
+                if not self._thread.is_alive():
+                    self.restarts += 1
+                    self._start()
+        future = Future()
+        self._queue.put((handle, key, future))
+        return future
+
+    def predict(self, handle, key):
+        future = self.submit(handle, key)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            return float(handle.predict(pd.DataFrame([key], columns=FEATURES))[0])
+
+    def _collect(self, batch):
+        batch.append(self._queue.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _score(self, batch):
+        # Rows queued against different versions of the model (around a
+        # reload) are scored by the version they asked for
+        by_version = {}
+        for handle, key, future in batch:
+            by_version.setdefault(handle.version, (handle, []))[1].append((key, future))
+        for handle, requests in by_version.values():
+            keys = list(dict.fromkeys(key for key, future in requests))
+            try:
+                with span("predict micro-batch"):
+                    predictions = handle.predict(pd.DataFrame(keys, columns=FEATURES))
+            except Exception as error:
+                for key, future in requests:
+                    future.set_exception(error)
+                continue
+            by_key = dict(zip(keys, predictions.tolist()))
+            for key, future in requests:
+                future.set_result(float(by_key[key]))
+        self.requests += len(batch)
+        self.batches += 1
+        self.largest = max(self.largest, len(batch))
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                self._collect(batch)
+                self._score(batch)
+            except Exception as error:
+                # Whatever went wrong, no caller is left waiting on this batch
+                for handle, key, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def stats(self):
+        with self._lock:
+            timeouts, restarts = self.timeouts, self.restarts
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean batch': self.requests / self.batches if self.batches else 0.0,
+            'largest batch': self.largest,
+            'queued': self._queue.qsize(),
+            'timeouts': timeouts,
+            'restarts': restarts,
+            'max batch': self.max_batch,
+            'max wait (ms)': self.max_wait * 1000,
+        }
+
+
+_batchers = {}
+_lock = threading.Lock()
+
+
+def get_batcher(name):
+    """The shared batcher for model ``name``, started on first use."""
+    batcher = _batchers.get(name)
+    if batcher is None:
+        with _lock:
+            batcher = _batchers.get(name)
+            if batcher is None:
+                batcher = _batchers[name] = MicroBatcher(name)
+    return batcher
+
+
+def batch_stats():
+    return {name: batcher.stats() for name, batcher in list(_batchers.items())}
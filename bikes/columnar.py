@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bikes.data import (CLEANED_CSV, CLEANED_DTYPES, HOURLY_CSV, HOURLY_DTYPES, REAL_PRED_CSV, REAL_PRED_DTYPES,
+                        ROOT, _signature, fingerprint)
+from bikes.schema import COMPACT_DTYPES, memory_row
+from bikes.timing import cache_lookup, span
+
+# Typed columnar copies of the CSV datasets, so a page can read just the
+# columns it needs without parsing any text:
+#
+#   python -m bikes.columnar [--format parquet|feather]
+#   load_columns('hourly', ['temp', 'hum', 'windspeed', 'cnt'])
+#
+# Columns are stored downcast (bikes.schema.COMPACT_DTYPES) and come back
+# that way. The manifest records the content hash of the CSV each file was
+# written from; when the CSV has changed since (e.g. after python -m
+# bikes.ingest), or no file was written, load_columns() reads the CSV instead
+# and returns the same columns and dtypes.
+
+COLUMNAR_DIR = ROOT / "columnar"
+MANIFEST = "manifest.json"
+FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+
+DATASETS = {
+    'hourly': (HOURLY_CSV, HOURLY_DTYPES),
+    'cleaned': (CLEANED_CSV, CLEANED_DTYPES),
+    'real_pred': (REAL_PRED_CSV, REAL_PRED_DTYPES),
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(Path(out_dir) / MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _stored_path(name, out_dir):
+    # The columnar file for ``name`` if it is current with its CSV, else None
+    entry = _read_manifest(out_dir).get(name)
+    if entry is None or entry.get('source') != fingerprint(DATASETS[name][0]):
+        return None
+    path = Path(out_dir) / f"{name}{FORMATS[entry['format']]}"
+    return path if path.exists() else None
+
+
+def _read_csv(name, columns):
+    path, dtypes = DATASETS[name]
+    frame = pd.read_csv(path, usecols=columns, dtype={column: dtypes[column] for column in columns})
+    return frame[columns].astype({column: COMPACT_DTYPES[name][column] for column in columns})
+
+
+def _read_stored(name, path, columns):
+    if path.suffix == '.feather':
+        frame = pd.read_feather(path, columns=columns)
+    else:
+        frame = pd.read_parquet(path, columns=columns)
+    # Parquet keeps integer categories as plain integers
+    return frame.astype({column: COMPACT_DTYPES[name][column] for column in columns})
+
+
+def load_columns(name, columns=None, out_dir=COLUMNAR_DIR):
+    """Read ``columns`` (default: all) of dataset ``name`` with their storage dtypes.
+
+    Cached per process like the CSV loaders; the frame is shared, so copy it
+    before modifying.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset: {name}")
+    columns = list(COMPACT_DTYPES[name]) if columns is None else list(columns)
+    unknown = [column for column in columns if column not in COMPACT_DTYPES[name]]
+    if unknown:
+        raise KeyError(f"Unknown columns for {name}: {', '.join(unknown)}")
+
+    key = (name, tuple(columns), str(out_dir))
+    # Re-check when either the CSV or the columnar store changes
+    manifest = Path(out_dir) / MANIFEST
+    signature = (_signature(DATASETS[name][0]), _signature(manifest) if manifest.exists() else None)
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == signature:
+        cache_lookup('columns', True)
+        return entry[1]
+
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == signature:
+            cache_lookup('columns', True)
+            return entry[1]
+        cache_lookup('columns', False)
+        path = _stored_path(name, out_dir)
+        if path is not None:
+            with span("columnar read"):
+                frame = _read_stored(name, path, columns)
+        else:
+            with span("csv parse"):
+                frame = _read_csv(name, columns)
+        _cache[key] = (signature, frame)
+        return frame
+
+
+def convert(names=None, out_dir=COLUMNAR_DIR, file_format='parquet'):
+    """Write typed columnar copies of the CSV datasets to ``out_dir``."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = list(DATASETS) if names is None else list(names)
+    manifest = _read_manifest(out_dir)
+    for name in names:
+        csv_path, dtypes = DATASETS[name]
+        source = fingerprint(csv_path)
+        frame = pd.read_csv(csv_path, dtype=dtypes).astype(COMPACT_DTYPES[name])
+        path = out_dir / f"{name}{FORMATS[file_format]}"
+        tmp = out_dir / f".{path.name}.tmp"
+        if file_format == 'feather':
+            frame.to_feather(tmp)
+        else:
+            frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        # Drop a copy in the other format, so only one is ever current
+        for other in FORMATS.values():
+            if other != path.suffix and (out_dir / f"{name}{other}").exists():
+                os.remove(out_dir / f"{name}{other}")
+        manifest[name] = {'source': source, 'format': file_format, 'rows': len(frame),
+                          'built_at': time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    tmp = out_dir / f".{MANIFEST}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, out_dir / MANIFEST)
+    return manifest
+
+
+def memory_report():
+    """Memory held by each cached column selection (see bikes.data.memory_report)."""
+    return [memory_row(f"{name}: {', '.join(columns)}", name, frame)
+            for (name, columns, out_dir), (signature, frame) in list(_cache.items())]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the CSV datasets to typed columnar files.")
+    parser.add_argument("--format", choices=list(FORMATS), default='parquet')
+    parser.add_argument("--out", default=str(COLUMNAR_DIR))
+    parser.add_argument("datasets", nargs="*", help=f"Datasets to convert: {', '.join(DATASETS)} (default: all).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = convert(args.datasets or None, args.out, args.format)
+    for name in args.datasets or DATASETS:
+        path = Path(args.out) / f"{name}{FORMATS[args.format]}"
+        print(f"{name}: {manifest[name]['rows']:,} rows, {DATASETS[name][0].stat().st_size / 1e6:.2f} MB csv -> "
+              f"{path.stat().st_size / 1e6:.2f} MB {args.format}")
+    print(f"Done in {time.perf_counter() - start:.2f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
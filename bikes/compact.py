@@ -0,0 +1,133 @@
+import argparse
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from bikes.data import ROOT
+from bikes.models import get_model, model_path
+
+# A fitted sklearn forest flattened into a few typed NumPy arrays, plus a
+# vectorized predict. Exported models are plain joblib files, so the model
+# registry loads (and can memory-map) them like any other:
+#
+#   python -m bikes.compact --model Model3          -> Model3-compact.joblib
+#   get_model("Model3-compact").predict(X)
+#
+# Per node this keeps the split feature (int8), the threshold and value
+# (float32) and the two children (int16 or int32, local to their tree) -
+# about 13 bytes against roughly 70 in sklearn's tree structs.
+#
+# Predictions match the original model to within float32 rounding of the leaf
+# values (TOLERANCE, in rentals). Splits are exact: each threshold is rounded
+# down to the nearest float32, and sklearn compares float32 inputs anyway.
+
+TOLERANCE = 1e-3
+
+# Rows scored per pass; bounds the (trees x rows) index arrays
+CHUNK_ROWS = 4096
+
+
+class CompactForest:
+    def __init__(self, feature, threshold, left, right, value, offsets, max_depth, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.offsets = offsets
+        self.max_depth = max_depth
+        self.feature_names_in_ = feature_names
+        self.n_estimators = len(offsets)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.left, self.right,
+                                               self.value, self.offsets))
+
+    def _predict_chunk(self, X):
+        rows = np.arange(len(X))
+        # One cursor per (tree, row), as a node index local to its tree
+        node = np.zeros((self.n_estimators, len(X)), dtype=np.int64)
+        offsets = self.offsets[:, None]
+        for _ in range(self.max_depth):
+            index = offsets + node
+            go_left = X[rows, self.feature[index]] <= self.threshold[index]
+            # Leaves point at themselves, so finished cursors stay put
+            node = np.where(go_left, self.left[index], self.right[index])
+        return self.value[offsets + node].astype(np.float64).mean(axis=0)
+
+    def predict(self, X):
+        if hasattr(X, "columns"):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names_in_):
+            raise ValueError(f"Expected {len(self.feature_names_in_)} features, got shape {X.shape}")
+        return np.concatenate([self._predict_chunk(X[start:start + CHUNK_ROWS])
+                               for start in range(0, len(X), CHUNK_ROWS)] or [np.empty(0)])
+
+
+def _float32_at_most(threshold):
+    # Largest float32 <= threshold, so that (x <= t32) == (x <= threshold) for
+    # every float32 x
+    t32 = threshold.astype(np.float32)
+    too_big = t32.astype(np.float64) > threshold
+    t32[too_big] = np.nextafter(t32[too_big], np.float32(-np.inf))
+    return t32
+
+
+def export_forest(model):
+    """Flatten a fitted single-output sklearn forest (or tree) regressor."""
+    estimators = getattr(model, "estimators_", [model])
+    trees = [estimator.tree_ for estimator in estimators]
+    if any(tree.n_outputs != 1 for tree in trees):
+        raise ValueError("Only single-output regressors can be exported")
+
+    largest = max(tree.node_count for tree in trees)
+    child_dtype = np.int16 if largest <= np.iinfo(np.int16).max else np.int32
+    feature_dtype = np.int8 if model.n_features_in_ <= np.iinfo(np.int8).max else np.int16
+
+    features, thresholds, lefts, rights, values = [], [], [], [], []
+    for tree in trees:
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        features.append(np.where(leaf, 0, tree.feature).astype(feature_dtype))
+        thresholds.append(np.where(leaf, np.inf, _float32_at_most(tree.threshold)).astype(np.float32))
+        lefts.append(np.where(leaf, nodes, tree.children_left).astype(child_dtype))
+        rights.append(np.where(leaf, nodes, tree.children_right).astype(child_dtype))
+        values.append(tree.value[:, 0, 0].astype(np.float32))
+
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]]).astype(np.int64)
+    feature_names = getattr(model, "feature_names_in_", np.array([f"x{i}" for i in range(model.n_features_in_)]))
+    return CompactForest(np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+                         np.concatenate(rights), np.concatenate(values), offsets,
+                         max(tree.max_depth for tree in trees), np.asarray(feature_names, dtype=object))
+
+
+def compact_name(model_name):
+    return f"{model_name}-compact"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a fitted forest to the compact array format.")
+    parser.add_argument("--model", default="Model3", help="Registered model to export.")
+    parser.add_argument("--out", help="Output file (default: <model>-compact.joblib next to the model).")
+    args = parser.parse_args()
+
+    # Pickle the class as bikes.compact.CompactForest, not __main__'s copy
+    from bikes.compact import export_forest
+
+    out = Path(args.out) if args.out else ROOT / f"{compact_name(args.model)}.joblib"
+    model = get_model(args.model).model
+    start = time.perf_counter()
+    compact = export_forest(model)
+    # Uncompressed, so the registry can memory-map the arrays (BIKES_MODEL_MMAP=r)
+    joblib.dump(compact, out)
+    print(f"Exported {compact.n_estimators} trees, {len(compact.value):,} nodes in {time.perf_counter() - start:.1f}s")
+    print(f"{model_path(args.model)}: {model_path(args.model).stat().st_size / 1e6:.1f} MB -> "
+          f"{out}: {out.stat().st_size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bikes.columnar import load_columns
+from bikes.timing import cache_lookup, span
+
+# Correlation matrices for the heatmaps, kept as running statistics over the
+# hourly data instead of recomputed with DataFrame.corr() on every rerun.
+#
+# RunningCorrelation holds the row count, column means and the matrix of
+# centred sums of squares and cross-products (co-moments). Adding m rows costs
+# O(m * k^2) for k columns, and reading the matrix O(k^2), whatever the
+# length of the history. Centred sums are the numerically stable form of
+# plain sums / sums of squares: same information, no cancellation.
+
+# Numeric columns of the hourly data shown on the Model page heatmap, in
+# table order. The Recommendations heatmap uses a subset of them.
+CORRELATION_COLUMNS = ['season', 'mnth', 'hr', 'holiday', 'weekday', 'workingday', 'weathersit',
+                       'temp', 'atemp', 'hum', 'windspeed', 'cnt']
+
+
+class RunningCorrelation:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+    def copy(self):
+        other = RunningCorrelation(self.columns)
+        other.n, other.mean, other.comoment = self.n, self.mean.copy(), self.comoment.copy()
+        return other
+
+    def _add(self, n, mean, comoment):
+        # Combine two sets of statistics (Chan et al.'s pairwise update)
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.n * n / total)
+        self.mean = self.mean + delta * (n / total)
+        self.n = total
+
+    def update(self, frame):
+        """Add the rows of ``frame``; rows with a missing value are skipped."""
+        X = frame[self.columns].astype(np.float64).to_numpy()
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X) == 0:
+            return self
+        mean = X.mean(axis=0)
+        centred = X - mean
+        self._add(len(X), mean, centred.T @ centred)
+        return self
+
+    def merge(self, other):
+        """Add the statistics of another RunningCorrelation over the same columns."""
+        if other.columns != self.columns:
+            raise ValueError("Can only merge statistics over the same columns")
+        self._add(other.n, other.mean, other.comoment)
+        return self
+
+    def covariance(self):
+        return pd.DataFrame(self.comoment / (self.n - 1) if self.n > 1 else np.nan,
+                            index=self.columns, columns=self.columns)
+
+    def correlation(self, columns=None):
+        """Pearson correlation matrix, as DataFrame.corr() returns it."""
+        columns = self.columns if columns is None else list(columns)
+        positions = [self.columns.index(column) for column in columns]
+        comoment = self.comoment[np.ix_(positions, positions)]
+        scale = np.sqrt(np.diag(comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Constant columns have no correlation (NaN), as in pandas
+            matrix = np.clip(comoment / np.outer(scale, scale), -1, 1)
+        np.fill_diagonal(matrix, np.where(scale > 0, 1.0, np.nan))
+        return pd.DataFrame(matrix, index=columns, columns=columns)
+
+
+# The statistics over the hourly data: (frame they were computed from,
+# rows of it counted, RunningCorrelation)
+_hourly = None
+_lock = threading.Lock()
+
+
+def _appended(previous, rows, hourly):
+    # The hourly file only ever grows; the rows already counted can be kept if
+    # the record at the boundary is still the same one
+    return (previous is not None and 0 < rows <= len(hourly)
+            and hourly['instant'].iat[rows - 1] == previous['instant'].iat[rows - 1])
+
+
+def hourly_state():
+    """Running statistics over the current hourly data.
+
+    When the hourly file has grown since they were computed, only the new rows
+    are added; any other change recomputes them from scratch. The returned
+    object is shared: don't update it.
+    """
+    global _hourly
+    # Only the columns it needs, downcast; 'instant' marks where appended rows start
+    hourly = load_columns('hourly', ['instant'] + CORRELATION_COLUMNS)
+    entry = _hourly
+    if entry is not None and entry[0] is hourly:
+        cache_lookup('correlation', True)
+        return entry[2]
+
+    with _lock:
+        entry = _hourly
+        if entry is not None and entry[0] is hourly:
+            cache_lookup('correlation', True)
+            return entry[2]
+        cache_lookup('correlation', False)
+        with span("correlation"):
+            if entry is not None and _appended(entry[0], entry[1], hourly):
+                state = entry[2].copy().update(hourly.iloc[entry[1]:])
+            else:
+                state = RunningCorrelation(CORRELATION_COLUMNS).update(hourly)
+        _hourly = (hourly, len(hourly), state)
+        return state
+
+
+def hourly_correlation(columns=None):
+    """Correlation matrix of ``columns`` (default: CORRELATION_COLUMNS) over the hourly data."""
+    return hourly_state().correlation(columns)
+
+
+def clear_cache():
+    global _hourly
+    with _lock:
+        _hourly = None
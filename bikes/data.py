@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from bikes.schema import CLEANED_DTYPES, COMPACT_DTYPES, HOURLY_DTYPES, REAL_PRED_DTYPES, memory_row
+from bikes.timing import cache_lookup, span
+
+# Every Streamlit page reruns top to bottom on each widget interaction, so the
+# datasets are parsed once per server process and kept here. An entry is
+# reloaded only when the file on disk changes (different mtime or size).
+#
+# The returned frames are shared between all pages and sessions: treat them as
+# read-only and .copy() or .assign() before adding columns. They are held at
+# the compact dtypes from bikes.schema; use schema.widen() where full-width
+# numbers matter (e.g. to sum or to feed a model).
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HOURLY_CSV = ROOT / "bike-sharing_hourly.csv"
+CLEANED_CSV = ROOT / "cleaned_data.csv"
+REAL_PRED_CSV = ROOT / "real_pred.csv"
+
+# Written by benchmarks/bench_models.py, shown on the Model page
+MODEL_COMPARISON_CSV = ROOT / "model_comparison.csv"
+
+DATASET_FILES = {
+    'hourly': HOURLY_CSV,
+    'cleaned': CLEANED_CSV,
+    'real_pred': REAL_PRED_CSV,
+}
+
+_cache = {}
+_fingerprints = {}
+_lock = threading.Lock()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_csv(path, dtype=None, compact=None):
+    """Read a CSV once per process, re-reading it only if the file changed.
+
+    Columns are parsed as ``dtype`` and then, if given, cast to ``compact``.
+    """
+    path = Path(path)
+    key = (str(path), tuple(sorted(dtype.items())) if dtype else None,
+           tuple(sorted((column, str(value)) for column, value in compact.items())) if compact else None)
+    signature = _signature(path)
+
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == signature:
+        cache_lookup('datasets', True)
+        return entry[1]
+
+    with _lock:
+        # Another session may have loaded it while we waited for the lock
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == signature:
+            cache_lookup('datasets', True)
+            return entry[1]
+        cache_lookup('datasets', False)
+        with span("csv parse"):
+            frame = pd.read_csv(path, dtype=dtype)
+            if compact:
+                frame = frame.astype(compact)
+        _cache[key] = (signature, frame)
+        return frame
+
+
+def fingerprint(path):
+    """Content hash of a file, recomputed only when its mtime or size changes.
+
+    Unlike the mtime this survives a fresh git checkout, so it can be written
+    next to anything built from the file to tell whether it is still current.
+    """
+    path = Path(path)
+    signature = _signature(path)
+    entry = _fingerprints.get(str(path))
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    digest = hashlib.md5(path.read_bytes()).hexdigest()
+    _fingerprints[str(path)] = (signature, digest)
+    return digest
+
+
+def load_hourly():
+    return load_csv(HOURLY_CSV, HOURLY_DTYPES, COMPACT_DTYPES['hourly'])
+
+
+def load_cleaned():
+    return load_csv(CLEANED_CSV, CLEANED_DTYPES, COMPACT_DTYPES['cleaned'])
+
+
+def load_real_pred():
+    return load_csv(REAL_PRED_CSV, REAL_PRED_DTYPES, COMPACT_DTYPES['real_pred'])
+
+
+def memory_report():
+    """Memory held by each cached dataset, against the same frame at the CSV dtypes.
+
+    The frames are shared by every session in the process, so each session
+    saves the whole CSV-dtype size over keeping a copy of its own.
+    """
+    names = {str(path): name for name, path in DATASET_FILES.items()}
+    return [memory_row(Path(key[0]).name, names[key[0]], frame)
+            for key, (signature, frame) in list(_cache.items()) if key[0] in names]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _fingerprints.clear()
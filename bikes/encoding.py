@@ -0,0 +1,256 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from bikes.features import ATEMP_SCALE, HUM_SCALE, WINDSPEED_SCALE
+
+# Translate the Simulator's inputs into the numbers the model was trained on.
+#
+# Everything is driven by the lookup tables below, so the same code encodes a
+# single scenario from the Simulator page and whole columns of them for batch
+# scoring and the HTTP service. Inputs are validated on the way in. A single
+# scenario takes a plain-Python path over the same tables, since numpy's
+# per-call overhead would dominate one row.
+
+# Model3's input columns, in training order
+FEATURES = ['season', 'mnth', 'hr', 'weekday', 'workingday', 'weathersit', 'atemp', 'hum', 'windspeed', 'day']
+
+# The Simulator's inputs, as the user enters them
+INPUTS = ['season', 'month', 'day', 'hour', 'day_of_week', 'temperature_feel', 'humidity', 'wind', 'weather']
+
+# Choices offered for each categorical input
+SEASONS = ["Winter", "Spring", "Summer", "Autumn"]
+SEASON_MONTHS = {
+    "Winter": ["December", "January", "February", "March"],
+    "Spring": ["March", "April", "May", "June"],
+    "Summer": ["June", "July", "August", "September"],
+    "Autumn": ["September", "October", "November", "December"],
+}
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEATHER = ["Clear; or Partly Cloudy",
+           "Misty and Cloudy; or Misty",
+           "Light Snow; or Light Rain and Scattered Clouds with or without Thunderstorm",
+           "Snow and Fog; or Heavy Rain, Ice, and Thunderstorms"]
+
+# Codes, as the Simulator has always sent them to the model
+SEASON_CODES = {"Winter": 1, "Spring": 2, "Summer": 3, "Autumn": 4}
+MONTH_CODES = {"January": 1, "February": 2, "March": 3, "April": 4, "May": 5, "June": 6,
+               "July": 7, "August": 8, "September": 9, "October": 10, "November": 11, "December": 12}
+DAY_OF_WEEK_CODES = {"Sunday": 0, "Monday": 1, "Tuesday": 2, "Wednesday": 3,
+                     "Thursday": 4, "Friday": 5, "Saturday": 6}
+WEATHER_CODES = dict(zip(WEATHER, [1, 2, 3, 4]))
+
+# 'weekday' flag fed to the model, indexed by day-of-week code: 0 for Monday
+# and Friday, 1 otherwise. 'workingday' is derived from it and always equal.
+WEEKDAY_FLAGS = np.array([1, 0, 1, 1, 1, 0, 1])
+
+# Longest month lengths (February can have 29 days)
+DAYS_IN_MONTH = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# (month code, season code) pairs the Simulator offers
+_SEASON_OF_MONTH = np.zeros((13, 5), dtype=bool)
+for _season, _months in SEASON_MONTHS.items():
+    for _month in _months:
+        _SEASON_OF_MONTH[MONTH_CODES[_month], SEASON_CODES[_season]] = True
+
+# Allowed (inclusive) range of each numeric input
+RANGES = {
+    'day': (1, 31),
+    'hour': (0, 23),
+    'temperature_feel': (0, 50),
+    'humidity': (0, 100),
+    'wind': (0, 67),
+}
+
+
+class EncodingError(ValueError):
+    pass
+
+
+def _describe(name, values, bad, limit=3):
+    shown = ", ".join(repr(value) for value in pd.unique(pd.Series(values[bad], dtype=object))[:limit])
+    return f"{name}: {int(bad.sum())} invalid value(s), e.g. {shown}"
+
+
+def _lookup(table, values, name, errors):
+    # Dictionary lookup over a column; unknown values get code 0 and are reported
+    if len(values) <= 64:
+        # Plain dict lookups beat building pandas indexes for a handful of rows
+        codes = np.array([table.get(value, -1) for value in values], dtype=np.int64)
+    else:
+        index = pd.Index(list(table), dtype=object)
+        positions = index.get_indexer(pd.Index(values, dtype=object))
+        codes = np.fromiter(table.values(), dtype=np.int64)[positions]
+        codes[positions < 0] = -1
+    bad = codes < 0
+    if bad.any():
+        errors.append(_describe(name, values, bad))
+        codes[bad] = 0
+    return codes
+
+
+def _code(table, value, name, errors):
+    try:
+        code = table.get(value, -1)
+    except TypeError:
+        code = -1
+    if code < 0:
+        errors.append(_describe(name, np.array([value], dtype=object), np.array([True])))
+        return 0
+    return code
+
+
+# The tables above as Python lists, for _encode_one
+_SEASON_OF_MONTH_LIST = _SEASON_OF_MONTH.tolist()
+_DAYS_IN_MONTH_LIST = DAYS_IN_MONTH.tolist()
+_WEEKDAY_FLAGS_LIST = WEEKDAY_FLAGS.tolist()
+
+
+# Types np.ndim() needn't be asked about (it turns a string into an array first)
+_PLAIN = {str, int, float}
+_PLAIN_NUMBERS = {int, float}
+
+
+def _encode_one(season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather, validate):
+    # encode() for one scenario in plain Python: the Simulator's case, where
+    # numpy's per-call overhead costs far more than the lookups themselves.
+    # Checks and messages are the same as for columns.
+    errors = []
+    season_code = _code(SEASON_CODES, season, 'season', errors)
+    month_code = _code(MONTH_CODES, month, 'month', errors)
+    day_of_week_code = _code(DAY_OF_WEEK_CODES, day_of_week, 'day_of_week', errors)
+    weather_code = _code(WEATHER_CODES, weather, 'weather', errors)
+
+    raw = dict(zip(RANGES, (day, hour, temperature_feel, humidity, wind)))
+    numbers = {}
+    for name, (low, high) in RANGES.items():
+        try:
+            value = raw[name]
+            value = float(value) if type(value) in _PLAIN_NUMBERS else float(np.float64(value))
+        except (TypeError, ValueError):
+            raise EncodingError(f"{name} must be numeric")
+        if validate:
+            bad = not low <= value <= high
+            if name in ('day', 'hour'):
+                bad = bad or value != math.floor(value)
+            if bad:
+                errors.append(_describe(name, np.atleast_1d(np.asarray(raw[name])), np.array([True])))
+        numbers[name] = value
+
+    if validate:
+        if season_code and month_code and not _SEASON_OF_MONTH_LIST[month_code][season_code]:
+            errors.append(_describe("month not in season", np.array([f"{month} in {season}"]), np.array([True])))
+        if month_code and math.isfinite(numbers['day']) and numbers['day'] > _DAYS_IN_MONTH_LIST[month_code]:
+            errors.append(_describe("no such date", np.array([f"{month} {numbers['day']:g}"]), np.array([True])))
+    if errors:
+        raise EncodingError("; ".join(errors))
+
+    weekday = _WEEKDAY_FLAGS_LIST[day_of_week_code]
+    return {
+        'season': season_code,
+        'mnth': month_code,
+        'hr': int(numbers['hour']),
+        'weekday': weekday,
+        'workingday': weekday,
+        'weathersit': weather_code,
+        'atemp': numbers['temperature_feel'] / ATEMP_SCALE,
+        'hum': numbers['humidity'] / HUM_SCALE,
+        'windspeed': numbers['wind'] / WINDSPEED_SCALE,
+        'day': int(numbers['day']),
+    }
+
+
+def encode(season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather, validate=True):
+    """Encode Simulator inputs into model features.
+
+    Takes either one scenario (scalars), returning a dict keyed by FEATURES,
+    or columns of them (lists, arrays or Series of equal length; scalars are
+    broadcast), returning a DataFrame. Raises EncodingError for unknown
+    choices and, unless ``validate=False``, for out-of-range numbers and
+    impossible dates such as February 31 or a month outside its season.
+    """
+    inputs = [season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather]
+    if all(type(value) in _PLAIN or np.ndim(value) == 0 for value in inputs):
+        return _encode_one(*inputs, validate)
+    index = next((value.index for value in inputs if isinstance(value, pd.Series)), None)
+    arrays = [np.asarray(value) if name in RANGES else np.asarray(value, dtype=object)
+              for name, value in zip(INPUTS, inputs)]
+    columns = dict(zip(INPUTS, np.broadcast_arrays(*arrays)))
+    columns = {name: np.atleast_1d(values) for name, values in columns.items()}
+
+    errors = []
+    season_code = _lookup(SEASON_CODES, columns['season'], 'season', errors)
+    month_code = _lookup(MONTH_CODES, columns['month'], 'month', errors)
+    day_of_week_code = _lookup(DAY_OF_WEEK_CODES, columns['day_of_week'], 'day_of_week', errors)
+    weather_code = _lookup(WEATHER_CODES, columns['weather'], 'weather', errors)
+
+    numbers = {}
+    for name, (low, high) in RANGES.items():
+        try:
+            values = columns[name].astype(np.float64)
+        except (TypeError, ValueError):
+            raise EncodingError(f"{name} must be numeric")
+        if validate:
+            bad = ~((values >= low) & (values <= high))
+            if name in ('day', 'hour'):
+                bad |= values != np.floor(values)
+            if bad.any():
+                errors.append(_describe(name, columns[name], bad))
+        numbers[name] = values
+
+    if validate:
+        known = (season_code > 0) & (month_code > 0)
+        bad = known & ~_SEASON_OF_MONTH[month_code, season_code]
+        if bad.any():
+            pairs = np.array([f"{month} in {season}" for month, season in zip(columns['month'], columns['season'])])
+            errors.append(_describe("month not in season", pairs, bad))
+        known = (month_code > 0) & np.isfinite(numbers['day'])
+        bad = known & (numbers['day'] > DAYS_IN_MONTH[month_code])
+        if bad.any():
+            dates = np.array([f"{month} {day:g}" for month, day in zip(columns['month'], numbers['day'])])
+            errors.append(_describe("no such date", dates, bad))
+    if errors:
+        raise EncodingError("; ".join(errors))
+
+    weekday = WEEKDAY_FLAGS[day_of_week_code]
+    encoded = {
+        'season': season_code,
+        'mnth': month_code,
+        'hr': numbers['hour'].astype(np.int64),
+        'weekday': weekday,
+        'workingday': weekday.copy(),
+        'weathersit': weather_code,
+        'atemp': numbers['temperature_feel'] / ATEMP_SCALE,
+        'hum': numbers['humidity'] / HUM_SCALE,
+        'windspeed': numbers['wind'] / WINDSPEED_SCALE,
+        'day': numbers['day'].astype(np.int64),
+    }
+    return pd.DataFrame(encoded, index=index)
+
+
+def encode_inputs(season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather):
+    """One Simulator scenario as a row of model features (a dict keyed by FEATURES)."""
+    return encode(season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather)
+
+
+def encode_frame(raw):
+    """Encode a frame of Simulator inputs (columns named as INPUTS) into FEATURES."""
+    missing = [name for name in INPUTS if name not in raw.columns]
+    if missing:
+        raise EncodingError(f"Missing scenario inputs: {', '.join(missing)}")
+    return encode(*[raw[name] for name in INPUTS])
+
+
+def scenario_grid(**options):
+    """Every combination of the given Simulator inputs, one scenario per row.
+
+    Each keyword is one of INPUTS and takes a list of values, e.g.
+    ``scenario_grid(hour=range(24), day_of_week=["Monday", "Sunday"], ...)``.
+    Returns the raw inputs; pass them to encode_frame() for the model.
+    """
+    missing = [name for name in INPUTS if name not in options]
+    if missing:
+        raise ValueError(f"Missing scenario inputs: {', '.join(missing)}")
+    index = pd.MultiIndex.from_product([list(options[name]) for name in INPUTS], names=INPUTS)
+    return index.to_frame(index=False)
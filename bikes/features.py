@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from bikes.schema import CLEANED_DTYPES
+
+# Columnar versions of the small transforms the pages used to do row by row
+# with .apply(lambda ...). Each returns exactly what the lambda produced.
+
+# The hourly file stores weather normalised to [0, 1]; these undo that
+# (temperature feel in C, humidity in %, windspeed in knots).
+ATEMP_SCALE = 50
+HUM_SCALE = 100
+WINDSPEED_SCALE = 67
+
+
+def day_of_month(dteday):
+    """Zero-padded day of the month ("01".."31") from the dteday column.
+
+    Same as ``str(x)[-2:]`` per row, i.e. kept as a string.
+    """
+    return dteday.astype(str).str[-2:]
+
+
+def day_number(dteday):
+    """Day of the month as an integer (1..31), parsed as a date."""
+    return pd.to_datetime(dteday, format="%Y-%m-%d").dt.day.astype("int64")
+
+
+def clean_hourly(hourly):
+    """The cleaned_data.csv rows (model features plus 'cnt') for rows of the hourly data."""
+    return hourly.assign(day=day_number(hourly['dteday']))[list(CLEANED_DTYPES)]
+
+
+def unscale_weather(frame):
+    """Temperature feel, humidity and windspeed in real units.
+
+    Returns a frame with 'atemp' (C), 'Humidity' (%) and 'Windspeed' (knots)
+    aligned with ``frame``.
+    """
+    return pd.DataFrame({
+        'atemp': frame['atemp'] * ATEMP_SCALE,
+        'Humidity': frame['hum'] * HUM_SCALE,
+        'Windspeed': frame['windspeed'] * WINDSPEED_SCALE,
+    }, index=frame.index)
+
+
+def yes_no(values):
+    """'No' where the value is 0 and 'Yes' otherwise, for legends."""
+    return pd.Series(np.where(values.to_numpy() == 0, 'No', 'Yes'), index=values.index, name=values.name)
@@ -0,0 +1,228 @@
+import argparse
+import csv
+import io
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bikes.aggregates import (AGGREGATES, STORE_DIR, _sources, combine_partials, finalize_aggregate,
+                              partial_aggregate, write_store)
+from bikes.data import CLEANED_CSV, HOURLY_CSV, load_csv
+from bikes.features import clean_hourly
+from bikes.schema import CLEANED_DTYPES, HOURLY_DTYPES
+
+# New rental hours arrive as records in the hourly file's format. They are
+# read from an append-only CSV (a stand-in for a queue) in chunks:
+#
+#   python -m bikes.ingest incoming_hourly.csv [--follow]
+#
+# Each chunk is validated, appended to bike-sharing_hourly.csv and
+# cleaned_data.csv, and added to running totals behind every aggregate (see
+# bikes.aggregates), which are then written back to the aggregate store. The
+# app picks the new tables up on its next rerun without re-reading the CSVs
+# for them. Only one ingestor should write to a dataset at a time.
+#
+# Records whose instant is not after the last one already in the dataset are
+# skipped, so a source can be replayed from the start after a restart.
+
+CHUNK_ROWS = 1_000
+
+# The dataset's yr column counts years from this one
+FIRST_YEAR = 2011
+
+# Allowed (inclusive) range of each numeric column of the hourly data
+HOURLY_RANGES = {
+    'instant': (1, np.inf),
+    'season': (1, 4),
+    'yr': (0, np.inf),
+    'mnth': (1, 12),
+    'hr': (0, 23),
+    'holiday': (0, 1),
+    'weekday': (0, 6),
+    'workingday': (0, 1),
+    'weathersit': (1, 4),
+    'temp': (0, 1),
+    'atemp': (0, 1),
+    'hum': (0, 1),
+    'windspeed': (0, 1),
+    'casual': (0, np.inf),
+    'registered': (0, np.inf),
+    'cnt': (0, np.inf),
+}
+
+
+class IngestError(ValueError):
+    pass
+
+
+def validate_records(raw, after_instant=0):
+    """Split raw hourly records into rows to ingest and rejected rows.
+
+    ``raw`` has the hourly file's columns, as strings or numbers. Returns
+    (valid, rejected, skipped): the valid rows typed as the CSV is parsed
+    (HOURLY_DTYPES), the rejected rows with the first problem found in
+    'reason', and the number of valid rows skipped because their instant is
+    not after ``after_instant`` or an earlier row's.
+    """
+    columns = list(HOURLY_DTYPES)
+    if list(raw.columns) != columns:
+        raise IngestError(f"Expected columns {', '.join(columns)}; got {', '.join(map(str, raw.columns))}")
+    raw = raw.reset_index(drop=True)
+    reasons = pd.Series('', index=raw.index, dtype=object)
+
+    def reject(bad, reason):
+        reasons[bad & (reasons == '')] = reason
+
+    numbers = {}
+    for column, (low, high) in HOURLY_RANGES.items():
+        values = pd.to_numeric(raw[column], errors='coerce').astype('float64')
+        bad = values.isna() | (values < low) | (values > high)
+        if HOURLY_DTYPES[column] == 'int64':
+            bad |= values != np.floor(values)
+        reject(bad, f"{column} missing, not a number or out of range")
+        numbers[column] = values
+
+    dates = pd.to_datetime(raw['dteday'], format='%Y-%m-%d', errors='coerce')
+    reject(dates.isna(), "dteday is not a YYYY-MM-DD date")
+    # weekday counts from Sunday = 0
+    reject(dates.notna() & ((numbers['yr'] != dates.dt.year - FIRST_YEAR)
+                            | (numbers['mnth'] != dates.dt.month)
+                            | (numbers['weekday'] != (dates.dt.dayofweek + 1) % 7)),
+           "yr, mnth or weekday disagrees with dteday")
+    reject(numbers['cnt'] != numbers['casual'] + numbers['registered'], "cnt is not casual + registered")
+
+    ok = (reasons == '').to_numpy()
+    valid = pd.DataFrame({column: raw['dteday'].astype(str) if column == 'dteday' else numbers[column]
+                          for column in columns})[ok].astype(HOURLY_DTYPES)
+    instants = valid['instant'].to_numpy()
+    latest = np.maximum.accumulate(np.concatenate([[after_instant], instants]))[:-1]
+    new = instants > latest
+    rejected = raw[~ok].assign(reason=reasons[~ok])
+    return valid[new].reset_index(drop=True), rejected, int((~new).sum())
+
+
+def _append_csv(frame, path):
+    frame.to_csv(path, mode='a', header=False, index=False)
+
+
+def read_lines(path, offset=0, max_lines=CHUNK_ROWS):
+    """Up to ``max_lines`` complete lines of ``path`` from byte ``offset``.
+
+    Returns (lines, offset after them). A last line without its newline is
+    still being written and is left for the next read.
+    """
+    lines = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            lines.append(line)
+            offset += len(line)
+            if len(lines) == max_lines:
+                break
+    return lines, offset
+
+
+class Ingestor:
+    """Appends validated hourly records to the dataset and keeps the aggregate store current."""
+
+    def __init__(self, hourly_path=HOURLY_CSV, cleaned_path=CLEANED_CSV, store_dir=STORE_DIR):
+        self.hourly_path = Path(hourly_path)
+        self.cleaned_path = Path(cleaned_path)
+        self.store_dir = Path(store_dir)
+        # One pass over the current data; after that only new rows are added
+        hourly = load_csv(self.hourly_path, HOURLY_DTYPES)
+        cleaned = load_csv(self.cleaned_path, CLEANED_DTYPES)
+        self.partials = {name: partial_aggregate(name, hourly, cleaned) for name in AGGREGATES}
+        self.last_instant = int(hourly['instant'].max()) if len(hourly) else 0
+        self.ingested = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.recent_errors = deque(maxlen=20)
+        # Source path -> (bytes read so far, its header)
+        self._positions = {}
+
+    def ingest(self, records):
+        """Validate and add hourly records (a DataFrame or a list of dicts).
+
+        Returns a summary of what happened to them.
+        """
+        raw = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records), columns=list(HOURLY_DTYPES))
+        valid, rejected, skipped = validate_records(raw, self.last_instant)
+        for row in rejected.itertuples():
+            self.recent_errors.append(f"instant {row.instant}: {row.reason}")
+        self.rejected += len(rejected)
+        self.skipped += skipped
+
+        if len(valid):
+            cleaned = clean_hourly(valid)
+            _append_csv(valid, self.hourly_path)
+            # Written as the file already has it ('01'), read back as a number
+            _append_csv(cleaned.assign(day=cleaned['day'].map('{:02d}'.format)), self.cleaned_path)
+            for name in AGGREGATES:
+                self.partials[name] = combine_partials(self.partials[name], partial_aggregate(name, valid, cleaned))
+            tables = {name: finalize_aggregate(name, partial) for name, partial in self.partials.items()}
+            write_store(tables, _sources(self.hourly_path, self.cleaned_path), self.store_dir)
+            self.last_instant = int(valid['instant'].iat[-1])
+            self.ingested += len(valid)
+        return {'ingested': len(valid), 'rejected': len(rejected), 'skipped': skipped,
+                'last_instant': self.last_instant}
+
+    def poll(self, source, chunk_rows=CHUNK_ROWS):
+        """Ingest whatever has been appended to the CSV ``source`` since the last poll.
+
+        Returns one summary per chunk.
+        """
+        source = Path(source)
+        offset, header = self._positions.get(source, (0, None))
+        summaries = []
+        while True:
+            if header is None:
+                lines, offset = read_lines(source, offset, 1)
+                if not lines:
+                    break
+                header = next(csv.reader([lines[0].decode()]))
+            lines, offset = read_lines(source, offset, chunk_rows)
+            if not lines:
+                break
+            rows = list(csv.reader(io.StringIO(b''.join(lines).decode())))
+            wrong = [row for row in rows if len(row) != len(header)]
+            for row in wrong:
+                self.recent_errors.append(f"{','.join(row)[:60]}: expected {len(header)} fields, got {len(row)}")
+            self.rejected += len(wrong)
+            summary = self.ingest(pd.DataFrame([row for row in rows if len(row) == len(header)], columns=header))
+            summary['rejected'] += len(wrong)
+            summaries.append(summary)
+            self._positions[source] = (offset, header)
+        self._positions[source] = (offset, header)
+        return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append new hourly rental records and update the aggregates.")
+    parser.add_argument("source", help="CSV of new hourly records, with the hourly file's header.")
+    parser.add_argument("--follow", action="store_true", help="Keep watching the source for new records.")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --follow.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    ingestor = Ingestor()
+    while True:
+        for summary in ingestor.poll(args.source, args.chunk_rows):
+            print(f"Ingested {summary['ingested']} rows ({summary['rejected']} rejected, "
+                  f"{summary['skipped']} already present), up to instant {summary['last_instant']}")
+        if not args.follow:
+            break
+        time.sleep(args.interval)
+
+    print(f"Total: {ingestor.ingested} ingested, {ingestor.rejected} rejected, {ingestor.skipped} already present")
+    for error in ingestor.recent_errors:
+        print(f"  rejected {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from bikes.data import ROOT
+from bikes.encoding import (DAYS_IN_MONTH, FEATURES, MONTH_CODES, SEASON_CODES, SEASON_MONTHS,
+                            WEATHER_CODES)
+from bikes.features import ATEMP_SCALE, HUM_SCALE, WINDSPEED_SCALE
+from bikes.models import SIMULATOR_MODEL, get_model
+
+# Every Simulator input is a bounded integer or a choice, so a slice of the
+# input space can be scored offline and answered by lookup:
+#
+#   python -m bikes.lookup --temperature-step 10 --humidity-step 25 --wind-step 20
+#
+# The table is a dense float32 array with one axis per input below. Scenarios
+# that fall exactly on the grid are answered from it; anything else (e.g. a
+# temperature between two grid points) still goes to the live model. A table
+# built from a different model version is ignored.
+
+TABLE_PATH = ROOT / "prediction_table.npz"
+
+# Axis name -> model feature(s) it fills, in array order
+AXES = ['season_month', 'day', 'hr', 'weekday', 'weathersit', 'atemp', 'hum', 'windspeed']
+
+# (season code, month code) pairs the Simulator offers
+SEASON_MONTH_PAIRS = [(SEASON_CODES[season], MONTH_CODES[month])
+                      for season, months in SEASON_MONTHS.items() for month in months]
+
+
+def grid_axes(temperature_step=10, humidity_step=25, wind_step=20, days=range(1, 32), hours=range(24)):
+    """Encoded values along each axis of the table.
+
+    Temperature, humidity and wind are stepped in the Simulator's units (C, %,
+    knots) and encoded exactly as the Simulator does, so lookups match.
+    """
+    return {
+        'season_month': np.array(SEASON_MONTH_PAIRS),
+        'day': np.array(list(days)),
+        'hr': np.array(list(hours)),
+        # weekday and workingday are always equal after encoding
+        'weekday': np.array([0, 1]),
+        'weathersit': np.array(sorted(WEATHER_CODES.values())),
+        'atemp': np.arange(0, 51, temperature_step) / ATEMP_SCALE,
+        'hum': np.arange(0, 101, humidity_step) / HUM_SCALE,
+        'windspeed': np.arange(0, 68, wind_step) / WINDSPEED_SCALE,
+    }
+
+
+def _score_chunk(model_name, season, month, axes):
+    # All cells for one (season, month); days that don't exist stay NaN
+    days = axes['day']
+    valid = days <= DAYS_IN_MONTH[month]
+    grids = np.meshgrid(days[valid], axes['hr'], axes['weekday'], axes['weathersit'],
+                        axes['atemp'], axes['hum'], axes['windspeed'], indexing='ij')
+    day, hr, weekday, weathersit, atemp, hum, windspeed = (grid.ravel() for grid in grids)
+    X = pd.DataFrame({
+        'season': np.full(len(day), season),
+        'mnth': np.full(len(day), month),
+        'hr': hr,
+        'weekday': weekday,
+        'workingday': weekday,
+        'weathersit': weathersit,
+        'atemp': atemp,
+        'hum': hum,
+        'windspeed': windspeed,
+        'day': day,
+    }, columns=FEATURES)
+
+    out = np.full((len(days),) + grids[0].shape[1:], np.nan, dtype=np.float32)
+    if len(X):
+        out[valid] = get_model(model_name).predict(X).astype(np.float32).reshape(grids[0].shape)
+    return out
+
+
+def build_table(model_name=SIMULATOR_MODEL, n_jobs=-1, **grid):
+    """Score the whole grid, one chunk per (season, month), in parallel.
+
+    Returns (predictions, axes, model version).
+    """
+    axes = grid_axes(**grid)
+    version = get_model(model_name).version
+    chunks = Parallel(n_jobs=n_jobs)(
+        delayed(_score_chunk)(model_name, season, month, axes) for season, month in axes['season_month'])
+    return np.stack(chunks), axes, version
+
+
+def save_table(path, predictions, axes, model_name, version):
+    np.savez_compressed(path, predictions=predictions, model_name=model_name, model_version=version,
+                        **{f"axis_{name}": values for name, values in axes.items()})
+
+
+class PredictionTable:
+    def __init__(self, predictions, axes, model_name, version):
+        self.predictions = predictions
+        self.axes = axes
+        self.model_name = model_name
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        # Lookups come from every Streamlit session thread
+        self._counter_lock = threading.Lock()
+        # Encoded value -> position along each axis
+        self._positions = {name: {value: i for i, value in enumerate(values.tolist())}
+                           for name, values in axes.items() if name != 'season_month'}
+        self._positions['season_month'] = {tuple(pair): i for i, pair in enumerate(axes['season_month'].tolist())}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            axes = {name: stored[f"axis_{name}"] for name in AXES}
+            return cls(stored['predictions'], axes, str(stored['model_name']), str(stored['model_version']))
+
+    def lookup(self, features):
+        """Stored prediction for an encoded scenario, or None if it is off the grid."""
+        try:
+            position = (self._positions['season_month'][(features['season'], features['mnth'])],) + tuple(
+                self._positions[name][features[name]] for name in AXES[1:])
+        except KeyError:
+            self._count(hit=False)
+            return None
+        prediction = self.predictions[position]
+        if np.isnan(prediction) or features['workingday'] != features['weekday']:
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return float(prediction)
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'cells': int(self.predictions.size),
+            'memory_mb': self.predictions.nbytes / 1e6,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'model_version': self.version,
+        }
+
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def get_table(model_name=SIMULATOR_MODEL, path=TABLE_PATH):
+    """The prediction table for the current version of ``model_name``, if one was built."""
+    version = get_model(model_name).version
+    key = (model_name, str(path))
+    entry = _tables.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    with _lock:
+        entry = _tables.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        table = None
+        if os.path.exists(path):
+            table = PredictionTable.load(path)
+            if table.model_name != model_name or table.version != version:
+                table = None
+        _tables[key] = (version, table)
+        return table
+
+
+def table_stats():
+    return {name: table.stats() for (name, path), (version, table) in list(_tables.items()) if table is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute Simulator predictions over a grid of inputs.")
+    parser.add_argument("--model", default=SIMULATOR_MODEL)
+    parser.add_argument("--out", default=str(TABLE_PATH))
+    parser.add_argument("--temperature-step", type=int, default=10, help="Grid step for temperature feel (C).")
+    parser.add_argument("--humidity-step", type=int, default=25, help="Grid step for humidity (%%).")
+    parser.add_argument("--wind-step", type=int, default=20, help="Grid step for wind speed (knots).")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel workers (-1 = all cores).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    predictions, axes, version = build_table(args.model, n_jobs=args.jobs,
+                                             temperature_step=args.temperature_step,
+                                             humidity_step=args.humidity_step,
+                                             wind_step=args.wind_step)
+    scored = time.perf_counter() - start
+    save_table(args.out, predictions, axes, args.model, version)
+    total = time.perf_counter() - start
+
+    shape = " x ".join(str(n) for n in predictions.shape)
+    print(f"Scored {int(np.isfinite(predictions).sum()):,} scenarios ({shape}) with {args.model} {version} in {scored:.1f}s")
+    print(f"Table: {predictions.nbytes / 1e6:.1f} MB in memory, {Path(args.out).stat().st_size / 1e6:.1f} MB on disk "
+          f"({args.out}), {total:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
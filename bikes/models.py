@@ -0,0 +1,196 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import joblib
+
+from bikes.data import ROOT
+from bikes.timing import span
+
+# Fitted models are loaded once per server process and shared by every session.
+# A handle carries a version derived from the file on disk, so a retrained model
+# dropped in place is picked up on the next lookup and callers can tell the two
+# apart (e.g. to invalidate anything cached against the old one). Replace model
+# files atomically (write elsewhere, then os.replace) so a load never sees a
+# partial file; bikes.train.publish does.
+
+MODEL_FILES = {
+    'Model2': ROOT / "Model2.joblib",
+    'Model3': ROOT / "Model3.joblib",
+}
+
+# Set BIKES_MODEL_MMAP=r to memory-map the numpy arrays in the pickle instead of
+# reading them into fresh buffers. Only works for uncompressed joblib dumps.
+MMAP_MODE = os.environ.get("BIKES_MODEL_MMAP") or None
+
+# Model behind the Simulator, batch predictions and the HTTP service, e.g.
+# Model3-compact for the array export of Model3 (see bikes/compact.py).
+SIMULATOR_MODEL = os.environ.get("BIKES_SIMULATOR_MODEL", "Model3")
+
+# Comma-separated models the Simulator lets users choose from, when their files
+# exist: the forest, its compact export, and the gradient boosting model
+# (python -m bikes.train --name Model3-hgb --model-type hgb --publish).
+SIMULATOR_CHOICES = os.environ.get("BIKES_SIMULATOR_CHOICES", "Model3,Model3-compact,Model3-hgb")
+
+# Comma-separated model names to load in the background when the app starts.
+PRELOAD = os.environ.get("BIKES_PRELOAD_MODELS", SIMULATOR_MODEL)
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    name: str
+    version: str
+    path: Path
+    model: object
+    load_seconds: float
+    loaded_at: float
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+_handles = {}
+_load_counts = {}
+_reloading = set()
+# Model name -> lock held while that model loads, so a slow load doesn't hold
+# up other models; _lock only guards the dicts
+_load_locks = {}
+_lock = threading.Lock()
+_import_lock = threading.Lock()
+_preload_thread = None
+
+
+def _version(path):
+    stat = os.stat(path)
+    return hashlib.md5(f"{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:12]
+
+
+def model_path(name):
+    return MODEL_FILES.get(name, ROOT / f"{name}.joblib")
+
+
+def available_models(names=None):
+    """The models in ``names`` (default: SIMULATOR_CHOICES) that have a file, the Simulator's first."""
+    if names is None:
+        names = [SIMULATOR_MODEL] + [name.strip() for name in SIMULATOR_CHOICES.split(",") if name.strip()]
+    return [name for name in dict.fromkeys(names) if os.path.exists(model_path(name))]
+
+
+def _import_model_classes():
+    # Unpickling imports the model's classes, and two threads importing
+    # sklearn.ensemble at once can deadlock on its circular imports; import
+    # it once, one thread at a time, before any load
+    with _import_lock:
+        import sklearn.ensemble  # noqa: F401
+
+        import bikes.compact  # noqa: F401
+
+
+def _load(name, path, version, mmap_mode):
+    start = time.perf_counter()
+    _import_model_classes()
+    with span("model load"):
+        model = joblib.load(path, mmap_mode=mmap_mode)
+    return ModelHandle(name=name,
+                       version=version,
+                       path=path,
+                       model=model,
+                       load_seconds=time.perf_counter() - start,
+                       loaded_at=time.time())
+
+
+def _store(handle):
+    _handles[handle.name] = handle
+    _load_counts[handle.name] = _load_counts.get(handle.name, 0) + 1
+
+
+def _load_lock(name):
+    with _lock:
+        return _load_locks.setdefault(name, threading.Lock())
+
+
+def _reload(name, path, version, mmap_mode):
+    try:
+        with _load_lock(name):
+            handle = _handles.get(name)
+            if handle is None or handle.version != version:
+                handle = _load(name, path, version, mmap_mode)
+                with _lock:
+                    _store(handle)
+    finally:
+        with _lock:
+            _reloading.discard(name)
+
+
+def get_model(name=SIMULATOR_MODEL, mmap_mode=MMAP_MODE, wait=False):
+    """Return the loaded model called ``name``, loading it on first use.
+
+    When the file has been replaced since it was loaded, the loaded model
+    keeps being returned while the new one loads in a background thread,
+    and is swapped out once that finishes; ``wait=True`` loads it first.
+    """
+    path = model_path(name)
+    version = _version(path)
+
+    handle = _handles.get(name)
+    if handle is not None and handle.version == version:
+        return handle
+    if handle is not None and not wait:
+        with _lock:
+            if name not in _reloading:
+                _reloading.add(name)
+                threading.Thread(target=_reload, args=(name, path, version, mmap_mode),
+                                 name=f"model-reload-{name}", daemon=True).start()
+        return handle
+
+    with _load_lock(name):
+        handle = _handles.get(name)
+        if handle is not None and handle.version == version:
+            return handle
+        handle = _load(name, path, version, mmap_mode)
+        with _lock:
+            _store(handle)
+        return handle
+
+
+def reloading():
+    """Names of models whose replacement is loading in the background."""
+    with _lock:
+        return set(_reloading)
+
+
+def loaded_models():
+    return dict(_handles)
+
+
+def load_counts():
+    return dict(_load_counts)
+
+
+def preload(names=None, background=True):
+    """Load models ahead of the first request.
+
+    With ``background=True`` this returns immediately and loads in a daemon
+    thread, so the page that calls it renders without waiting. Only the first
+    background call per process starts a thread.
+    """
+    global _preload_thread
+    if names is None:
+        names = [name.strip() for name in PRELOAD.split(",") if name.strip()]
+
+    def _load():
+        for name in names:
+            if os.path.exists(model_path(name)):
+                get_model(name)
+
+    if not background:
+        _load()
+        return None
+    with _lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=_load, name="model-preload", daemon=True)
+            _preload_thread.start()
+        return _preload_thread
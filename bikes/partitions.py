@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+from bikes.cache import LRUCache
+from bikes.data import ROOT, _signature
+from bikes.schema import HOURLY_DTYPES
+from bikes.timing import cache_lookup, span
+
+# Hourly data for several cities and stations, partitioned by city, station
+# and month into one Parquet file each, Hive style:
+#
+#   partitions/city=Washington%20DC/station=all/month=2011-01/part-0.parquet
+#
+#   python -m bikes.partitions add bike-sharing_hourly.csv --city "Washington DC"
+#   python -m bikes.partitions add trips.csv          # with city and station columns
+#   python -m bikes.partitions list
+#
+# A file without a station column is the city's system-wide series, stored
+# as station ALL_STATIONS. Adding rows merges them into the months they fall
+# in (a repeated hour replaces the stored one), so new data can be added as
+# it arrives.
+#
+# The manifest lists every partition with its row count, so a read resolves
+# its Slice to the matching files without listing or opening the others
+# (predicate pushdown on the partition keys): what a page pays follows the
+# size of the selected slice, not of the whole history.
+
+PARTITIONS_DIR = ROOT / "partitions"
+MANIFEST = "manifest.json"
+PART_FILE = "part-0.parquet"
+
+KEYS = ['city', 'station', 'month']
+ALL_STATIONS = "all"
+
+# Slices kept in memory per process; each is re-read when the store changes
+SLICE_CACHE_SIZE = int(os.environ.get("BIKES_SLICE_CACHE_SIZE", 16))
+
+
+@dataclass(frozen=True)
+class Slice:
+    """A city's stations (empty: the whole city) between two months ("YYYY-MM", inclusive)."""
+    city: str
+    stations: tuple = ()
+    start: str = None
+    end: str = None
+
+    def matches(self, city, station, month):
+        return (city == self.city
+                and (not self.stations or station in self.stations)
+                and (self.start is None or month >= self.start)
+                and (self.end is None or month <= self.end))
+
+
+_slices = LRUCache(SLICE_CACHE_SIZE)
+_manifests = {}
+_lock = threading.Lock()
+
+
+def _partition_dir(city, station, month, root=PARTITIONS_DIR):
+    return Path(root) / f"city={quote(city, safe='')}" / f"station={quote(station, safe='')}" / f"month={month}"
+
+
+def _read_manifest(root):
+    try:
+        with open(Path(root) / MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'partitions': []}
+
+
+def manifest(root=PARTITIONS_DIR):
+    """The store's manifest, re-read only when it changes."""
+    path = Path(root) / MANIFEST
+    signature = _signature(path) if path.exists() else None
+    entry = _manifests.get(str(root))
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    loaded = _read_manifest(root)
+    _manifests[str(root)] = (signature, loaded)
+    return loaded
+
+
+def catalog(root=PARTITIONS_DIR):
+    """One row per partition: city, station, month and rows."""
+    return pd.DataFrame(manifest(root)['partitions'], columns=KEYS + ['rows'])
+
+
+def selected(selection, root=PARTITIONS_DIR):
+    """The manifest entries of the partitions in ``selection``.
+
+    With no stations chosen, a month with a city-wide (ALL_STATIONS)
+    partition is read from that alone: it already sums the city's stations.
+    """
+    entries = [entry for entry in manifest(root)['partitions']
+               if selection.matches(entry['city'], entry['station'], entry['month'])]
+    if not selection.stations:
+        city_wide = {entry['month'] for entry in entries if entry['station'] == ALL_STATIONS}
+        entries = [entry for entry in entries if entry['station'] == ALL_STATIONS or entry['month'] not in city_wide]
+    return entries
+
+
+def slice_version(selection, root=PARTITIONS_DIR):
+    """Changes whenever a partition in ``selection`` is rewritten."""
+    return tuple((entry['city'], entry['station'], entry['month'], entry['written_at']) for entry in selected(selection, root))
+
+
+def load_slice(selection, columns=None, root=PARTITIONS_DIR):
+    """Hourly rows of the partitions in ``selection``, at the hourly csv's dtypes.
+
+    Only the selected partitions' files are read, in one multi-threaded
+    scan. Cached per process; the frame is shared, so copy it before
+    modifying.
+    """
+    import pyarrow.dataset as ds
+
+    columns = list(HOURLY_DTYPES) if columns is None else list(columns)
+    key = (selection, tuple(columns), str(root))
+    version = slice_version(selection, root)
+    entry = _slices.get(key)
+    if entry is not None and entry[0] == version:
+        cache_lookup('partitions', True)
+        return entry[1]
+
+    cache_lookup('partitions', False)
+    paths = [str(_partition_dir(city, station, month, root) / PART_FILE) for city, station, month, _ in version]
+    with span("partition read"):
+        if paths:
+            frame = ds.dataset(paths, format="parquet").to_table(columns=columns).to_pandas()
+        else:
+            frame = pd.DataFrame({column: pd.Series(dtype=HOURLY_DTYPES.get(column)) for column in columns})
+        frame = frame.astype({column: HOURLY_DTYPES[column] for column in columns if column in HOURLY_DTYPES})
+    _slices.put(key, (version, frame))
+    return frame
+
+
+def _write_parquet(frame, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def add(frame, city=None, station=ALL_STATIONS, root=PARTITIONS_DIR):
+    """Merge hourly rows into their partitions and return the partitions written.
+
+    ``frame`` has the hourly csv's columns, plus 'city' and 'station'
+    columns unless ``city`` (and ``station``) are given.
+    """
+    missing = [column for column in HOURLY_DTYPES if column not in frame]
+    if missing:
+        raise ValueError(f"Missing hourly columns: {', '.join(missing)}")
+    if 'city' not in frame and city is None:
+        raise ValueError("Give a city, or a city column in the data")
+    frame = frame.assign(**{key: value for key, value in (('city', city), ('station', station))
+                            if key not in frame})
+    frame = frame.astype({'city': str, 'station': str})
+    frame['month'] = frame['dteday'].astype(str).str[:7]
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        entries = {tuple(entry[key] for key in KEYS): entry for entry in _read_manifest(root)['partitions']}
+        written = []
+        for (city_name, station_name, month), rows in frame.groupby(KEYS, sort=True):
+            path = _partition_dir(city_name, station_name, month, root) / PART_FILE
+            rows = rows[list(HOURLY_DTYPES)]
+            if path.exists():
+                rows = pd.concat([pd.read_parquet(path), rows], ignore_index=True)
+            rows = (rows.astype(HOURLY_DTYPES)
+                        .drop_duplicates(['dteday', 'hr'], keep='last')
+                        .sort_values(['dteday', 'hr'], kind='stable', ignore_index=True))
+            _write_parquet(rows, path)
+            entries[city_name, station_name, month] = {'city': city_name, 'station': station_name, 'month': month,
+                                                       'rows': len(rows), 'written_at': round(time.time(), 6)}
+            written.append((city_name, station_name, month))
+
+        store = {'partitions': [entries[key] for key in sorted(entries)],
+                 'updated_at': time.strftime("%Y-%m-%dT%H:%M:%S")}
+        tmp = root / f".{MANIFEST}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(store, f, indent=2)
+        os.replace(tmp, root / MANIFEST)
+    return written
+
+
+def partition_model_name(base, city, station=ALL_STATIONS):
+    """Name of ``base`` trained on one city's station, e.g. Model3-washington-dc-all."""
+    slug = re.sub(r"[^a-z0-9]+", "-", f"{city} {station}".lower()).strip("-")
+    return f"{base}-{slug}"
+
+
+def clear_cache():
+    with _lock:
+        _slices.clear()
+        _manifests.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the hourly data partitioned by city, station and month.")
+    parser.add_argument("--root", default=str(PARTITIONS_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Merge an hourly csv into the partitions.")
+    add_parser.add_argument("csv")
+    add_parser.add_argument("--city", help="City of every row (default: the csv's city column).")
+    add_parser.add_argument("--station", default=ALL_STATIONS,
+                            help="Station of every row, if the csv has no station column.")
+    commands.add_parser("list", help="Show the rows stored per city and station.")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        start = time.perf_counter()
+        frame = pd.read_csv(args.csv, dtype=dict(HOURLY_DTYPES, city=str, station=str))
+        try:
+            written = add(frame, args.city, args.station, args.root)
+        except ValueError as error:
+            parser.exit(1, f"{error}\n")
+        print(f"Added {len(frame):,} rows to {len(written)} partitions in {time.perf_counter() - start:.2f}s "
+              f"-> {args.root}")
+    else:
+        table = catalog(args.root)
+        if table.empty:
+            print(f"No partitions under {args.root}")
+            return
+        summary = table.groupby(['city', 'station']).agg(months=('month', 'size'), first=('month', 'min'),
+                                                         last=('month', 'max'), rows=('rows', 'sum'))
+        print(summary.to_string())
+
+
+if __name__ == "__main__":
+    main()
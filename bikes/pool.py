@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from bikes.models import _version
+from bikes.timing import span
+
+# Scores large batches in worker processes instead of the Streamlit server's
+# own, so a forest working through a week of scenarios for every input
+# doesn't hold the GIL the other sessions need. Each worker loads the model
+# once; a batch is split into one chunk per worker and the chunks are scored
+# in parallel:
+#
+#   BIKES_INFERENCE_WORKERS=4 streamlit run Overview.py
+#
+# Workers load the model with memory-mapped arrays, so models made of plain
+# arrays (Model3-compact, see bikes/compact.py) are held once in the page
+# cache and shared by every worker. sklearn's trees copy their nodes when they
+# load, so each worker keeps its own copy of Model3.
+#
+# Batches smaller than MIN_ROWS, and every batch while the pool is off (the
+# default) or after a worker has died, are scored in process as before. The
+# pool is restarted when the model file changes; a worker that finds the file
+# no longer holds the pool's version refuses to start, so its predictions
+# never go out under another version's name.
+
+# Worker processes; 0 or 1 scores in process
+WORKERS = int(os.environ.get("BIKES_INFERENCE_WORKERS", 0))
+
+# Smaller batches aren't worth the trip to another process
+MIN_ROWS = int(os.environ.get("BIKES_POOL_MIN_ROWS", 5_000))
+
+_model = None
+
+
+def _init_worker(path, version):
+    global _model
+    # Checked before and after loading, in case the file is replaced meanwhile
+    if _version(path) != version:
+        raise RuntimeError(f"{path} is no longer version {version}")
+    model = joblib.load(path, mmap_mode='r')
+    if _version(path) != version:
+        raise RuntimeError(f"{path} was replaced while loading version {version}")
+    _model = model
+    # One core per worker; the pool provides the parallelism
+    if hasattr(_model, 'n_jobs'):
+        _model.n_jobs = 1
+
+
+def _predict_chunk(X, columns):
+    return _model.predict(pd.DataFrame(X, columns=columns))
+
+
+class InferencePool:
+    """Worker processes holding one version of a model."""
+
+    def __init__(self, handle, workers):
+        self.version = handle.version
+        self.workers = workers
+        self.batches = 0
+        self.rows = 0
+        # spawn, not fork: the server has threads running
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(str(handle.path), handle.version))
+
+    def predict(self, X):
+        chunks = np.array_split(X.to_numpy(), self.workers)
+        columns = list(X.columns)
+        predictions = list(self._executor.map(_predict_chunk, chunks, [columns] * len(chunks)))
+        self.batches += 1
+        self.rows += len(X)
+        return np.concatenate(predictions)
+
+    def shutdown(self):
+        # Batches other threads have in flight finish on the retired workers
+        self._executor.shutdown(wait=False)
+
+
+_pools = {}
+_fallbacks = {}
+_lock = threading.Lock()
+
+
+def get_pool(handle, workers=None):
+    """The pool for ``handle``'s model and version, or None while pooling is off or the file has changed."""
+    workers = WORKERS if workers is None else workers
+    if workers <= 1:
+        return None
+    # The file has moved on while the new version loads (bikes.models): workers
+    # couldn't load this one, so it scores in process meanwhile
+    try:
+        if _version(handle.path) != handle.version:
+            return None
+    except OSError:
+        return None
+    with _lock:
+        pool = _pools.get(handle.name)
+        if pool is not None and pool.version == handle.version and pool.workers == workers:
+            return pool
+        if pool is not None:
+            pool.shutdown()
+        pool = _pools[handle.name] = InferencePool(handle, workers)
+        return pool
+
+
+def predict(handle, X, workers=None, min_rows=MIN_ROWS):
+    """``handle``'s predictions for ``X``, split across worker processes when it pays.
+
+    Falls back to predicting in this process if the pool can't be started or
+    a worker fails.
+    """
+    pool = get_pool(handle, workers) if len(X) >= min_rows else None
+    if pool is not None:
+        try:
+            with span("predict pool"):
+                return pool.predict(X)
+        except (BrokenProcessPool, CancelledError, OSError, RuntimeError):
+            # Start a fresh pool next time, and answer this batch here
+            with _lock:
+                if _pools.get(handle.name) is pool:
+                    del _pools[handle.name]
+                _fallbacks[handle.name] = _fallbacks.get(handle.name, 0) + 1
+            pool.shutdown()
+    return handle.predict(X)
+
+
+def pool_stats():
+    with _lock:
+        stats = {name: {'version': pool.version, 'workers': pool.workers, 'batches': pool.batches, 'rows': pool.rows,
+                        'fallbacks': _fallbacks.get(name, 0)}
+                 for name, pool in _pools.items()}
+        for name, count in _fallbacks.items():
+            stats.setdefault(name, {'version': None, 'workers': 0, 'batches': 0, 'rows': 0, 'fallbacks': count})
+        return stats
@@ -0,0 +1,104 @@
+import os
+import threading
+
+import pandas as pd
+
+from bikes import batcher, pool
+from bikes.cache import LRUCache
+from bikes.encoding import FEATURES
+from bikes.lookup import get_table
+from bikes.models import SIMULATOR_MODEL, get_model
+from bikes.timing import span
+
+# Score many scenarios with one model.predict call instead of one per hour, and
+# remember single-scenario predictions so repeated Simulator questions skip
+# the forest altogether.
+
+# Size (entries) and optional lifetime (seconds) of each model's prediction cache
+CACHE_SIZE = int(os.environ.get("BIKES_PREDICTION_CACHE_SIZE", 10_000))
+CACHE_TTL = float(os.environ["BIKES_PREDICTION_CACHE_TTL"]) if os.environ.get("BIKES_PREDICTION_CACHE_TTL") else None
+
+
+def validate_features(frame):
+    """Return ``frame``'s model columns in training order, as numbers.
+
+    Raises ValueError naming any missing or non-numeric columns.
+    """
+    missing = [column for column in FEATURES if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    X = frame[FEATURES]
+    not_numeric = [column for column in FEATURES if not pd.api.types.is_numeric_dtype(X[column])]
+    if not_numeric:
+        raise ValueError(f"Columns must be numeric: {', '.join(not_numeric)}")
+    if X.isna().any().any():
+        raise ValueError("Feature columns must not contain empty values")
+    return X
+
+
+def predict_batch(frame, model_name=SIMULATOR_MODEL):
+    """Predict rentals for every row of ``frame`` in a single vectorized call.
+
+    ``frame`` holds the model features (FEATURES, encoded as in the Simulator);
+    other columns are kept. Returns a copy with a 'prediction' column added.
+    Large batches are split across worker processes when BIKES_INFERENCE_WORKERS
+    is set (bikes.pool).
+    """
+    X = validate_features(frame)
+    if len(X) == 0:
+        return frame.assign(prediction=pd.Series(dtype="float64"))
+    model = get_model(model_name)
+    with span("predict batch"):
+        return frame.assign(prediction=pool.predict(model, X))
+
+
+# Model name -> (model version the entries were computed with, LRUCache)
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def prediction_cache(model_name=SIMULATOR_MODEL, version=None):
+    """The shared prediction cache for ``model_name``.
+
+    Passing the model's current ``version`` empties the cache if its entries
+    were computed with a different version.
+    """
+    with _caches_lock:
+        entry = _caches.get(model_name)
+        if entry is None:
+            entry = _caches[model_name] = [version, LRUCache(CACHE_SIZE, CACHE_TTL)]
+        elif version is not None and entry[0] != version:
+            entry[1].clear()
+            entry[0] = version
+        return entry[1]
+
+
+def predict_one(features, model_name=SIMULATOR_MODEL):
+    """Predict rentals for one encoded scenario (a dict keyed by FEATURES).
+
+    Answers from the precomputed prediction table (python -m bikes.lookup)
+    when the scenario is on its grid, then from the cache, then the model,
+    batched with other sessions' scenarios (bikes.batcher).
+    """
+    handle = get_model(model_name)
+    table = get_table(model_name)
+    if table is not None:
+        prediction = table.lookup(features)
+        if prediction is not None:
+            return prediction
+    cache = prediction_cache(model_name, handle.version)
+    key = tuple(features[column] for column in FEATURES)
+    prediction = cache.get(key)
+    if prediction is None:
+        with span("predict"):
+            if batcher.ENABLED:
+                prediction = batcher.get_batcher(model_name).predict(handle, key)
+            else:
+                prediction = float(handle.predict(pd.DataFrame([key], columns=FEATURES))[0])
+        cache.put(key, prediction)
+    return prediction
+
+
+def cache_stats():
+    with _caches_lock:
+        return {name: dict(entry[1].stats(), model_version=entry[0]) for name, entry in _caches.items()}
@@ -0,0 +1,117 @@
+import os
+import threading
+
+from bikes.columnar import COLUMNAR_DIR, _stored_path
+from bikes.features import ATEMP_SCALE, HUM_SCALE, WINDSPEED_SCALE
+from bikes.partitions import PART_FILE, _partition_dir, slice_version
+from bikes.timing import span
+
+# The EDA aggregates (bikes.aggregates) as SQL, run by DuckDB, an embedded
+# query engine, straight over Parquet files: the columnar copies of the csv
+# files (python -m bikes.columnar) or a slice of the partitioned data
+# (bikes.partitions). Only the grouped totals come back to pandas, so the
+# rows never have to fit in memory, and the scans use every core.
+#
+#   BIKES_AGGREGATE_ENGINE=duckdb streamlit run Overview.py
+#   python -m bikes.aggregates --engine duckdb
+#
+# Each query returns the same per-group totals as the aggregate's pandas
+# partial, so the pages' tables come from the same finalize step. The
+# columnar files hold float32 weather, so means over them can differ from the
+# pandas ones in the seventh significant digit.
+
+# Threads per query (default: one per core) and a memory cap such as "2GB",
+# above which DuckDB spills to disk
+THREADS = int(os.environ.get("BIKES_DUCKDB_THREADS", 0)) or None
+MEMORY_LIMIT = os.environ.get("BIKES_DUCKDB_MEMORY_LIMIT") or None
+
+# The cleaned_data.csv columns, for rows of the hourly data (features.clean_hourly)
+_CLEANED_FROM_HOURLY = ("SELECT season, mnth, hr, holiday, weekday, workingday, weathersit, atemp, hum, windspeed, "
+                        "cnt, CAST(right(CAST(dteday AS VARCHAR), 2) AS BIGINT) AS day FROM hourly")
+
+# Per aggregate: the table it groups, its group keys and what it sums. Plain
+# names are integer columns; (name, expression) pairs are SQL expressions,
+# summed as doubles.
+_INT = "CAST({} AS BIGINT)"
+PARTIALS = {
+    'season_counts': ('cleaned', ['season'], ['cnt']),
+    'month_counts': ('cleaned', ['mnth'], ['cnt']),
+    'weekday_counts': ('cleaned', ['weekday'], ['cnt']),
+    'weather_counts': ('cleaned', ['weathersit'], ['cnt']),
+    'day_avg_counts': ('cleaned', ['day'], ['cnt']),
+    'workingday_counts': ('hourly', ['workingday'], ['cnt']),
+    'workingday_hours': ('hourly', ['workingday'], ['cnt']),
+    'hourly_profile': ('hourly', ['yr', 'workingday', 'hr'], ['cnt']),
+    'user_totals': ('hourly', [('all', "0")], ['casual', 'registered']),
+    'users_by_weekday': ('hourly', ['weekday'], ['registered', 'casual']),
+    'users_by_month': ('hourly', ['mnth'], ['registered', 'casual']),
+    'users_by_season': ('hourly', ['season'], ['registered', 'casual']),
+}
+_DAILY_WEATHER = ('hourly', ['yr', 'mnth', ('day', "right(CAST(dteday AS VARCHAR), 2)")],
+                  [('atemp', f"CAST(atemp AS DOUBLE) * {ATEMP_SCALE}"), 'cnt',
+                   ('Windspeed', f"CAST(windspeed AS DOUBLE) * {WINDSPEED_SCALE}"),
+                   ('Humidity', f"CAST(hum AS DOUBLE) * {HUM_SCALE}")])
+PARTIALS['daily_weather'] = PARTIALS['daily_weather_trend'] = _DAILY_WEATHER
+
+_local = threading.local()
+
+
+def available():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _connection():
+    # One in-memory connection per thread; DuckDB connections aren't shared across threads
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        import duckdb
+
+        connection = _local.connection = duckdb.connect()
+        if THREADS:
+            connection.execute(f"SET threads = {THREADS}")
+        if MEMORY_LIMIT:
+            connection.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+    return connection
+
+
+def _partial_sql(source, by, sums):
+    keys = [(key, _INT.format(key)) if isinstance(key, str) else key for key in by]
+    values = [(column, f"CAST(SUM({column}) AS BIGINT)") if isinstance(column, str)
+              else (column[0], f"SUM({column[1]})") for column in sums]
+    select = ([f"{expression} AS \"{name}\"" for name, expression in keys + values]
+              + ["COUNT(*) AS \"rows\""])
+    group = ", ".join(str(position + 1) for position in range(len(keys)))
+    return f"SELECT {', '.join(select)} FROM {source} GROUP BY {group} ORDER BY {group}"
+
+
+def _scan(paths):
+    return "read_parquet([" + ", ".join("'" + str(path).replace("'", "''") + "'" for path in paths) + "])"
+
+
+def bundled_sources(columnar_dir=COLUMNAR_DIR):
+    """SQL for the hourly and cleaned tables over the columnar files, or None when they aren't current."""
+    hourly, cleaned = _stored_path('hourly', columnar_dir), _stored_path('cleaned', columnar_dir)
+    if hourly is None or cleaned is None or hourly.suffix != '.parquet' or cleaned.suffix != '.parquet':
+        return None
+    return {'hourly': f"SELECT * FROM {_scan([hourly])}", 'cleaned': f"SELECT * FROM {_scan([cleaned])}"}
+
+
+def slice_sources(selection):
+    """SQL for the hourly and cleaned tables over the partitions in ``selection``."""
+    paths = [_partition_dir(city, station, month) / PART_FILE for city, station, month, _ in slice_version(selection)]
+    if not paths:
+        return None
+    return {'hourly': f"SELECT * FROM {_scan(paths)}", 'cleaned': _CLEANED_FROM_HOURLY}
+
+
+def partial(name, sources):
+    """The per-group totals behind aggregate ``name``, indexed by group, from ``sources``."""
+    source, by, sums = PARTIALS[name]
+    ctes = f"WITH hourly AS ({sources['hourly']}), cleaned AS ({sources['cleaned']}) "
+    with span("sql"):
+        frame = _connection().execute(ctes + _partial_sql(source, by, sums)).df()
+    return frame.set_index([key if isinstance(key, str) else key[0] for key in by])
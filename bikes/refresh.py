@@ -0,0 +1,207 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+
+from bikes.data import HOURLY_CSV, fingerprint, load_csv
+from bikes.models import model_path
+from bikes.schema import HOURLY_DTYPES
+from bikes.train import (ARTIFACTS_DIR, REPORTED_MODEL, SEED, build_features, publish, published_dir,
+                         save_artifact)
+
+# Refreshes a served forest with newly ingested hours instead of retraining it:
+#
+#   python -m bikes.refresh --name Model3 [--new-trees 0.2] [--max-mb 30] [--publish]
+#
+# The forest is warm-started with a fraction of new trees, fitted on the hours
+# after the last refresh (or the last WINDOW_HOURS) plus a random sample of
+# older hours, so it learns the recent data without forgetting the rest. The
+# oldest trees are then retired until the forest is back to its tree count
+# and within its memory budget. The newest HOLDOUT of the recent hours are
+# held back to score the refresh; the next refresh starts after the last hour
+# fitted, so they are fitted then. Each refresh is saved as a new version
+# under artifacts/<name>/ and --publish swaps it in; the app keeps serving the
+# old forest until the new one has loaded (see bikes.models).
+#
+# Hyperparameters stay those of the last full training (bikes.train), and
+# real_pred.csv is not rewritten, so Prediction Insights keeps describing
+# that training until the next one.
+
+NEW_TREES = 0.2
+
+# Recent hours used when the model records no last instant (legacy files)
+WINDOW_HOURS = 24 * 30
+
+# Older hours sampled per recent hour, and recent hours held out for scoring
+OLD_RATIO = 2
+HOLDOUT = 0.2
+
+# Memory budget for the fitted trees; unset keeps the current forest's size
+MAX_MB = float(os.environ.get("BIKES_MODEL_MAX_MB", 0)) or None
+
+
+def forest_nbytes(forest):
+    """Bytes held by a fitted forest's node and value arrays."""
+    total = 0
+    for tree in forest.estimators_:
+        state = tree.tree_.__getstate__()
+        total += state['nodes'].nbytes + state['values'].nbytes
+    return total
+
+
+def refresh_rows(instants, since_instant, old_ratio=OLD_RATIO, holdout=HOLDOUT, seed=SEED):
+    """Positions of the rows to fit new trees on and of the recent rows held out.
+
+    Rows after ``since_instant`` are recent; the newest ``holdout`` of them
+    are kept back, and ``old_ratio`` older rows are sampled per recent row
+    fitted. The rows held out are all after every recent row fitted.
+    """
+    rng = np.random.default_rng(seed)
+    recent = instants > since_instant
+    recent_rows = np.flatnonzero(recent)
+    recent_rows = recent_rows[np.argsort(instants[recent_rows], kind='stable')]
+    n_held = int(holdout * len(recent_rows))
+    fitted, held = recent_rows[:len(recent_rows) - n_held], recent_rows[len(recent_rows) - n_held:]
+    older = np.flatnonzero(~recent)
+    sample = rng.choice(older, size=min(len(older), int(round(old_ratio * len(fitted)))), replace=False)
+    return np.sort(np.concatenate([fitted, sample])), np.sort(held)
+
+
+def refresh(model, X, y, new_trees=NEW_TREES, max_trees=None, max_bytes=None, seed=SEED):
+    """A copy of ``model`` warm-started with trees fitted on ``X``/``y``.
+
+    ``new_trees`` is the fraction of the forest added. The oldest trees are
+    then dropped until there are at most ``max_trees`` (default: as many as
+    before) and they take at most ``max_bytes``; new trees are never dropped.
+    Returns (forest, trees added, trees retired).
+    """
+    forest = copy.deepcopy(model)
+    trees = len(forest.estimators_)
+    added = max(1, round(new_trees * trees))
+    # A fresh seed per refresh, so the new trees don't repeat the last ones' draws
+    forest.set_params(warm_start=True, n_estimators=trees + added, random_state=seed)
+    forest.fit(X, y)
+
+    keep = max_trees or trees
+    retired = max(0, len(forest.estimators_) - keep)
+    forest.estimators_ = forest.estimators_[retired:]
+    while max_bytes is not None and len(forest.estimators_) > added and forest_nbytes(forest) > max_bytes:
+        forest.estimators_ = forest.estimators_[1:]
+        retired += 1
+    forest.set_params(warm_start=False, n_estimators=len(forest.estimators_))
+    return forest, added, retired
+
+
+def refresh_model(name=REPORTED_MODEL, since_instant=None, new_trees=NEW_TREES, max_trees=None, max_mb=MAX_MB,
+                  old_ratio=OLD_RATIO, holdout=HOLDOUT, hourly_path=HOURLY_CSV, artifacts_dir=ARTIFACTS_DIR):
+    """Refresh the model called ``name`` with the hourly rows after ``since_instant``.
+
+    ``since_instant`` defaults to the last instant the published version
+    fitted, so the rows it held out are fitted this time.
+    Returns a result for bikes.train.save_artifact.
+    """
+    base_dir = published_dir(name, artifacts_dir)
+    base = {}
+    if base_dir is not None:
+        with open(base_dir / "metadata.json") as f:
+            base = json.load(f)
+    model = joblib.load(model_path(name))
+    hourly = load_csv(hourly_path, HOURLY_DTYPES)
+    instants = hourly['instant'].to_numpy()
+    last_instant = int(instants.max())
+    if since_instant is None:
+        # Full trainings record only the last instant, having fitted up to it
+        since_instant = base.get('fitted_through', base.get('last_instant', last_instant - WINDOW_HOURS))
+    if since_instant >= last_instant:
+        raise ValueError(f"No hourly rows after instant {since_instant} to refresh {name} with")
+
+    X, y = build_features(hourly, list(model.feature_names_in_))
+    seed = SEED + last_instant
+    fit_rows, held_rows = refresh_rows(instants, since_instant, old_ratio, holdout, seed)
+    fitted_through = int(instants[fit_rows].max(initial=since_instant))
+    before = forest_nbytes(model)
+    max_bytes = before if max_mb is None else max_mb * 1e6
+
+    start = time.perf_counter()
+    forest, added, retired = refresh(model, X.iloc[fit_rows], y.iloc[fit_rows], new_trees, max_trees,
+                                     max_bytes, seed)
+    seconds = time.perf_counter() - start
+
+    scores = {}
+    if len(held_rows):
+        X_held, y_held = X.iloc[held_rows], y.iloc[held_rows]
+        scores = {'recent_r2_before': float(r2_score(y_held, model.predict(X_held))),
+                  'recent_r2_after': float(r2_score(y_held, forest.predict(X_held)))}
+
+    inputs = {
+        'data': fingerprint(hourly_path),
+        'base_version': base.get('version'),
+        'since_instant': int(since_instant),
+        'new_trees': new_trees,
+        'max_trees': max_trees,
+        'max_bytes': max_bytes,
+        'old_ratio': old_ratio,
+        'holdout': holdout,
+    }
+    metadata = dict(inputs,
+        rows=len(hourly),
+        last_instant=last_instant,
+        fitted_through=fitted_through,
+        recent_rows=int((instants > since_instant).sum()),
+        fit_rows=len(fit_rows),
+        held_out_rows=len(held_rows),
+        model='RandomForestRegressor',
+        best_params=base.get('best_params'),
+        trees_added=added,
+        trees_retired=retired,
+        trees=len(forest.estimators_),
+        nbytes_before=before,
+        nbytes_after=forest_nbytes(forest),
+        refresh_seconds=round(seconds, 2),
+        seed=seed,
+        inputs_hash=hashlib.md5(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:8],
+        **scores,
+    )
+    # The tuning behind the hyperparameters carries over to the refreshed forest
+    cv_results = pd.read_csv(base_dir / "cv_results.csv") if base_dir and (base_dir / "cv_results.csv").exists() else None
+    return {'model': forest, 'cv_results': cv_results, 'real_pred': None, 'metadata': metadata}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh a forest with new hourly data by replacing its oldest trees.")
+    parser.add_argument("--name", default=REPORTED_MODEL)
+    parser.add_argument("--since", type=int, help="Last instant already learned (default: from the published version).")
+    parser.add_argument("--new-trees", type=float, default=NEW_TREES, help="Fraction of the forest to refit.")
+    parser.add_argument("--max-trees", type=int, help="Trees to keep (default: as many as now).")
+    parser.add_argument("--max-mb", type=float, default=MAX_MB, help="Memory budget for the trees (default: current size).")
+    parser.add_argument("--old-ratio", type=float, default=OLD_RATIO, help="Older rows sampled per recent row.")
+    parser.add_argument("--publish", action="store_true", help="Serve the refreshed model from the app.")
+    args = parser.parse_args()
+
+    try:
+        result = refresh_model(args.name, args.since, args.new_trees, args.max_trees, args.max_mb, args.old_ratio)
+    except ValueError as error:
+        parser.exit(1, f"{error}\n")
+    out = save_artifact(args.name, result)
+    metadata = result['metadata']
+    print(f"Fitted {metadata['trees_added']} trees on {metadata['fit_rows']} rows "
+          f"({metadata['recent_rows']} after instant {metadata['since_instant']}) in {metadata['refresh_seconds']:.1f}s, "
+          f"retired {metadata['trees_retired']}: {metadata['trees']} trees, "
+          f"{metadata['nbytes_before'] / 1e6:.1f} -> {metadata['nbytes_after'] / 1e6:.1f} MB -> {out}")
+    if 'recent_r2_after' in metadata:
+        print(f"R^2 on {metadata['held_out_rows']} held-out recent rows: "
+              f"{metadata['recent_r2_before']:.4f} -> {metadata['recent_r2_after']:.4f}")
+    if args.publish:
+        publish(args.name, out)
+        print(f"Published {args.name} {out.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Column types of every dataset, in file order.
+#
+# *_DTYPES are the types the CSV files are parsed with, identical to what
+# read_csv inferred before; models, aggregate builds and ingestion work at
+# these widths. COMPACT_DTYPES are what the shared in-memory frames and the
+# columnar files hold: the smallest integer that fits each code or count,
+# float32 measurements, and categories for season, weather and dates.
+
+# Explicit dtypes skip pandas' type inference. dteday stays a string because
+# pages slice it.
+HOURLY_DTYPES = {
+    'instant': 'int64',
+    'dteday': 'object',
+    'season': 'int64',
+    'yr': 'int64',
+    'mnth': 'int64',
+    'hr': 'int64',
+    'holiday': 'int64',
+    'weekday': 'int64',
+    'workingday': 'int64',
+    'weathersit': 'int64',
+    'temp': 'float64',
+    'atemp': 'float64',
+    'hum': 'float64',
+    'windspeed': 'float64',
+    'casual': 'int64',
+    'registered': 'int64',
+    'cnt': 'int64',
+}
+
+# 'day' is written zero-padded ("01") but parsed as a number
+CLEANED_DTYPES = {
+    'season': 'int64',
+    'mnth': 'int64',
+    'hr': 'int64',
+    'holiday': 'int64',
+    'weekday': 'int64',
+    'workingday': 'int64',
+    'weathersit': 'int64',
+    'atemp': 'float64',
+    'hum': 'float64',
+    'windspeed': 'float64',
+    'cnt': 'int64',
+    'day': 'int64',
+}
+
+REAL_PRED_DTYPES = {
+    'season': 'float64',
+    'mnth': 'float64',
+    'hr': 'float64',
+    'weekday': 'float64',
+    'workingday': 'float64',
+    'weathersit': 'float64',
+    'atemp': 'float64',
+    'hum': 'float64',
+    'windspeed': 'float64',
+    'day': 'float64',
+    'real': 'int64',
+    'prediction': 'float64',
+}
+
+DTYPES = {
+    'hourly': HOURLY_DTYPES,
+    'cleaned': CLEANED_DTYPES,
+    'real_pred': REAL_PRED_DTYPES,
+}
+
+# Season and weather codes as categories, so every frame agrees on them
+SEASON = pd.CategoricalDtype([1, 2, 3, 4])
+WEATHER = pd.CategoricalDtype([1, 2, 3, 4])
+
+COMPACT_DTYPES = {
+    'hourly': {
+        'instant': 'int32',
+        'dteday': 'category',
+        'season': SEASON,
+        'yr': 'int8',
+        'mnth': 'int8',
+        'hr': 'int8',
+        'holiday': 'int8',
+        'weekday': 'int8',
+        'workingday': 'int8',
+        'weathersit': WEATHER,
+        'temp': 'float32',
+        'atemp': 'float32',
+        'hum': 'float32',
+        'windspeed': 'float32',
+        'casual': 'int16',
+        'registered': 'int16',
+        'cnt': 'int16',
+    },
+    'cleaned': {
+        'season': SEASON,
+        'mnth': 'int8',
+        'hr': 'int8',
+        'holiday': 'int8',
+        'weekday': 'int8',
+        'workingday': 'int8',
+        'weathersit': WEATHER,
+        'atemp': 'float32',
+        'hum': 'float32',
+        'windspeed': 'float32',
+        'cnt': 'int16',
+        'day': 'int8',
+    },
+    # Model inputs as the model saw them (floats), so no categories here
+    'real_pred': {
+        'season': 'float32',
+        'mnth': 'float32',
+        'hr': 'float32',
+        'weekday': 'float32',
+        'workingday': 'float32',
+        'weathersit': 'float32',
+        'atemp': 'float32',
+        'hum': 'float32',
+        'windspeed': 'float32',
+        'day': 'float32',
+        'real': 'int16',
+        'prediction': 'float32',
+    },
+}
+
+
+def compact(frame, name):
+    """``frame``'s columns of dataset ``name`` cast to COMPACT_DTYPES."""
+    dtypes = COMPACT_DTYPES[name]
+    return frame.astype({column: dtypes[column] for column in frame.columns if column in dtypes})
+
+
+def widen(frame, name):
+    """``frame``'s columns of dataset ``name`` cast back to the CSV dtypes."""
+    dtypes = DTYPES[name]
+    return frame.astype({column: dtypes[column] for column in frame.columns if column in dtypes})
+
+
+def wide_nbytes(frame, name):
+    """Bytes ``frame`` would take at the CSV dtypes, without building that copy."""
+    dtypes = DTYPES[name]
+    total = frame.index.memory_usage()
+    for column in frame.columns:
+        series = frame[column]
+        if dtypes.get(column) != 'object':
+            total += len(series) * np.dtype(dtypes.get(column, series.dtype)).itemsize
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # A pointer per row plus a separate string object per row
+            sizes = np.array([sys.getsizeof(value) for value in series.cat.categories.astype(object)])
+            total += 8 * len(series) + int(sizes[series.cat.codes[series.cat.codes >= 0]].sum())
+        else:
+            total += series.memory_usage(deep=True, index=False)
+    return int(total)
+
+
+def memory_row(label, name, frame):
+    """One line of a memory report for a cached frame of dataset ``name``."""
+    held = int(frame.memory_usage(deep=True).sum())
+    wide = wide_nbytes(frame, name)
+    return {'dataset': label, 'rows': len(frame), 'columns': frame.shape[1],
+            'memory (MB)': held / 1e6, 'at CSV dtypes (MB)': wide / 1e6, 'saved (MB)': (wide - held) / 1e6}
@@ -0,0 +1,42 @@
+import streamlit as st
+
+from bikes.partitions import ALL_STATIONS, Slice, catalog, selected
+from bikes.timing import stop_page
+
+# The sidebar choice of which data the EDA pages and the Simulator use: the
+# bundled csv files, or a slice of the partitioned data (bikes.partitions).
+# The widgets are keyed, so every page offers the same choice.
+
+CSV_DATA = "Bundled data (csv)"
+
+
+def slice_picker():
+    """City, stations and months chosen in the sidebar, as a partitions.Slice.
+
+    Returns None, and shows nothing, while nothing has been partitioned;
+    also None when the bundled csv files are chosen.
+    """
+    partitions = catalog()
+    if partitions.empty:
+        return None
+
+    city = st.sidebar.selectbox("Data", [CSV_DATA] + sorted(partitions['city'].unique()), key="slice_city")
+    if city == CSV_DATA:
+        return None
+    in_city = partitions[partitions['city'] == city]
+    # No choice is the whole city; the city-wide series isn't offered next to
+    # the stations it sums
+    stations = st.sidebar.multiselect("Stations", sorted(set(in_city['station']) - {ALL_STATIONS}),
+                                      key=f"slice_stations_{city}", placeholder="All stations")
+    months = sorted(in_city['month'].unique())
+    start, end = months[0], months[-1]
+    if len(months) > 1:
+        start, end = st.sidebar.select_slider("Months", options=months, value=(start, end), key=f"slice_months_{city}")
+
+    selection = Slice(city, tuple(stations), start, end)
+    rows = sum(entry['rows'] for entry in selected(selection))
+    if not rows:
+        st.warning("There is no data for these stations in these months; choose others in the sidebar.")
+        stop_page()
+    st.sidebar.caption(f"{rows:,} hourly rows")
+    return selection
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bikes.timing import span
+
+# Trendlines for the scatter charts, computed once per dataset version with
+# the aggregates (bikes.aggregates) instead of by plotly on every rerun.
+#
+# LOWESS refits a weighted regression around every point, so its cost grows
+# roughly with the square of the number of points. binned() is a linear-time
+# stand-in for large datasets: mean of y in equal-width x bins, smoothed with
+# a moving window over neighbouring bins.
+
+# Plotly's default LOWESS span, so stored curves match trendline='lowess'
+LOWESS_FRAC = 0.6666666
+
+BINS = 40
+WINDOW = 5
+
+# Above this many points the pages draw the binned curve instead of LOWESS
+LOWESS_MAX_POINTS = int(os.environ.get("BIKES_LOWESS_MAX_POINTS", 5_000))
+
+
+def lowess(x, y, frac=LOWESS_FRAC):
+    """LOWESS fit of ``y`` on ``x``, sorted by x, as columns 'x' and 'y'."""
+    # statsmodels is slow to import; only the aggregate build needs it
+    from statsmodels.nonparametric.smoothers_lowess import lowess as fit_lowess
+
+    fitted = fit_lowess(np.asarray(y, dtype=np.float64), np.asarray(x, dtype=np.float64),
+                        frac=frac, missing='drop')
+    return pd.DataFrame({'x': fitted[:, 0], 'y': fitted[:, 1]})
+
+
+def binned(x, y, bins=BINS, window=WINDOW):
+    """Windowed mean of ``y`` over ``bins`` equal-width bins of ``x``.
+
+    Each point of the curve averages every observation in ``window``
+    neighbouring bins, placed at their mean x. Empty bins are skipped.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if len(x) == 0:
+        return pd.DataFrame({'x': [], 'y': []}, dtype=np.float64)
+
+    edges = np.linspace(x.min(), x.max(), bins + 1)
+    which = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, bins - 1)
+    kernel = np.ones(window)
+    counts, x_sums, y_sums = (np.convolve(np.bincount(which, weights=weights, minlength=bins), kernel, 'same')
+                              for weights in (None, x, y))
+    filled = np.bincount(which, minlength=bins) > 0
+    return pd.DataFrame({'x': x_sums[filled] / counts[filled], 'y': y_sums[filled] / counts[filled]})
+
+
+SMOOTHERS = {
+    'lowess': lowess,
+    'binned': binned,
+}
+
+
+def trendline_method(n_points):
+    """The smoother to draw for a scatter of ``n_points``."""
+    return 'lowess' if n_points <= LOWESS_MAX_POINTS else 'binned'
+
+
+def trendlines(x, y):
+    """The curve of the smoother trendline_method picks for ``x``, with its name in 'method'.
+
+    Only that smoother runs, so LOWESS is never fitted above LOWESS_MAX_POINTS.
+    """
+    method = trendline_method(len(x))
+    with span(method):
+        return SMOOTHERS[method](x, y).assign(method=method)
+
+
+def stored_trendline(curves, n_points):
+    """The curve to draw from stored ``curves`` (with 'method') for a scatter of ``n_points``.
+
+    The store may have been built with a different LOWESS_MAX_POINTS, so when
+    it lacks the smoother trendline_method picks, whichever it has is drawn.
+    Returns (curve, method); method is None if nothing is stored.
+    """
+    methods = list(dict.fromkeys(curves['method']))
+    if not methods:
+        return curves, None
+    method = trendline_method(n_points)
+    if method not in methods:
+        method = methods[0]
+    return curves[curves['method'] == method], method
@@ -0,0 +1,188 @@
+import contextlib
+import json
+import os
+import resource
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Lightweight timing spans for page reruns. Each page calls start_page() at the
+# top and end_page() at the bottom (or stop_page() instead of st.stop()); code
+# in between (and in bikes.*) wraps its stages in span("csv parse"),
+# span("groupby"), ... Durations are kept per page and stage in this server
+# process, for the Diagnostics page's percentiles:
+#
+#   with span("groupby"):
+#       ...
+#
+# Page code that builds a figure over many lines marks it with start_span()
+# instead of indenting it:
+#
+#   figure = start_span("figure")
+#   fig = px.bar(...)
+#   st.plotly_chart(fig)
+#   figure.stop()
+#
+# Spans on threads without a page (background model loads) count under
+# BACKGROUND.
+
+# Set BIKES_TIMING=0 to turn the spans off
+ENABLED = os.environ.get("BIKES_TIMING", "1") != "0"
+
+# Durations kept per page and stage; percentiles cover the most recent ones
+WINDOW = int(os.environ.get("BIKES_TIMING_WINDOW", 1000))
+
+# Append every span to this file as a JSON line, for monitoring
+EXPORT_PATH = os.environ.get("BIKES_TIMING_EXPORT") or None
+
+BACKGROUND = "(background)"
+RERUN = "rerun"
+
+_local = threading.local()
+# (page, stage) -> [spans recorded, recent durations in seconds]
+_spans = {}
+# cache name -> [hits, misses]
+_caches = {}
+_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+def current_page():
+    return getattr(_local, 'page', None) or BACKGROUND
+
+
+def record(stage, seconds, page=None):
+    """Add one ``seconds``-long span of ``stage`` on ``page`` (default: this thread's page)."""
+    if page is None:
+        page = current_page()
+    with _lock:
+        entry = _spans.get((page, stage))
+        if entry is None:
+            entry = _spans[page, stage] = [0, deque(maxlen=WINDOW)]
+        entry[0] += 1
+        entry[1].append(seconds)
+    if EXPORT_PATH:
+        line = json.dumps({'ts': round(time.time(), 3), 'pid': os.getpid(), 'page': page, 'stage': stage,
+                           'ms': round(seconds * 1000, 3)})
+        with _export_lock, open(EXPORT_PATH, "a") as f:
+            f.write(line + "\n")
+
+
+@contextlib.contextmanager
+def span(stage):
+    """Time the block as one span of ``stage``."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+class Span:
+    """A span of ``stage`` started when created and recorded by stop()."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if ENABLED and self.started is not None:
+            record(self.stage, time.perf_counter() - self.started)
+        self.started = None
+
+
+def start_span(stage):
+    return Span(stage)
+
+
+def start_page(name):
+    """Mark this thread's rerun as one of page ``name`` and start its clock.
+
+    Replaces whatever a rerun that never reached end_page() (one that raised)
+    left behind on this thread.
+    """
+    _local.page = name
+    _local.started = time.perf_counter()
+
+
+def end_page():
+    """Record the rerun started by start_page() as a RERUN span, and leave the page."""
+    started = getattr(_local, 'started', None)
+    if ENABLED and started is not None:
+        record(RERUN, time.perf_counter() - started)
+    _local.started = None
+    _local.page = None
+
+
+def stop_page():
+    """End the page's rerun here: end_page(), then st.stop()."""
+    import streamlit as st
+
+    end_page()
+    st.stop()
+
+
+def cache_lookup(name, hit):
+    """Count a hit or miss of the shared cache ``name``."""
+    with _lock:
+        counts = _caches.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def summary():
+    """One row per page and stage: spans recorded and p50/p95/max of the recent ones, in ms."""
+    with _lock:
+        items = [(key, count, np.array(durations)) for key, (count, durations) in _spans.items()]
+    rows = []
+    for (page, stage), count, durations in sorted(items, key=lambda item: item[0]):
+        p50, p95 = np.percentile(durations, [50, 95]) * 1000
+        rows.append({'page': page, 'stage': stage, 'count': count, 'p50 (ms)': p50, 'p95 (ms)': p95,
+                     'max (ms)': durations.max() * 1000})
+    return rows
+
+
+def durations(page, stage=RERUN):
+    """The recent durations of ``stage`` on ``page``, in ms."""
+    with _lock:
+        entry = _spans.get((page, stage))
+        return [] if entry is None else [seconds * 1000 for seconds in entry[1]]
+
+
+def cache_stats():
+    with _lock:
+        return {name: {'hits': hits, 'misses': misses, 'hit rate': hits / (hits + misses) if hits + misses else None}
+                for name, (hits, misses) in _caches.items()}
+
+
+def rss_mb():
+    """Resident memory of this process, and its peak, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024, peak
+    except OSError:
+        pass
+    return peak, peak
+
+
+def to_jsonl():
+    """The summary, cache counts and memory as JSON lines, one object per line."""
+    now = {'ts': round(time.time(), 3), 'pid': os.getpid()}
+    lines = [dict(now, kind='span', **row) for row in summary()]
+    lines += [dict(now, kind='cache', cache=name, **stats) for name, stats in cache_stats().items()]
+    rss, peak = rss_mb()
+    lines.append(dict(now, kind='memory', rss_mb=rss, peak_rss_mb=peak))
+    return "".join(json.dumps(line) + "\n" for line in lines)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _caches.clear()
@@ -0,0 +1,449 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+
+from bikes.data import HOURLY_CSV, REAL_PRED_CSV, ROOT, fingerprint, load_csv
+from bikes.encoding import FEATURES
+from bikes.features import clean_hourly
+from bikes.partitions import ALL_STATIONS, Slice, load_slice, partition_model_name, slice_version
+from bikes.schema import HOURLY_DTYPES
+
+# Rebuilds a model from the raw hourly data, reproducibly:
+#
+#   python -m bikes.train --name Model3 --max-depth 20 21 22 23 24 [--publish]
+#   python -m bikes.train --name Model3-hgb --model-type hgb [--max-iter 500] [--publish]
+#   python -m bikes.train --city "Washington DC" --station all [--publish]
+#
+# The cleaned features are derived from bike-sharing_hourly.csv, a test set is
+# held out, and a grid search with k-fold cross-validation picks the forest's
+# hyperparameters, fitting the folds in parallel on every core. The model is a
+# random forest, or with --model-type hgb a histogram gradient boosting model,
+# which is far smaller and faster to predict with. With
+# --search halving, settings are instead raced on small warm-started forests
+# that keep growing only while they are among the best (halving_search);
+# --target-r2 records how long the search took to first reach that CV R^2.
+# Each run is written to artifacts/<name>/<version>/:
+#
+#   model.joblib      the forest refit on the whole training set
+#   cv_results.csv    mean and spread of the cross-validated R^2 per setting
+#   real_pred.csv     test-set features, real counts and predictions
+#   metadata.json     data fingerprint, grid, seed, scores, timings, versions
+#
+# --publish copies the model (and, for Model3, real_pred.csv) to where the app
+# reads it, replacing each file atomically, and records the version in
+# artifacts/<name>/published.json; the Model page then plots its CV results.
+# Same data, grid and seed give the same model.
+#
+# --city (and --station) train on that slice of the partitioned data
+# (bikes.partitions) instead, as Model3-<city>-<station> by default; the
+# Simulator offers it when those stations are chosen in its sidebar.
+
+ARTIFACTS_DIR = ROOT / "artifacts"
+PUBLISHED = "published.json"
+TARGET = 'cnt'
+SEED = 42
+TEST_SIZE = 0.3
+CV_FOLDS = 5
+
+MODEL_TYPES = ['forest', 'hgb']
+
+# Default grid for --model-type hgb
+HGB_GRID = {'max_iter': [500], 'learning_rate': [0.1], 'max_leaf_nodes': [63]}
+
+# Successive halving: each rung keeps the best 1/HALVING_FACTOR of the
+# settings and grows their forests HALVING_FACTOR times larger, from MIN_TREES
+HALVING_FACTOR = 3
+MIN_TREES = 10
+CACHE_DIR = ARTIFACTS_DIR / "cache"
+
+# The model whose test predictions and tuning the pages report
+REPORTED_MODEL = "Model3"
+
+# means.joblib predates the pipeline: mean CV R^2 for these depths, from the
+# GridSearchCV in EDA_and_prep
+LEGACY_MEANS = ROOT / "means.joblib"
+LEGACY_DEPTHS = [20, 21, 22, 23, 24]
+
+
+def build_features(hourly, features=FEATURES):
+    """Model features and target from rows of the hourly data."""
+    cleaned = clean_hourly(hourly)
+    return cleaned[list(features)], cleaned[TARGET]
+
+
+def _search_grid(max_depth, n_estimators, min_samples_leaf):
+    return {
+        'max_depth': list(max_depth),
+        'n_estimators': list(n_estimators),
+        'min_samples_leaf': list(min_samples_leaf),
+    }
+
+
+def _estimator(model_type, seed, n_jobs=1, **params):
+    if model_type == 'hgb':
+        # A fixed number of iterations, so max_iter means the same in every fit
+        return HistGradientBoostingRegressor(random_state=seed, early_stopping=False, **params)
+    return RandomForestRegressor(random_state=seed, n_jobs=n_jobs, **params)
+
+
+def grid_search(X, y, grid, cv=CV_FOLDS, seed=SEED, n_jobs=-1, model_type='forest'):
+    """Exhaustive search: every setting, full forests, k-fold CV.
+
+    Returns (cv_results, timeline, fits); the timeline has one point, since
+    nothing is known until every fit is done.
+    """
+    # Folds run in parallel; each forest stays single-threaded so the two
+    # levels don't fight over cores
+    search = GridSearchCV(_estimator(model_type, seed), grid, scoring='r2',
+                          cv=KFold(cv, shuffle=True, random_state=seed), n_jobs=n_jobs, refit=False)
+    start = time.perf_counter()
+    search.fit(X, y)
+    results = search.cv_results_
+    cv_results = pd.DataFrame({
+        **{name: np.array(list(results[f"param_{name}"])) for name in grid},
+        'mean_r2': results['mean_test_score'],
+        'std_r2': results['std_test_score'],
+        'mean_fit_seconds': results['mean_fit_time'],
+        'rank': results['rank_test_score'],
+    })
+    timeline = [(time.perf_counter() - start, float(search.best_score_))]
+    return cv_results, timeline, len(cv_results) * cv
+
+
+def _rungs(n_estimators, factor, min_trees):
+    # Several tree counts in the grid are the rungs themselves; a single one
+    # is approached geometrically from min_trees
+    if len(n_estimators) > 1:
+        return sorted(n_estimators)
+    rungs = []
+    trees = min_trees
+    while trees < n_estimators[0]:
+        rungs.append(trees)
+        trees *= factor
+    return rungs + [n_estimators[0]]
+
+
+def _cache_file(X, y, cv, seed, cache_dir):
+    data = pd.util.hash_pandas_object(X.assign(_target=y.to_numpy()), index=True).to_numpy()
+    key = hashlib.md5(data.tobytes() + f"{cv}:{seed}".encode()).hexdigest()[:16]
+    return Path(cache_dir) / f"{key}.json"
+
+
+def _read_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(path, cache):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def halving_search(X, y, grid, cv=CV_FOLDS, seed=SEED, n_jobs=-1, factor=HALVING_FACTOR,
+                   min_trees=MIN_TREES, cache_dir=CACHE_DIR):
+    """Successive halving over the grid, with trees as the growing budget.
+
+    Every max_depth/min_samples_leaf pair starts as a warm-started forest per
+    fold. At each rung the surviving forests grow to the rung's tree count
+    (only the new trees are fitted), are scored on their fold, and the best
+    1/``factor`` carry on. Fold scores are cached on disk per training set,
+    so a rerun on the same data only fits settings and rungs it hasn't seen.
+
+    Returns (cv_results, timeline, fits) like grid_search, with a row per
+    setting and rung reached and a timeline of the best score so far.
+    """
+    folds = list(KFold(cv, shuffle=True, random_state=seed).split(X))
+    cache_path = _cache_file(X, y, cv, seed, cache_dir)
+    cache = _read_cache(cache_path)
+    candidates = list(itertools.product(grid['max_depth'], grid['min_samples_leaf']))
+    rungs = _rungs(grid['n_estimators'], factor, min_trees)
+    forests = {}
+    rows = []
+    timeline = []
+    best = -np.inf
+    fits = 0
+    start = time.perf_counter()
+
+    for i, trees in enumerate(rungs):
+        scored = []
+        for depth, leaf in candidates:
+            key = f"{depth}-{leaf}-{trees}"
+            entry = cache.get(key)
+            if entry is None:
+                scores, seconds = [], []
+                for fold, (fit_rows, score_rows) in enumerate(folds):
+                    forest = forests.pop((depth, leaf, fold), None)
+                    if forest is None:
+                        forest = RandomForestRegressor(max_depth=depth, min_samples_leaf=leaf, random_state=seed,
+                                                       n_jobs=n_jobs, warm_start=True)
+                    forest.set_params(n_estimators=trees)
+                    fit_start = time.perf_counter()
+                    forest.fit(X.iloc[fit_rows], y.iloc[fit_rows])
+                    seconds.append(time.perf_counter() - fit_start)
+                    scores.append(r2_score(y.iloc[score_rows], forest.predict(X.iloc[score_rows])))
+                    fits += 1
+                    if i + 1 < len(rungs):
+                        forests[depth, leaf, fold] = forest
+                entry = cache[key] = {'scores': scores, 'seconds': seconds}
+                _write_cache(cache_path, cache)
+                cached = False
+            else:
+                cached = True
+            mean = float(np.mean(entry['scores']))
+            rows.append({'max_depth': depth, 'n_estimators': trees, 'min_samples_leaf': leaf, 'mean_r2': mean,
+                         'std_r2': float(np.std(entry['scores'])), 'mean_fit_seconds': float(np.mean(entry['seconds'])),
+                         'cached': cached})
+            scored.append((mean, (depth, leaf)))
+            if mean > best:
+                best = mean
+                timeline.append((time.perf_counter() - start, best))
+
+        keep = max(1, math.ceil(len(candidates) / factor))
+        candidates = [candidate for _, candidate in sorted(scored, key=lambda item: -item[0])[:keep]]
+        # Forests of dropped settings are never grown again
+        forests = {key: forest for key, forest in forests.items() if key[:2] in candidates}
+
+    cv_results = pd.DataFrame(rows)
+    cv_results['rank'] = cv_results['mean_r2'].rank(method='min', ascending=False).astype('int64')
+    return cv_results, timeline, fits
+
+
+def time_to_target(timeline, target_r2):
+    """Seconds into a search when the best CV R^2 first reached ``target_r2``, or None."""
+    for seconds, score in timeline:
+        if score >= target_r2:
+            return round(seconds, 2)
+    return None
+
+
+def train(features=FEATURES, max_depth=LEGACY_DEPTHS, n_estimators=(100,), min_samples_leaf=(1,),
+          cv=CV_FOLDS, test_size=TEST_SIZE, seed=SEED, n_jobs=-1, hourly_path=HOURLY_CSV,
+          search='grid', target_r2=None, factor=HALVING_FACTOR, min_trees=MIN_TREES, cache_dir=CACHE_DIR,
+          model_type='forest', grid=None, selection=None):
+    """Search the grid with cross-validation and refit the best model.
+
+    ``model_type`` is 'forest' or 'hgb'. A forest's grid is built from
+    ``max_depth``, ``n_estimators`` and ``min_samples_leaf`` unless ``grid``
+    is given; hgb uses ``grid`` or HGB_GRID. ``search`` is 'grid' (every
+    setting at full size) or, for forests, 'halving' (see halving_search).
+    With a ``selection`` (bikes.partitions.Slice) it trains on that slice of
+    the partitioned data instead of ``hourly_path``.
+    Returns a dict with the fitted 'model', 'cv_results' and 'real_pred'
+    frames, and 'metadata'.
+    """
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type {model_type!r}; expected one of {', '.join(MODEL_TYPES)}")
+    if search == 'halving' and model_type != 'forest':
+        raise ValueError("Successive halving grows forests; use search='grid' for other models")
+    if selection is None:
+        hourly = load_csv(hourly_path, HOURLY_DTYPES)
+        data = fingerprint(hourly_path)
+    else:
+        hourly = load_slice(selection)
+        if hourly.empty:
+            raise ValueError(f"No partitioned rows for {selection}")
+        data = {'selection': asdict(selection), 'partitions': slice_version(selection)}
+    X, y = build_features(hourly, features)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+    if grid is None:
+        grid = HGB_GRID if model_type == 'hgb' else _search_grid(max_depth, n_estimators, min_samples_leaf)
+
+    start = time.perf_counter()
+    if search == 'halving':
+        cv_results, timeline, fits = halving_search(X_train, y_train, grid, cv, seed, n_jobs, factor, min_trees, cache_dir)
+    elif search == 'grid':
+        cv_results, timeline, fits = grid_search(X_train, y_train, grid, cv, seed, n_jobs, model_type)
+    else:
+        raise ValueError(f"Unknown search {search!r}; expected 'grid' or 'halving'")
+    search_seconds = time.perf_counter() - start
+
+    eligible = cv_results
+    if search == 'halving':
+        # Only tree counts from the grid are eligible, not the rungs below them
+        eligible = cv_results[cv_results['n_estimators'].isin(grid['n_estimators'])]
+    best = eligible.loc[eligible['mean_r2'].idxmax()]
+    best_params = {name: cv_results[name].dtype.type(best[name]).item() for name in grid}
+    model = _estimator(model_type, seed, n_jobs, **best_params).fit(X_train, y_train)
+    prediction = model.predict(X_test)
+    real_pred = X_test.astype('float64').assign(real=y_test.to_numpy(), prediction=prediction)
+
+    inputs = {
+        'data': data,
+        'features': list(features),
+        'model_type': model_type,
+        'grid': grid,
+        'search': search,
+        'cv_folds': cv,
+        'test_size': test_size,
+        'seed': seed,
+    }
+    if search == 'halving':
+        inputs.update(factor=factor, min_trees=min_trees)
+    metadata = dict(inputs,
+        rows=len(hourly),
+        last_instant=int(hourly['instant'].max()),
+        train_rows=len(X_train),
+        test_rows=len(X_test),
+        model=type(model).__name__,
+        best_params=best_params,
+        cv_r2=float(best['mean_r2']),
+        test_r2=float(r2_score(y_test, prediction)),
+        search_seconds=round(search_seconds, 2),
+        fits=fits + 1,
+        target_r2=target_r2,
+        time_to_target=None if target_r2 is None else time_to_target(timeline, target_r2),
+        n_jobs=n_jobs,
+        cpu_count=os.cpu_count(),
+        versions={'python': platform.python_version(), 'sklearn': sklearn.__version__,
+                  'pandas': pd.__version__, 'numpy': np.__version__},
+        inputs_hash=hashlib.md5(json.dumps(inputs, sort_keys=True).encode()).hexdigest()[:8],
+    )
+    return {'model': model, 'cv_results': cv_results, 'real_pred': real_pred, 'metadata': metadata}
+
+
+def save_artifact(name, result, artifacts_dir=ARTIFACTS_DIR):
+    """Write a training result to a new version directory and return its path."""
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{result['metadata']['inputs_hash']}"
+    out = Path(artifacts_dir) / name / version
+    out.mkdir(parents=True)
+    joblib.dump(result['model'], out / "model.joblib")
+    for table in ('cv_results', 'real_pred'):
+        if result.get(table) is not None:
+            result[table].to_csv(out / f"{table}.csv", index=False)
+    metadata = dict(result['metadata'], name=name, version=version,
+                    created_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    with open(out / "metadata.json", "w") as f:
+        json.dump(metadata, f, indent=2)
+    return out
+
+
+def _replace(source, target):
+    # Copy next to the target, then rename over it, so readers never see a
+    # half-written file
+    tmp = Path(target).with_name(f".{Path(target).name}.tmp")
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+def depth_means(cv_results):
+    """Best mean CV R^2 at each max_depth, over the other hyperparameters."""
+    return cv_results.groupby('max_depth')['mean_r2'].max().to_numpy()
+
+
+def publish(name, version_dir, artifacts_dir=ARTIFACTS_DIR):
+    """Make a saved version the one the app serves."""
+    version_dir = Path(version_dir)
+    from bikes.models import model_path
+
+    _replace(version_dir / "model.joblib", model_path(name))
+    if name == REPORTED_MODEL and (version_dir / "real_pred.csv").exists():
+        _replace(version_dir / "real_pred.csv", REAL_PRED_CSV)
+    with open(Path(artifacts_dir) / name / PUBLISHED, "w") as f:
+        json.dump({'version': version_dir.name, 'published_at': time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+
+
+def published_dir(name, artifacts_dir=ARTIFACTS_DIR):
+    """Directory of the published version of ``name``, or None."""
+    try:
+        with open(Path(artifacts_dir) / name / PUBLISHED) as f:
+            version = json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+    path = Path(artifacts_dir) / name / version
+    return path if path.exists() else None
+
+
+def depth_scores(name=REPORTED_MODEL, artifacts_dir=ARTIFACTS_DIR):
+    """Cross-validated R^2 by max depth for the published ``name``, as Max_Depth/R2 columns.
+
+    Falls back to means.joblib when no version has been published.
+    """
+    path = published_dir(name, artifacts_dir)
+    cv_results = None
+    if path is not None and (path / "cv_results.csv").exists():
+        cv_results = pd.read_csv(path / "cv_results.csv")
+    if cv_results is not None and 'max_depth' in cv_results:
+        depths = np.sort(cv_results['max_depth'].unique())
+        return pd.DataFrame({'Max_Depth': depths, 'R2': depth_means(cv_results)})
+    return pd.DataFrame({'Max_Depth': LEGACY_DEPTHS, 'R2': list(joblib.load(LEGACY_MEANS))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a model from the hourly data and save it as a versioned artifact.")
+    parser.add_argument("--name", help=f"Model name (default: {REPORTED_MODEL}, or Model3-<city>-<station> with --city).")
+    parser.add_argument("--features", nargs="+", default=FEATURES)
+    parser.add_argument("--model-type", choices=MODEL_TYPES, default="forest")
+    parser.add_argument("--max-depth", type=int, nargs="+", default=LEGACY_DEPTHS)
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[100])
+    parser.add_argument("--min-samples-leaf", type=int, nargs="+", default=[1])
+    parser.add_argument("--max-iter", type=int, nargs="+", default=HGB_GRID['max_iter'], help="hgb: boosting iterations.")
+    parser.add_argument("--learning-rate", type=float, nargs="+", default=HGB_GRID['learning_rate'])
+    parser.add_argument("--max-leaf-nodes", type=int, nargs="+", default=HGB_GRID['max_leaf_nodes'])
+    parser.add_argument("--cv", type=int, default=CV_FOLDS, help="Cross-validation folds.")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel fits (-1 = all cores).")
+    parser.add_argument("--search", choices=["grid", "halving"], default="grid")
+    parser.add_argument("--target-r2", type=float, help="Report when the search first reaches this CV R^2.")
+    parser.add_argument("--factor", type=int, default=HALVING_FACTOR, help="Halving: keep 1/factor per rung.")
+    parser.add_argument("--min-trees", type=int, default=MIN_TREES, help="Halving: trees at the first rung.")
+    parser.add_argument("--city", help="Train on this city's partitioned data.")
+    parser.add_argument("--station", nargs="+", help="With --city: only these stations (default: all).")
+    parser.add_argument("--publish", action="store_true", help="Serve the new model from the app.")
+    args = parser.parse_args()
+
+    selection = None
+    name = args.name or REPORTED_MODEL
+    if args.city:
+        selection = Slice(args.city, tuple(args.station or ()))
+        if args.name is None:
+            if args.station and len(args.station) > 1:
+                parser.error("name the model (--name) when training on several stations")
+            name = partition_model_name(REPORTED_MODEL, args.city, args.station[0] if args.station else ALL_STATIONS)
+
+    if args.model_type == 'hgb':
+        grid = {'max_iter': args.max_iter, 'learning_rate': args.learning_rate, 'max_leaf_nodes': args.max_leaf_nodes}
+    else:
+        grid = _search_grid(args.max_depth, args.n_estimators, args.min_samples_leaf)
+    print(f"{args.search.capitalize()} search on {os.cpu_count()} cores: {grid}")
+    result = train(args.features, cv=args.cv, test_size=args.test_size, seed=args.seed, n_jobs=args.jobs,
+                   search=args.search, target_r2=args.target_r2, factor=args.factor, min_trees=args.min_trees,
+                   model_type=args.model_type, grid=grid, selection=selection)
+    out = save_artifact(name, result)
+    metadata = result['metadata']
+    print(result['cv_results'].sort_values('rank').to_string(index=False))
+    print(f"Best {metadata['best_params']}: CV R^2 {metadata['cv_r2']:.4f}, test R^2 {metadata['test_r2']:.4f} "
+          f"({metadata['fits']} fits, {metadata['search_seconds']:.0f}s) -> {out}")
+    if args.target_r2 is not None:
+        reached = metadata['time_to_target']
+        print(f"CV R^2 {args.target_r2}: " + ("not reached" if reached is None else f"reached after {reached:.1f}s"))
+    if args.publish:
+        publish(name, out)
+        print(f"Published {name} {out.name}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
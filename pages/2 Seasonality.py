@@ -1,7 +1,12 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
-import numpy as np
+from bikes.aggregates import load_aggregate
+from bikes.sidebar import slice_picker
+from bikes.timing import end_page, start_page, start_span
+
+start_page("Seasonality")
+
+selection = slice_picker()
 
 # Text
 st.title('Bike Rental Explorations')
@@ -18,18 +23,15 @@ st.markdown(
     """
 )
 
-# Load data
-data = pd.read_csv("cleaned_data.csv")
-
-
 # Plot rentals by seasons and months
 
 chart_type = st.radio('Choose a time period:', ['Seasons', 'Months', 'Weeks'])
 
-season_counts = data.groupby('season')['cnt'].sum().reset_index()
-month_counts = data.groupby('mnth')['cnt'].sum().reset_index()
-weekday_counts = data.groupby('weekday')['cnt'].sum().reset_index()
+season_counts = load_aggregate('season_counts', selection=selection)
+month_counts = load_aggregate('month_counts', selection=selection)
+weekday_counts = load_aggregate('weekday_counts', selection=selection)
 
+figure = start_span("figure")
 if chart_type == 'Seasons':
     fig1 = px.bar(season_counts, 
                 x='season', 
@@ -78,6 +80,7 @@ elif chart_type == 'Weeks':
             ))
 
 st.plotly_chart(fig1)
+figure.stop()
 
 st.markdown(
     """
@@ -98,28 +101,11 @@ st.markdown(
 
 # Plot rentals over the day, split by working day vs. weekend day
 
-year_data = pd.read_csv("bike-sharing_hourly.csv")
-
-year_data['day'] = year_data['dteday'].apply(lambda x: str(x)[-2:])
-year_data['Working Day'] = year_data['workingday']
-
-hour_data = year_data.groupby(["yr","workingday","hr"]).agg({
-        'yr':'mean',
-        'Working Day':'mean',
-        'hr': 'mean',
-        'cnt': 'mean'
-        })
-
-def change_legend(data):
-    if data == 0:
-        return 'No'
-    else:
-        return 'Yes'
-    
-hour_data['Working Day'] = hour_data['Working Day'].apply(change_legend)
+hour_data = load_aggregate('hourly_profile', selection=selection)
 
 chart_type = st.radio('Choose a year:', ['2011', '2012'])
 
+figure = start_span("figure")
 if chart_type == '2011':
     hour_data = hour_data[hour_data["yr"] == 0]
     fig4 = px.line(hour_data, 
@@ -143,6 +129,7 @@ elif chart_type == '2012':
     fig4.update_traces(mode="markers+lines", hovertemplate=None)
     fig4.update_layout(hovermode="x unified")
 st.plotly_chart(fig4)
+figure.stop()
 
 st.markdown(
     """
@@ -162,9 +149,10 @@ st.markdown(
 # Plot rentals by day of the month
 
 # Group by 'day' and calculate the average counts
-day_avg_counts = data.groupby('day')['cnt'].mean().reset_index()
+day_avg_counts = load_aggregate('day_avg_counts', selection=selection)
 
 # Create the bar chart using Plotly Express
+figure = start_span("figure")
 fig5 = px.bar(day_avg_counts, x='day', y='cnt', 
              title='Mean Rentals by Day of the Month',
              labels={'cnt': 'Mean Rentals', 'day': 'Day of Month'},
@@ -173,10 +161,13 @@ fig5 = px.bar(day_avg_counts, x='day', y='cnt',
              width=800, height=500) 
 
 st.plotly_chart(fig5)
+figure.stop()
 
 st.markdown(
     """
     We see here that people rent bikes the most during the middle of the month, with the least popular day being the 22nd and the most popular being the 17th. This information 
     will likely be less actionable than many of our other insights, but is interesting to note nonetheless.
     """
-)
\ No newline at end of file
+)
+
+end_page()
@@ -1,7 +1,13 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
-import numpy as np
+from bikes.aggregates import load_aggregate
+from bikes.sidebar import slice_picker
+from bikes.smoothing import stored_trendline
+from bikes.timing import end_page, start_page, start_span
+
+start_page("Weather")
+
+selection = slice_picker()
 
 # Main content
 st.title('Bike Rental Explorations')
@@ -18,13 +24,11 @@ st.markdown(
     """
 )
 
-# Load data
-data = pd.read_csv("cleaned_data.csv")
-
 # Plot count of rentals by type of weather
 
-weather_counts = data.groupby('weathersit')['cnt'].sum().reset_index()
+weather_counts = load_aggregate('weather_counts', selection=selection)
 
+figure = start_span("figure")
 fig2 = px.bar(weather_counts, 
             x='cnt', 
             y='weathersit', 
@@ -45,6 +49,7 @@ fig2.update_layout(
                     "Heavy Rain or Snow, and Thunderstorms"]
         ))
 st.plotly_chart(fig2)
+figure.stop()
 
 st.markdown(
     """
@@ -54,74 +59,61 @@ st.markdown(
 
 st.markdown(
     """
-    We check next the bike rental counts by daily temperature. The red line is the line of best fit utilizing Locally Weighted Scatterplot Smoothing (LOWESS).
+    We check next the bike rental counts by daily temperature. The red line is the line of best fit utilizing Locally Weighted Scatterplot Smoothing (LOWESS),
+    or a binned moving average when there are too many days for LOWESS.
     Use the dropdown menu to change the colors in the chart to a third, optional, weather-related variable as well.
     """
 )
 
 
-# Upload data that still includes years
-year_data = pd.read_csv("bike-sharing_hourly.csv")
-
-# Edit dataset
-year_data['day'] = year_data['dteday'].apply(lambda x: str(x)[-2:])
-year_data['atemp'] = year_data['atemp'].apply(lambda x: x*50)
-year_data['Humidity'] = year_data['hum'].apply(lambda x: x*100)
-year_data['Windspeed'] = year_data['windspeed'].apply(lambda x: x*67)
-
-
-# Group by years, months, day and get a daily average temperature feel + sum of daily counts
+# Daily average temperature feel, humidity and windspeed + sum of daily counts,
+# grouped by years, months, day
+daily_weather = load_aggregate('daily_weather', selection=selection)
 
 chart_type = st.selectbox('Choose a third variable:', ['None','Windspeed', 'Humidity'])
 
+figure = start_span("figure")
 if chart_type == 'None':
-    year_dataset = year_data.groupby(["yr","mnth","day"]).agg({
-        'atemp': 'mean',
-        'cnt': 'sum'
-        })
+    year_dataset = daily_weather[['atemp', 'cnt']]
     fig3 = px.scatter(year_dataset, 
                 x='atemp', 
                 y='cnt', 
                 labels={"atemp": 'Temperature Feel (C)', "cnt": 'Sum of Rentals'},
-                trendline='lowess',
-                trendline_color_override='red',
                 title='Daily Sum of Rentals by Temperature Feel',
                 color='cnt',  # Color bars based on counts
                 color_continuous_scale='viridis',  # Use the same color scale as matplotlib
                 width=800, height=500)
 elif chart_type == 'Windspeed':
-    year_dataset = year_data.groupby(["yr","mnth","day"]).agg({
-        'atemp': 'mean',
-        'cnt': 'sum',
-        'Windspeed':'mean'
-        })
+    year_dataset = daily_weather[['atemp', 'cnt', 'Windspeed']]
     fig3 = px.scatter(year_dataset, 
                 x='atemp', 
                 y='cnt', 
                 labels={"atemp": 'Temperature Feel (C)', "cnt": 'Sum of Rentals'},
-                trendline='lowess',
-                trendline_color_override='red',
                 title='Daily Sum of Rentals by Temperature Feel',
                 color='Windspeed',  # Color bars based on counts
                 color_continuous_scale='viridis',  # Use the same color scale as matplotlib
                 width=800, height=500)
 elif chart_type == 'Humidity':
-    year_dataset = year_data.groupby(["yr","mnth","day"]).agg({
-        'atemp': 'mean',
-        'cnt': 'sum',
-        'Humidity':'mean'
-        })
+    year_dataset = daily_weather[['atemp', 'cnt', 'Humidity']]
     fig3 = px.scatter(year_dataset, 
                 x='atemp', 
                 y='cnt', 
                 labels={"atemp": 'Temperature Feel (C)', "cnt": 'Sum of Rentals'},
-                trendline='lowess',
-                trendline_color_override='red',
                 title='Daily Sum of Rentals by Temperature Feel',
                 color='Humidity',  # Color bars based on counts
                 color_continuous_scale='viridis',  # Use the same color scale as matplotlib
                 width=800, height=500)
+
+# Trendline fitted once per dataset version, not on every rerun
+trend, method = stored_trendline(load_aggregate('daily_weather_trend', selection=selection), len(daily_weather))
+fig3.add_scatter(x=trend['atemp'],
+                 y=trend['cnt'],
+                 mode='lines',
+                 line_color='red',
+                 name='LOWESS trendline' if method == 'lowess' else 'Binned trendline',
+                 showlegend=False)
 st.plotly_chart(fig3)
+figure.stop()
 
 st.markdown(
     """
@@ -129,4 +121,6 @@ st.markdown(
     Logically, these takeaways make sense: people like riding bikes more as it gets warmer, but not when it gets too hot. We see as well, through the optional third
     variables, that high humidity or windspeed appears to be correlated with slightly fewer people renting bikes. 
     """
-)
\ No newline at end of file
+)
+
+end_page()
@@ -1,8 +1,13 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+from bikes.aggregates import load_aggregate
+from bikes.sidebar import slice_picker
+from bikes.timing import end_page, start_page, start_span
+
+start_page("Type of User")
+
+selection = slice_picker()
 
 # Main content
 
@@ -22,15 +27,14 @@ st.markdown(
     """
 )
 
-# Load data
-data = pd.read_csv("bike-sharing_hourly.csv")
-
 # Define labels and sizes for the pie chart
-labels = ['Casual', 'Registered']
-sizes = [data['casual'].sum(), data['registered'].sum()]
+user_totals = load_aggregate('user_totals', selection=selection)
+labels = list(user_totals['TYPE'])
+sizes = list(user_totals['user'])
 colors = ['darkcyan', 'rebeccapurple']
 
 # Create the pie chart using Plotly Express
+figure = start_span("figure")
 fig = go.Figure(data=[go.Pie(labels=labels, values=sizes, hole=0.5, textinfo='percent', marker=dict(colors=colors))])
 
 # Set layout options
@@ -38,6 +42,7 @@ fig.update_layout(title='Share of Casual and Registered Users')
 
 # Show the chart
 st.plotly_chart(fig)
+figure.stop()
 
 st.markdown(
     """
@@ -49,56 +54,14 @@ st.markdown(
 
 chart_type = st.radio('Choose a time period:', ['Weeks', 'Months', 'Seasons'])
 
-# Format the data properly so we can use it to show percentages in the stacked bar charts
-week_reg = data.groupby('weekday')[['registered']].sum().reset_index()
-week_reg['TYPE'] = 'Registered'
-week_reg['user'] = week_reg['registered']
-week_reg = week_reg.drop('registered',axis=1)
-
-week_cas = data.groupby('weekday')[['casual']].sum().reset_index()
-week_cas['TYPE'] = 'Casual'
-week_cas['user'] = week_cas['casual']
-week_cas = week_cas.drop('casual',axis=1)
-
-# Combine above DFs vertically and add weight column
-combine_week = (week_reg,week_cas)
-total_week = pd.concat(combine_week)
-total_week['weight'] = total_week['user'] / total_week.groupby(['weekday'])['user'].transform('sum')
-
-# Format the data properly so we can use it to show percentages in the stacked bar charts
-month_reg = data.groupby('mnth')[['registered']].sum().reset_index()
-month_reg['TYPE'] = 'Registered'
-month_reg['user'] = month_reg['registered']
-month_reg = month_reg.drop('registered',axis=1)
-
-month_cas = data.groupby('mnth')[['casual']].sum().reset_index()
-month_cas['TYPE'] = 'Casual'
-month_cas['user'] = month_cas['casual']
-month_cas = month_cas.drop('casual',axis=1)
-
-# Combine above DFs vertically and add weight column
-combine_month = (month_reg,month_cas)
-total_month = pd.concat(combine_month)
-total_month['weight'] = total_month['user'] / total_month.groupby(['mnth'])['user'].transform('sum')
-
-# Format the data properly so we can use it to show percentages in the stacked bar charts
-season_reg = data.groupby('season')[['registered']].sum().reset_index()
-season_reg['TYPE'] = 'Registered'
-season_reg['user'] = season_reg['registered']
-season_reg = season_reg.drop('registered',axis=1)
-
-season_cas = data.groupby('season')[['casual']].sum().reset_index()
-season_cas['TYPE'] = 'Casual'
-season_cas['user'] = season_cas['casual']
-season_cas = season_cas.drop('casual',axis=1)
-
-# Combine above DFs vertically and add weight column
-combine_season = (season_reg,season_cas)
-total_season = pd.concat(combine_season)
-total_season['weight'] = total_season['user'] / total_season.groupby(['season'])['user'].transform('sum')
+# Share of casual and registered users per time period, for the stacked bar charts
+total_week = load_aggregate('users_by_weekday', selection=selection)
+total_month = load_aggregate('users_by_month', selection=selection)
+total_season = load_aggregate('users_by_season', selection=selection)
 
 # Plot share of type of users by time period
 
+figure = start_span("figure")
 if chart_type == 'Weeks':
     fig2 = px.bar(total_week, x="weekday", y='weight', color='TYPE',  
               title="Share of Casual and Registered Users by Day of Week",
@@ -140,6 +103,7 @@ elif chart_type == 'Seasons':
             ))
     fig2.update_traces(texttemplate='%{value:.2f}')
 st.plotly_chart(fig2)
+figure.stop()
 
 st.markdown(
     """
@@ -150,4 +114,6 @@ st.markdown(
      another way. Alternatively, as we already know that a higher proportion of those renting bikes during weekdays are registered users, perhaps more registered users 
      must rent a bike in order to commute to work, no matter the weather, while casual riders simply have more choice in the matter.
     """
-)
\ No newline at end of file
+)
+
+end_page()
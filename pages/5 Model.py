@@ -1,10 +1,14 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
-import joblib
-from sklearn.ensemble import RandomForestClassifier
+from bikes.data import MODEL_COMPARISON_CSV, load_csv
+from bikes.schema import CLEANED_DTYPES
+from bikes.correlation import hourly_correlation
+from bikes.models import get_model
+from bikes.train import depth_scores
+from bikes.timing import end_page, start_page, start_span
+
+start_page("Model")
 
 # Main content
 
@@ -33,19 +37,15 @@ st.markdown(
 
 # CORRELATION MATRIX
 
-# Use original data, so it still has both temp and atemp in it for the correlation matrix
-original_data = pd.read_csv("bike-sharing_hourly.csv")
-original_data['day'] = original_data['dteday'].apply(lambda x: str(x)[-2:])
-original_data = original_data.drop(["dteday","casual","registered","instant","yr"],axis=1)
-
-# Exclude non-numeric columns from the correlation matrix
-numeric_data = original_data.select_dtypes(include=[np.number])
-correlation = numeric_data.corr().abs()
+# Use original data, so it still has both temp and atemp in it for the correlation matrix.
+# Served from running statistics that are only updated when the data grows
+correlation = hourly_correlation().abs()
 
 # Reverse the order of rows and columns
 correlation = correlation.iloc[::-1, ::-1]
 
 # Create a heatmap with reversed diagonal values
+figure = start_span("figure")
 fig = go.Figure(data=go.Heatmap(
     z=correlation.values,  # Use the corrected correlation matrix
     x=list(correlation.columns),
@@ -67,6 +67,7 @@ fig.update_layout(
 )
 
 st.plotly_chart(fig)
+figure.stop()
 
 
 st.markdown(
@@ -97,13 +98,10 @@ st.markdown(
 
 # Plot R^2 by depths during cross-validation
 
-# Load means data and manipulate it into a DataFrame along with the Max_Depths
-means = joblib.load("means.joblib")
-list = list(means)
-depth = [20,21,22,23,24]
-frame = [[depth[0], list[0]], [depth[1], list[1]], [depth[2], list[2]],[depth[3], list[3]],[depth[4], list[4]]]
-r2_df = pd.DataFrame(frame, columns=['Max_Depth','R2'])
+# Mean cross-validated R^2 per Max_Depth, from the published training run
+r2_df = depth_scores("Model3")
 
+figure = start_span("figure")
 fig3 = px.line(r2_df, 
             x='Max_Depth', 
             y='R2', 
@@ -113,12 +111,13 @@ fig3 = px.line(r2_df,
 fig3.update_layout(
             xaxis = dict(
             tickmode = 'array',
-            tickvals = [20,21,22,23,24]
+            tickvals = r2_df['Max_Depth'].tolist()
             ),
             showlegend=False,
             )
 fig3.update_traces(mode="markers+lines", line_color='rebeccapurple')
 st.plotly_chart(fig3)
+figure.stop()
 
 
 st.markdown(
@@ -135,13 +134,14 @@ st.markdown(
 
 # Plot Feature Importance
 
-# Load model and data
-model = joblib.load("Model2.joblib")
-data = pd.read_csv("cleaned_data.csv")
+# Load model
+model = get_model("Model2").model
 
 model_feat = model.feature_importances_
-columns = data.drop("cnt",axis=1).columns
+# Feature names are the cleaned data's columns; no need to read the data itself
+columns = [column for column in CLEANED_DTYPES if column != "cnt"]
 
+figure = start_span("figure")
 fig2 = px.bar(model_feat, 
             x=columns, 
             y=model_feat,
@@ -156,6 +156,7 @@ fig2.update_layout(
             )
 
 st.plotly_chart(fig2)
+figure.stop()
 
 st.markdown(
     """
@@ -173,3 +174,33 @@ st.markdown(
     case is sufficient for approximating number of bike rentals.
     """
 )
+
+# Compare the model families the Simulator offers
+
+st.subheader("Faster Alternatives")
+
+st.markdown(
+    """
+    A deep Random Forest is large, and every prediction walks all of its trees. We also trained a histogram-based gradient boosting model on the same features 
+    (Model3-hgb), and exported the forest to a compact array format (Model3-compact). The Simulator can use any of them. Here is how they compare on the test set, 
+    along with their size and how long they take to load and to predict.
+    """
+)
+
+if MODEL_COMPARISON_CSV.exists():
+    comparison = load_csv(MODEL_COMPARISON_CSV)
+    st.dataframe(comparison.round(4), hide_index=True)
+
+    figure = start_span("figure")
+    fig4 = px.bar(comparison,
+            x='model',
+            y='file (MB)',
+            color='test R2',
+            color_continuous_scale='viridis',
+            title='Model Size and Test R^2')
+    st.plotly_chart(fig4)
+    figure.stop()
+else:
+    st.write("No comparison has been run yet. Run `python benchmarks/bench_models.py` to create one.")
+
+end_page()
@@ -1,6 +1,10 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+from bikes.columnar import load_columns
+from bikes.features import yes_no
+from bikes.timing import end_page, start_page, start_span
+
+start_page("Prediction Insights")
 
 
 # Main text
@@ -15,18 +19,13 @@ st.markdown(
 )
 
 # Load comparison data between real and predicted values
-comparison = pd.read_csv("real_pred.csv")
+comparison = load_columns('real_pred', ['real', 'prediction', 'season', 'atemp', 'hum', 'workingday']).copy()
 
-def change_legend(data):
-    if data == 0:
-        return 'No'
-    else:
-        return 'Yes'
-    
-comparison['workingday'] = comparison['workingday'].apply(change_legend)
+comparison['workingday'] = yes_no(comparison['workingday'])
 
 
 chart_type = st.selectbox('Choose a third variable:', ['None','Seasons','Temperature Feel', 'Humidity'])
+figure = start_span("figure")
 if chart_type == 'None':
     fig = px.scatter(comparison, 
                 x='real', 
@@ -72,6 +71,7 @@ elif chart_type == 'Seasons':
     
 
 st.plotly_chart(fig)
+figure.stop()
 
 st.markdown(
     """
@@ -80,4 +80,6 @@ st.markdown(
      of the line after this value indicates that the Real value is relatively higher than the Predicted value, as compared to the Real-Predicted comparison before 
      the angle.
     """
-)
\ No newline at end of file
+)
+
+end_page()
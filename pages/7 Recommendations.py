@@ -1,23 +1,25 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
+from bikes.aggregates import load_aggregate
+from bikes.correlation import hourly_correlation
+from bikes.timing import end_page, start_page, start_span
+
+start_page("Recommendations")
 
 # Set page title and header
 st.title("Bike Rental Explorations")
 st.header('Recommendations for Optimization')
 st.markdown("Coupons; special events; cost optimizing.. and more!")
 
-# Load bikesharing dataset (assuming 'data' is your bikesharing dataset)
-data = pd.read_csv("bike-sharing_hourly.csv")
-
 # Title: COUPONS & OTHER GIFTS:
 st.subheader("**Coupons & Other Gifts:**")
 
 # Group by 'weekday' and sum the counts
-weekday_counts = data.groupby('weekday')['cnt'].sum().reset_index()
+weekday_counts = load_aggregate('weekday_counts')
 
 # Create the bar chart using Plotly Express
+figure = start_span("figure")
 fig1 = px.bar(weekday_counts, x='weekday', y='cnt', 
             title='Count of Rentals by Day of Week',
             labels={'cnt': 'Count of Rentals', 'weekday': 'Day of Week'},
@@ -31,6 +33,7 @@ fig1.update_layout(
             ticktext = ["Sunday","Monday","Tuesday","Wednesday","Thursday","Friday","Saturday"]
         ))
 st.plotly_chart(fig1)
+figure.stop()
 
 # Bold and italicized text: Insights
 st.markdown("*Insights:*")
@@ -50,23 +53,11 @@ st.write("""
     e.g: "**First 3 minutes are free on Sundays**" (Sundays because it is the least popular day).
 """)
 
-# Format the data properly so we can use it to show percentages in the stacked bar chart below
-season_reg = data.groupby('season')[['registered']].sum().reset_index()
-season_reg['TYPE'] = 'Registered'
-season_reg['user'] = season_reg['registered']
-season_reg = season_reg.drop('registered',axis=1)
-
-season_cas = data.groupby('season')[['casual']].sum().reset_index()
-season_cas['TYPE'] = 'Casual'
-season_cas['user'] = season_cas['casual']
-season_cas = season_cas.drop('casual',axis=1)
-
-# Combine above DFs vertically and add weight column
-combine_season = (season_reg,season_cas)
-total_season = pd.concat(combine_season)
-total_season['weight'] = total_season['user'] / total_season.groupby(['season'])['user'].transform('sum')
+# Share of casual and registered users per season, for the stacked bar chart below
+total_season = load_aggregate('users_by_season')
 
 # Plot stacked bar chart
+figure = start_span("figure")
 fig3 = px.bar(total_season, x="season", y='weight', color='TYPE',  
             title="Share of Casual and Registered Users by Season",
             labels={'weight': 'Share', 'TYPE': 'Type of User','season':'Season'},
@@ -80,6 +71,7 @@ fig3.update_layout(
         ))
 fig3.update_traces(texttemplate='%{value:.2f}')
 st.plotly_chart(fig3)
+figure.stop()
 
 # Insights
 st.markdown("*Insights:*")
@@ -99,11 +91,13 @@ st.write("""
 st.subheader("**Bonuses and Other Offers:**")
 
 # Define labels and sizes for the pie chart
-labels = ['Casual', 'Registered']
-sizes = [data['casual'].sum(), data['registered'].sum()]
+user_totals = load_aggregate('user_totals')
+labels = list(user_totals['TYPE'])
+sizes = list(user_totals['user'])
 colors = ['darkcyan', 'rebeccapurple']
 
 # Create the pie chart using Plotly Express
+figure = start_span("figure")
 fig5 = go.Figure(data=[go.Pie(labels=labels, values=sizes, hole=0.5, textinfo='percent', marker=dict(colors=colors))])
 
 # Set layout options
@@ -111,6 +105,7 @@ fig5.update_layout(title='Share of Casual and Registered Users')
 
 # Show the chart
 st.plotly_chart(fig5)
+figure.stop()
 
 # Bold and italicized text: Insights
 st.markdown("*Insights:*")
@@ -127,7 +122,7 @@ st.write("""
 """)
 
 # Group by 'workingday' and sum the counts
-workingday_counts = data.groupby('workingday')['cnt'].sum().reset_index()
+workingday_counts = load_aggregate('workingday_counts')
 
 # Define labels, sizes, and colors for the pie chart
 labels = ['Non-Working Day', 'Working Day']
@@ -135,6 +130,7 @@ sizes = workingday_counts['cnt']
 colors = ['darkcyan', 'rebeccapurple']
 
 # Create the pie chart using Plotly Express
+figure = start_span("figure")
 fig1 = go.Figure(data=[go.Pie(labels=labels, values=sizes, hole=0.5, textinfo='percent', marker=dict(colors=colors))])
 
 # Set layout options
@@ -142,16 +138,18 @@ fig1.update_layout(title='Share of Rentals between Working Days and Non-Working
 
 # Show the chart
 st.plotly_chart(fig1)
+figure.stop()
 
 # Count occurrences of working days and non-working days
-workingday_counts = data['workingday'].value_counts()
+workingday_hours = load_aggregate('workingday_hours')
 
 # Define labels, sizes, and colors for the pie chart
 labels = ['Working Day', 'Non-Working Day']
-sizes = workingday_counts.values
+sizes = workingday_hours['count'].values
 colors = ['rebeccapurple','darkcyan']
 
 # Create the pie chart using Plotly Express
+figure = start_span("figure")
 fig2 = go.Figure(data=[go.Pie(labels=labels, values=sizes, hole=0.5, textinfo='percent', marker=dict(colors=colors))])
 
 # Set layout options
@@ -159,6 +157,7 @@ fig2.update_layout(title='Share of Working Days and Non-Working Days')
 
 # Show the chart
 st.plotly_chart(fig2)
+figure.stop()
 
 # Insights
 st.markdown("*Insights:*")
@@ -176,9 +175,10 @@ st.write("""
 st.subheader("**Cost Optimizing; Fleet Management; and Technical Improvements:**")
 
 # Group by 'season' and sum the counts
-season_counts = data.groupby('season')['cnt'].sum().reset_index()
+season_counts = load_aggregate('season_counts')
 
 # Create the bar chart using Plotly Express
+figure = start_span("figure")
 fig2 = px.bar(season_counts, 
             x='season', 
             y='cnt', 
@@ -195,6 +195,7 @@ fig2.update_layout(
             ticktext = ["Spring","Summer","Autumn","Winter"]
         ))
 st.plotly_chart(fig2)
+figure.stop()
 
 # Bold and italicized text: Insights
 st.markdown("*Insights:*")
@@ -215,8 +216,9 @@ st.write("""
 """)
 
 # Group by 'weathersit' and sum the counts
-weather_counts = data.groupby('weathersit')['cnt'].sum().reset_index()
+weather_counts = load_aggregate('weather_counts')
 
+figure = start_span("figure")
 fig4 = px.bar(weather_counts, 
             x='cnt', 
             y='weathersit', 
@@ -237,6 +239,7 @@ fig4.update_layout(
                     "Heavy Rain or Snow, and Thunderstorms"]
         ))
 st.plotly_chart(fig4)
+figure.stop()
 
 # Bold and italicized text: Insights
 st.markdown("*Insights:*")
@@ -254,12 +257,13 @@ st.write("""
 """)
 
 # Create the heatmap with Plotly Express
-correlation_matrix = data[['temp', 'hum', 'windspeed', 'cnt']].corr()
+correlation_matrix = hourly_correlation(['temp', 'hum', 'windspeed', 'cnt'])
 
 # Convert correlation matrix to DataFrame
 correlation_df = correlation_matrix.reset_index().melt(id_vars='index')
 
 # Create the heatmap with Plotly Express
+figure = start_span("figure")
 fig_heatmap = px.imshow(correlation_df.pivot(index='index', columns='variable', values='value'),
                         labels=dict(index="Variables", variable="Variables", color="Correlation"),
                         x=correlation_matrix.columns,
@@ -272,6 +276,7 @@ fig_heatmap.update_layout(title='Correlation Matrix: Temperature, Humidity, Wind
 
 # Show the chart
 st.plotly_chart(fig_heatmap)
+figure.stop()
 
 # Bold and italicized text: Insights
 st.markdown("*Insights:*")
@@ -285,4 +290,6 @@ st.markdown("*Recommendations:*")
 # Text below the chart
 st.write("""
     In that case, we could recommend the customer to implement/build something on the bikes to resist more against other meteorological factors (like humidity for example), rather than wind.
-""")
\ No newline at end of file
+""")
+
+end_page()
@@ -2,9 +2,16 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import joblib
-from sklearn.ensemble import RandomForestClassifier
+from bikes.encoding import DAYS_OF_WEEK, FEATURES, SEASON_MONTHS, SEASONS, WEATHER, EncodingError, encode_frame, encode_inputs, scenario_grid
+from bikes.models import available_models
+from bikes.partitions import ALL_STATIONS, partition_model_name
+from bikes.predict import predict_batch, predict_one
+from bikes.sidebar import slice_picker
+from bikes.timing import end_page, start_page, stop_page
+
+start_page("Simulator")
+
+selection = slice_picker()
 
 # Page text
 
@@ -18,6 +25,19 @@ st.markdown(
     """
 )
 
+# The Model page compares the models on offer. Models trained on the stations
+# chosen in the sidebar (python -m bikes.train --city ... --station ...) come first.
+models = available_models()
+if selection is not None:
+    models = available_models([partition_model_name(model, selection.city, station)
+                               for station in selection.stations or (ALL_STATIONS,) for model in models]) + models
+if not models:
+    st.warning("There is no model to predict with yet. Train one with `python -m bikes.train --publish`.")
+    stop_page()
+model_name = st.selectbox(label="Which model should predict?",
+             options=models,
+             help="Model3 is the Random Forest; Model3-hgb is a gradient boosting model that is smaller and faster.")
+
 # Create two columns
 col1,col2 = st.columns(2)
 
@@ -93,121 +113,91 @@ weather = col2.selectbox(label="What will the weather be like?",
 
 
 
-# Create functions to translate input data into numbers that the model will process
-
-def change_season(data):
-    if data == "Winter":
-        return 1
-    elif data == "Spring":
-        return 2
-    elif data == "Summer":
-        return 3
-    else:
-        return 4
-    
-def change_month(data):
-    if data == "January":
-        return 1
-    elif data == "February":
-        return 2
-    elif data == "March":
-        return 3
-    elif data == "April":
-        return 4
-    elif data == "May":
-        return 5
-    elif data == "June":
-        return 6
-    elif data == "July":
-        return 7
-    elif data == "August":
-        return 8
-    elif data == "September":
-        return 9
-    elif data == "October":
-        return 10
-    elif data == "November":
-        return 11
-    elif data == "December":
-        return 12
-
-#def change_holiday(data):
-#    if data == "Yes":
-#        return 1
-#    else:
-#        return 0
-    
-def change_day_of_week(data):
-    if data == "Monday":
-        return 1
-    elif data == "Tuesday":
-        return 2
-    elif data == "Wednesday":
-        return 3
-    elif data == "Thursday":
-        return 4
-    elif data == "Friday":
-        return 5
-    elif data == "Saturday":
-        return 6
-    else:
-        return 0
-
-def change_weekday(data):
-    if data in [1,5]:
-        return 0
+# Make prediction and display answer
+if st.button('Click here to predict!'):
+    # Translate input data into numbers that the model will process
+    try:
+        if None in (season, month, day_of_week, weather):
+            raise EncodingError("choose a season, month, day of the week and weather first.")
+        frame = [encode_inputs(season, month, day, hour, day_of_week, temperature_feel, humidity, wind, weather)]
+    except EncodingError as error:
+        st.warning(f"Please check your answers above - {error}")
     else:
-        return 1
+        # Shared by all sessions: repeated scenarios are answered from the cache
+        pred = predict_one(frame[0], model_name)
+        st.write('We predict ', round(pred), ' bike users that hour.')
 
-temperature_feel = temperature_feel/50
+# Batch predictions
 
-humidity = humidity/100
+st.subheader("Batch Predictions")
 
-wind = wind/67
-
-def change_weather(data):
-    if data == "Clear; or Partly Cloudy":
-        return 1
-    elif data == "Misty and Cloudy; or Misty":
-        return 2
-    elif data == "Light Snow; or Light Rain and Scattered Clouds with or without Thunderstorm":
-        return 3
-    else:
-        return 4
+st.markdown(
+    """
+    Need more than one hour? Predict a whole grid of scenarios at once - for example every hour of every day of a week - or upload a CSV of 
+    scenarios. All rows are scored in a single call, and you can download the results.
+    """
+)
 
-def change_workingday(data1, data2):
-    if data1 == 0 and data2 == 0:
-        return 0
+batch_source = st.radio("Where should the scenarios come from?", ["Build a grid", "Upload a CSV"], horizontal=True)
+
+scenarios = None
+raw = None
+
+if batch_source == "Build a grid":
+    col3,col4 = st.columns(2)
+
+    batch_season = col3.selectbox(label="Season", options=SEASONS, key="batch_season")
+    batch_month = col3.selectbox(label="Month", options=SEASON_MONTHS[batch_season], key="batch_month")
+    batch_day = col3.slider(label="Day of the month", min_value=1, max_value=31, step=1, key="batch_day")
+    batch_hours = col3.slider(label="Hours", min_value=0, max_value=23, value=(0, 23), step=1, key="batch_hours")
+    batch_days_of_week = col3.multiselect(label="Days of the week", options=DAYS_OF_WEEK, default=DAYS_OF_WEEK, key="batch_days_of_week")
+
+    batch_weather = col4.multiselect(label="Weather", options=WEATHER, default=WEATHER[:1], key="batch_weather")
+    batch_temperature = col4.slider(label="Temperature feel (in Celsius)", min_value=0, max_value=50, value=20, step=1, key="batch_temperature")
+    batch_humidity = col4.slider(label="Humidity", min_value=0, max_value=100, value=50, step=1, key="batch_humidity")
+    batch_wind = col4.slider(label="Wind speed (in knots)", min_value=0, max_value=67, value=10, step=1, key="batch_wind")
+
+    raw = scenario_grid(season=[batch_season],
+                        month=[batch_month],
+                        day=[batch_day],
+                        hour=range(batch_hours[0], batch_hours[1] + 1),
+                        day_of_week=batch_days_of_week,
+                        temperature_feel=[batch_temperature],
+                        humidity=[batch_humidity],
+                        wind=[batch_wind],
+                        weather=batch_weather)
+    if len(raw):
+        try:
+            scenarios = encode_frame(raw)
+        except EncodingError as error:
+            st.warning(f"Please check the grid above - {error}")
+else:
+    st.markdown(
+        f"""
+        The CSV needs the model's columns: {", ".join(FEATURES)}. Use the same encoding as the model (see real_pred.csv): 
+        atemp, hum and windspeed scaled to between 0 and 1. Any other columns are kept in the results.
+        """
+    )
+    upload = st.file_uploader("Upload scenarios", type="csv")
+    if upload is not None:
+        try:
+            scenarios = pd.read_csv(upload)
+        except ValueError as error:
+            st.error(f"Could not read this file as a CSV: {error}")
+
+if scenarios is not None and st.button(f"Predict {len(scenarios)} scenarios"):
+    try:
+        results = predict_batch(scenarios, model_name)
+    except ValueError as error:
+        st.error(f"Could not predict these scenarios: {error}")
     else:
-        return 1
-
-
-# Run functions 
-    
-season = change_season(season)
-month = change_month(month)
-day_of_week = change_day_of_week(day_of_week)
-weekday = change_weekday(day_of_week)
-weather = change_weather(weather)
-
-
-#if weekday == 0:
-#    holiday = change_holiday(holiday)
-#else:
-#    holiday = 0
-
-workingday = change_workingday(0, weekday)
-
-
-
-# Upload model
-model = joblib.load("Model3.joblib")
-
-# Make prediction and display answer
-if st.button('Click here to predict!'):
-    frame = [[season, month, hour, weekday, workingday, weather, temperature_feel, humidity, wind, day]]
- 
-    df = pd.DataFrame(frame, columns=['season','mnth','hr','weekday','workingday','weathersit','atemp','hum','windspeed','day'])
-
-    pred = model.predict(df)
-    st.write('We predict ', round(pred[0]), ' bike users that hour.')
\ No newline at end of file
+        if raw is not None:
+            # Show the grid as it was entered rather than encoded
+            results = raw.assign(prediction=results['prediction'])
+        st.dataframe(results)
+        st.download_button("Download predictions",
+                           data=results.to_csv(index=False),
+                           file_name="predictions.csv",
+                           mime="text/csv")
+
+end_page()
@@ -0,0 +1,157 @@
+import os
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from bikes.batcher import batch_stats
+from bikes.columnar import memory_report as column_memory_report
+from bikes.data import memory_report
+from bikes.models import load_counts, loaded_models, reloading
+from bikes.lookup import table_stats
+from bikes.pool import pool_stats
+from bikes.predict import cache_stats
+from bikes import timing
+from bikes.timing import end_page, start_page, stop_page
+
+# The page reports on the server itself, not the data, so it is only shown
+# when the app runs with BIKES_DIAGNOSTICS=1
+DIAGNOSTICS = os.environ.get("BIKES_DIAGNOSTICS", "0") != "0"
+
+start_page("Diagnostics")
+
+# Main content
+st.title('Bike Rental Explorations')
+st.header("Diagnostics")
+
+if not DIAGNOSTICS:
+    st.info("Diagnostics are off. Start the app with BIKES_DIAGNOSTICS=1 to see them.")
+    stop_page()
+
+st.markdown(
+    """
+    How the app is doing behind the scenes in this server process: where page reruns spend their time, which models are loaded, how often 
+    the Simulator's predictions are answered from the prediction cache instead of running the model, and how much memory the shared datasets take.
+    """
+)
+
+# Page timing
+
+st.subheader("Page Timing")
+
+rss, peak = timing.rss_mb()
+col1,col2 = st.columns(2)
+col1.metric("Process memory (RSS)", f"{rss:.0f} MB")
+col2.metric("Peak RSS", f"{peak:.0f} MB")
+
+timings = pd.DataFrame(timing.summary())
+if len(timings):
+    page = st.selectbox("Page", sorted(timings["page"].unique()), key="timing_page")
+    page_df = timings[timings['page'] == page]
+    st.dataframe(page_df.drop(columns='page').round(2), hide_index=True)
+
+    fig1 = px.bar(page_df.melt(id_vars='stage', value_vars=['p50 (ms)', 'p95 (ms)'], var_name='percentile', value_name='ms'),
+            x='stage',
+            y='ms',
+            color='percentile',
+            barmode='group',
+            color_discrete_sequence=['darkcyan', 'rebeccapurple'],
+            title=f'{page}: time per stage')
+    st.plotly_chart(fig1)
+
+    reruns = timing.durations(page)
+    if reruns:
+        fig2 = px.histogram(x=reruns,
+                labels={'x': 'Rerun time (ms)'},
+                color_discrete_sequence=['rebeccapurple'],
+                title=f'{page}: rerun times')
+        st.plotly_chart(fig2)
+else:
+    st.write("No page has been timed yet.")
+
+lookups = timing.cache_stats()
+if lookups:
+    st.dataframe(pd.DataFrame.from_dict(lookups, orient='index').rename_axis('cache').reset_index().round(3), hide_index=True)
+
+st.download_button("Download as JSON lines",
+                   data=timing.to_jsonl(),
+                   file_name="timings.jsonl",
+                   mime="application/x-ndjson")
+
+# Prediction cache
+
+st.subheader("Prediction Cache")
+
+stats = cache_stats()
+if stats:
+    cache_df = pd.DataFrame.from_dict(stats, orient='index').rename_axis('model').reset_index()
+    st.dataframe(cache_df, hide_index=True)
+    col1,col2,col3 = st.columns(3)
+    col1.metric("Hits", sum(s['hits'] for s in stats.values()))
+    col2.metric("Misses", sum(s['misses'] for s in stats.values()))
+    lookups = sum(s['hits'] + s['misses'] for s in stats.values())
+    col3.metric("Hit rate", f"{sum(s['hits'] for s in stats.values()) / lookups:.0%}" if lookups else "-")
+else:
+    st.write("No predictions have been requested yet.")
+
+# Micro-batching of single predictions
+
+st.subheader("Prediction Batching")
+
+batches = batch_stats()
+if batches:
+    st.dataframe(pd.DataFrame.from_dict(batches, orient='index').rename_axis('model').reset_index().round(2), hide_index=True)
+else:
+    st.write("No prediction has reached a model yet.")
+
+pools = pool_stats()
+if pools:
+    st.write("Batch predictions scored in worker processes:")
+    st.dataframe(pd.DataFrame.from_dict(pools, orient='index').rename_axis('model').reset_index(), hide_index=True)
+
+# Precomputed prediction table
+
+st.subheader("Prediction Table")
+
+tables = table_stats()
+if tables:
+    st.dataframe(pd.DataFrame.from_dict(tables, orient='index').rename_axis('model').reset_index(), hide_index=True)
+else:
+    st.write("No prediction table is loaded. Build one with `python -m bikes.lookup`.")
+
+# Models
+
+st.subheader("Models")
+
+models = loaded_models()
+if models:
+    counts = load_counts()
+    pending = reloading()
+    models_df = pd.DataFrame([{
+        'model': handle.name,
+        'version': handle.version,
+        'file': handle.path.name,
+        'load time (s)': round(handle.load_seconds, 3),
+        'times loaded': counts.get(name, 0),
+        'newer version loading': name in pending,
+        } for name, handle in models.items()])
+    st.dataframe(models_df, hide_index=True)
+else:
+    st.write("No models have been loaded yet.")
+
+# Datasets in memory
+
+st.subheader("Data Memory")
+
+memory = memory_report() + column_memory_report()
+if memory:
+    memory_df = pd.DataFrame(memory).round(2)
+    st.dataframe(memory_df, hide_index=True)
+    col1,col2 = st.columns(2)
+    col1.metric("Held in memory", f"{memory_df['memory (MB)'].sum():.1f} MB")
+    col2.metric("Saved by compact dtypes", f"{memory_df['saved (MB)'].sum():.1f} MB")
+    st.write(f"""Every session in this process shares these frames. A session holding its own copies at the CSV dtypes would need 
+             {memory_df['at CSV dtypes (MB)'].sum():.1f} MB more; this is what each session saves.""")
+else:
+    st.write("No datasets have been loaded yet.")
+
+end_page()
@@ -0,0 +1,69 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from bikes.batcher import MicroBatcher
+from bikes.encoding import FEATURES
+
+ROW = tuple(float(value) for value in range(len(FEATURES)))
+
+
+def _handle(predict, version="v1"):
+    return SimpleNamespace(version=version, predict=predict)
+
+
+def test_a_failed_batch_fails_its_callers_and_the_worker_carries_on():
+    batcher = MicroBatcher("test-failure", max_wait_ms=0)
+    # One prediction too few: matching them back to their rows fails
+    with pytest.raises(KeyError):
+        batcher.predict(_handle(lambda X: np.array([])), ROW)
+    assert batcher.predict(_handle(lambda X: np.full(len(X), 3.0)), ROW) == 3.0
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_worker_is_restarted():
+    batcher = MicroBatcher("test-restart", max_wait_ms=0)
+
+    def exit_thread(X):
+        raise SystemExit
+
+    batcher.submit(_handle(exit_thread), ROW)
+    batcher._thread.join(timeout=5)
+    assert not batcher._thread.is_alive()
+    assert batcher.predict(_handle(lambda X: np.full(len(X), 2.0)), ROW) == 2.0
+    assert batcher.restarts == 1
+
+
+def test_stuck_worker_times_out_to_a_direct_prediction():
+    batcher = MicroBatcher("test-timeout", max_wait_ms=0, timeout_s=0.2)
+    release = threading.Event()
+
+    def stuck(X):
+        release.wait()
+        return np.zeros(len(X))
+
+    batcher.submit(_handle(stuck, "stuck"), ROW)
+    assert batcher.predict(_handle(lambda X: np.full(len(X), 5.0)), ROW) == 5.0
+    assert batcher.timeouts == 1
+    release.set()
+
+
+def test_concurrent_timeouts_are_all_counted():
+    batcher = MicroBatcher("test-timeouts", max_wait_ms=0, timeout_s=0.1)
+    release = threading.Event()
+
+    def stuck(X):
+        release.wait()
+        return np.zeros(len(X))
+
+    batcher.submit(_handle(stuck, "stuck"), ROW)
+    callers = [threading.Thread(target=batcher.predict, args=(_handle(lambda X: np.ones(len(X))), ROW))
+               for _ in range(16)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert batcher.stats()['timeouts'] == 16
+    release.set()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from bikes.compact import TOLERANCE, export_forest
+from bikes.data import load_cleaned
+from bikes.encoding import FEATURES
+from bikes.models import model_path
+
+# Leaf values are stored as float32: on Model3 the largest difference is
+# about 2e-6 rentals, well inside TOLERANCE
+ATOL = TOLERANCE
+
+
+def _data(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, 4)) * [1, 10, 1e-3, 1e4], columns=['a', 'b', 'c', 'd'])
+    y = X['a'] * 3 + np.sin(X['b']) * 100 + X['c'] * 1e4 + rng.normal(size=rows)
+    return X, y
+
+
+def test_compact_forest_matches_the_fitted_forest():
+    X, y = _data()
+    forest = RandomForestRegressor(n_estimators=20, max_depth=12, random_state=0).fit(X, y)
+    compact = export_forest(forest)
+    X_new, _ = _data(seed=1)
+    np.testing.assert_allclose(compact.predict(X_new), forest.predict(X_new), rtol=0, atol=ATOL)
+    # Columns are picked by name, so their order does not matter
+    np.testing.assert_allclose(compact.predict(X_new[['d', 'c', 'b', 'a']]), forest.predict(X_new),
+                               rtol=0, atol=ATOL)
+
+
+def test_compact_tree_splits_exactly_on_training_thresholds():
+    X, y = _data()
+    tree = DecisionTreeRegressor(random_state=0).fit(X, y)
+    compact = export_forest(tree)
+    # A fully grown tree fits its training rows: any split that went the
+    # other way would show up as a large error
+    np.testing.assert_allclose(compact.predict(X), tree.predict(X), rtol=0, atol=ATOL)
+
+
+def test_compact_forest_rejects_the_wrong_number_of_features():
+    X, y = _data(rows=100)
+    compact = export_forest(RandomForestRegressor(n_estimators=2, random_state=0).fit(X.values, y))
+    with pytest.raises(ValueError):
+        compact.predict(np.zeros((3, 5)))
+
+
+@pytest.mark.skipif(not model_path("Model3").exists(), reason="Model3.joblib is not available")
+def test_compact_model3_matches_model3():
+    import joblib
+
+    model = joblib.load(model_path("Model3"))
+    X = load_cleaned()[FEATURES].iloc[:3000]
+    np.testing.assert_allclose(export_forest(model).predict(X), model.predict(X), rtol=0, atol=ATOL)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bikes.correlation as correlation
+from bikes.correlation import CORRELATION_COLUMNS, RunningCorrelation
+
+COLUMNS = ['a', 'b', 'c']
+
+
+def _frame(rows, seed, start=1):
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=rows)
+    return pd.DataFrame({'instant': np.arange(start, start + rows),
+                         'a': a * 1e3 + 5e6, 'b': a + rng.normal(size=rows), 'c': rng.integers(0, 4, rows)})
+
+
+def _expected(frame, columns=COLUMNS):
+    return np.corrcoef(frame[columns].to_numpy(dtype=np.float64), rowvar=False)
+
+
+def test_merged_state_equals_corrcoef_on_the_concatenation():
+    first, second, third = _frame(500, 0), _frame(3, 1), _frame(1200, 2)
+    merged = RunningCorrelation(COLUMNS).update(first)
+    merged.merge(RunningCorrelation(COLUMNS).update(second)).merge(RunningCorrelation(COLUMNS).update(third))
+    everything = pd.concat([first, second, third])
+    np.testing.assert_allclose(merged.correlation().to_numpy(), _expected(everything), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(merged.covariance().to_numpy(), everything[COLUMNS].cov().to_numpy(), rtol=1e-10)
+    assert merged.n == len(everything)
+
+
+def test_rows_with_a_missing_value_are_skipped_and_columns_must_match():
+    frame = _frame(100, 3)
+    frame.loc[[5, 50], 'b'] = np.nan
+    state = RunningCorrelation(COLUMNS).update(frame)
+    np.testing.assert_allclose(state.correlation().to_numpy(), _expected(frame.dropna()), atol=1e-12)
+    with pytest.raises(ValueError):
+        state.merge(RunningCorrelation(['a', 'b']))
+
+
+@pytest.fixture
+def hourly_files(monkeypatch):
+    files = {}
+    monkeypatch.setattr(correlation, "load_columns", lambda name, columns: files['hourly'])
+    correlation.clear_cache()
+    yield files
+    correlation.clear_cache()
+
+
+def _hourly(rows, seed, start=1):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.integers(0, 30, (rows, len(CORRELATION_COLUMNS))).astype(float),
+                         columns=CORRELATION_COLUMNS)
+    frame.insert(0, 'instant', np.arange(start, start + rows))
+    return frame
+
+
+def test_appended_rows_are_added_to_the_running_state(hourly_files, monkeypatch):
+    hourly_files['hourly'] = _hourly(400, 0)
+    correlation.hourly_state()
+
+    added = []
+    update = RunningCorrelation.update
+    monkeypatch.setattr(RunningCorrelation, "update",
+                        lambda self, frame: added.append(len(frame)) or update(self, frame))
+    grown = pd.concat([hourly_files['hourly'], _hourly(50, 1, start=401)], ignore_index=True)
+    hourly_files['hourly'] = grown
+    state = correlation.hourly_state()
+
+    assert added == [50]
+    np.testing.assert_allclose(state.correlation().to_numpy(), _expected(grown, CORRELATION_COLUMNS), atol=1e-12)
+
+
+def test_a_rewritten_file_is_recomputed_from_scratch(hourly_files):
+    hourly_files['hourly'] = _hourly(400, 0)
+    correlation.hourly_state()
+
+    # Same length and more, but the rows already counted changed
+    rewritten = _hourly(450, 2, start=1001)
+    hourly_files['hourly'] = rewritten
+    np.testing.assert_allclose(correlation.hourly_state().correlation().to_numpy(),
+                               _expected(rewritten, CORRELATION_COLUMNS), atol=1e-12)
+
+    # A shorter file can't be an append either
+    shrunk = rewritten.iloc[:100].copy()
+    hourly_files['hourly'] = shrunk
+    state = correlation.hourly_state()
+    assert state.n == 100
+    np.testing.assert_allclose(state.correlation().to_numpy(), _expected(shrunk, CORRELATION_COLUMNS), atol=1e-12)
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from bikes.encoding import DAYS_OF_WEEK, WEATHER, EncodingError, encode, encode_frame, encode_inputs
+
+SCENARIO = dict(season="Summer", month="July", day=15, hour=8, day_of_week="Tuesday", temperature_feel=25,
+                humidity=50, wind=10, weather=WEATHER[0])
+
+
+def _columns(**changes):
+    return pd.DataFrame([dict(SCENARIO, **changes)])
+
+
+def test_one_scenario_matches_its_column():
+    row = encode_inputs(**SCENARIO)
+    assert row == encode_frame(_columns()).iloc[0].to_dict()
+    assert row['season'] == 3 and row['mnth'] == 7 and row['hr'] == 8 and row['day'] == 15
+    assert row['atemp'] == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("encoder", ["scalar", "column"])
+@pytest.mark.parametrize("changes, message", [
+    (dict(season="Winter", month="July"), "month not in season"),
+    (dict(season="Winter", month="February", day=30), "no such date"),
+    (dict(season="Spring", month="April", day=31), "no such date"),
+    (dict(hour=24), "hour"),
+    (dict(day=2.5), "day"),
+    (dict(weather="Hail"), "weather"),
+])
+def test_invalid_scenarios_are_rejected(encoder, changes, message):
+    with pytest.raises(EncodingError, match=message):
+        if encoder == "scalar":
+            encode_inputs(**dict(SCENARIO, **changes))
+        else:
+            encode_frame(_columns(**changes))
+
+
+def test_months_shared_by_two_seasons_are_accepted():
+    for season in ["Winter", "Autumn"]:
+        assert encode_inputs(**dict(SCENARIO, season=season, month="December"))['mnth'] == 12
+
+
+def test_february_29_is_accepted():
+    assert encode_inputs(**dict(SCENARIO, season="Winter", month="February", day=29))['day'] == 29
+
+
+def test_weekday_flag_keeps_the_simulators_encoding():
+    # Monday and Friday have always been sent as 0, every other day as 1
+    flags = {day: encode_inputs(**dict(SCENARIO, day_of_week=day))['weekday'] for day in DAYS_OF_WEEK}
+    assert flags == {"Monday": 0, "Tuesday": 1, "Wednesday": 1, "Thursday": 1, "Friday": 0, "Saturday": 1,
+                     "Sunday": 1}
+    frame = encode_frame(pd.DataFrame([dict(SCENARIO, day_of_week=day) for day in DAYS_OF_WEEK]))
+    assert frame['weekday'].tolist() == list(flags.values())
+    assert (frame['workingday'] == frame['weekday']).all()
+
+
+def test_errors_are_reported_together():
+    with pytest.raises(EncodingError) as error:
+        encode(**dict(SCENARIO, season="Monsoon", hour=-1))
+    assert "season" in str(error.value) and "hour" in str(error.value)
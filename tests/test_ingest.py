@@ -0,0 +1,117 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bikes.aggregates import AGGREGATES, MANIFEST, compute_aggregate
+from bikes.data import HOURLY_CSV, fingerprint, load_csv
+from bikes.features import clean_hourly
+from bikes.ingest import IngestError, Ingestor, validate_records
+from bikes.schema import CLEANED_DTYPES, HOURLY_DTYPES
+
+
+@pytest.fixture(scope="module")
+def hourly():
+    # January and February 2011
+    full = pd.read_csv(HOURLY_CSV, dtype=HOURLY_DTYPES)
+    return full[full['dteday'] < "2011-03-01"].reset_index(drop=True)
+
+
+def _dataset(tmp_path, rows):
+    hourly_path, cleaned_path = tmp_path / "hourly.csv", tmp_path / "cleaned.csv"
+    rows.to_csv(hourly_path, index=False)
+    cleaned = clean_hourly(rows)
+    cleaned.assign(day=cleaned['day'].map('{:02d}'.format)).to_csv(cleaned_path, index=False)
+    return Ingestor(hourly_path, cleaned_path, tmp_path / "store")
+
+
+def _as_text(rows):
+    # As records arrive from a CSV source: every field a string
+    return rows.astype(str)
+
+
+def test_bad_records_are_rejected_with_a_reason(hourly):
+    good = _as_text(hourly.iloc[:10])
+    bad = good.copy()
+    bad.loc[0, 'hr'] = '24'
+    bad.loc[1, 'cnt'] = str(int(bad.loc[1, 'cnt']) + 1)
+    bad.loc[2, 'dteday'] = '2011-13-01'
+    bad.loc[3, 'weekday'] = '3'
+    bad.loc[4, 'temp'] = ''
+    bad.loc[5, 'casual'] = '2.5'
+    bad.loc[6, 'weathersit'] = 'rain'
+
+    valid, rejected, skipped = validate_records(bad)
+    assert rejected['instant'].tolist() == good['instant'].iloc[:7].tolist()
+    assert rejected['reason'].tolist() == [
+        "hr missing, not a number or out of range",
+        "cnt is not casual + registered",
+        "dteday is not a YYYY-MM-DD date",
+        "yr, mnth or weekday disagrees with dteday",
+        "temp missing, not a number or out of range",
+        "casual missing, not a number or out of range",
+        "weathersit missing, not a number or out of range",
+    ]
+    pd.testing.assert_frame_equal(valid, hourly.iloc[7:10].reset_index(drop=True))
+    assert skipped == 0
+
+
+def test_records_already_present_are_skipped(hourly):
+    rows = _as_text(hourly.iloc[:10])
+    # Replayed from the start, with one record repeated
+    valid, rejected, skipped = validate_records(pd.concat([rows, rows.iloc[[9]]]), after_instant=5)
+    assert valid['instant'].tolist() == list(range(6, 11))
+    assert (len(rejected), skipped) == (0, 6)
+
+
+def test_records_with_other_columns_are_refused(hourly):
+    with pytest.raises(IngestError):
+        validate_records(hourly.drop(columns='cnt'))
+
+
+def test_rejected_records_are_not_written(tmp_path, hourly):
+    ingestor = _dataset(tmp_path, hourly.iloc[:100])
+    before = ingestor.hourly_path.read_bytes(), ingestor.cleaned_path.read_bytes()
+    bad = _as_text(hourly.iloc[100:103]).assign(hr='99')
+    assert ingestor.ingest(bad) == {'ingested': 0, 'rejected': 3, 'skipped': 0, 'last_instant': 100}
+    assert (ingestor.hourly_path.read_bytes(), ingestor.cleaned_path.read_bytes()) == before
+    assert len(ingestor.recent_errors) == 3
+    assert not (tmp_path / "store").exists()
+
+
+def test_incremental_aggregates_equal_a_full_recompute(tmp_path, hourly):
+    ingestor = _dataset(tmp_path, hourly.iloc[:500])
+    rest = _as_text(hourly.iloc[500:])
+    for start in range(0, len(rest), 317):
+        ingestor.ingest(rest.iloc[start:start + 317])
+    # A bad record and a replayed one along the way change nothing
+    summary = ingestor.ingest(pd.concat([rest.iloc[[0]], rest.iloc[[1]].assign(hr='24')]))
+    assert summary == {'ingested': 0, 'rejected': 1, 'skipped': 1, 'last_instant': len(hourly)}
+
+    written = load_csv(ingestor.hourly_path, HOURLY_DTYPES)
+    pd.testing.assert_frame_equal(written, hourly)
+    cleaned = load_csv(ingestor.cleaned_path, CLEANED_DTYPES)
+    pd.testing.assert_frame_equal(cleaned, clean_hourly(hourly))
+
+    # The store is current for the files as written
+    manifest = json.loads((ingestor.store_dir / MANIFEST).read_text())
+    assert manifest['sources'] == {'hourly': fingerprint(ingestor.hourly_path),
+                                   'cleaned': fingerprint(ingestor.cleaned_path)}
+    assert sorted(manifest['aggregates']) == sorted(AGGREGATES)
+    for name in AGGREGATES:
+        stored = pd.read_parquet(ingestor.store_dir / f"{name}.parquet")
+        pd.testing.assert_frame_equal(stored, compute_aggregate(name, written, cleaned), check_exact=False, rtol=1e-9)
+
+
+def test_poll_leaves_a_half_written_line_for_later(tmp_path, hourly):
+    ingestor = _dataset(tmp_path, hourly.iloc[:100])
+    source = tmp_path / "incoming.csv"
+    text = hourly.iloc[100:110].to_csv(index=False)
+    source.write_text(text[:-5])
+    assert sum(summary['ingested'] for summary in ingestor.poll(source, chunk_rows=4)) == 9
+    with open(source, "a") as f:
+        f.write(text[-5:])
+    assert [summary['ingested'] for summary in ingestor.poll(source)] == [1]
+    assert ingestor.last_instant == 110
+    assert np.array_equal(load_csv(ingestor.hourly_path, HOURLY_DTYPES)['instant'], np.arange(1, 111))
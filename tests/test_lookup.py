@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+
+from bikes.lookup import AXES, PredictionTable, grid_axes
+
+
+def _table():
+    axes = grid_axes(temperature_step=50, humidity_step=100, wind_step=67, days=[1, 31], hours=[8])
+    shape = tuple(len(axes[name]) for name in AXES)
+    predictions = np.arange(np.prod(shape), dtype=np.float32).reshape(shape)
+    # No 31st in the first month offered
+    predictions[0, 1] = np.nan
+    return PredictionTable(predictions, axes, "test", "v1"), axes
+
+
+def _scenario(axes, **changes):
+    season, month = axes['season_month'][0]
+    features = {'season': season, 'mnth': month, 'day': 1, 'hr': 8, 'weekday': 1, 'workingday': 1,
+                'weathersit': axes['weathersit'][0], 'atemp': axes['atemp'][-1], 'hum': axes['hum'][0],
+                'windspeed': axes['windspeed'][-1]}
+    features.update(changes)
+    return {name: value.item() if isinstance(value, np.generic) else value for name, value in features.items()}
+
+
+def test_lookup_hits_on_the_grid_and_misses_off_it():
+    table, axes = _table()
+    position = (0, 0, 0, 1, 0, len(axes['atemp']) - 1, 0, len(axes['windspeed']) - 1)
+    assert table.lookup(_scenario(axes)) == float(table.predictions[position])
+
+    assert table.lookup(_scenario(axes, hr=9)) is None
+    assert table.lookup(_scenario(axes, atemp=axes['atemp'][-1] / 2)) is None
+    assert table.lookup(_scenario(axes, day=31)) is None
+    assert table.lookup(_scenario(axes, workingday=0)) is None
+
+    stats = table.stats()
+    assert (stats['hits'], stats['misses']) == (1, 4)
+    assert stats['hit_rate'] == 0.2
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    table, axes = _table()
+    hit, miss = _scenario(axes), _scenario(axes, hr=9)
+
+    def look_up():
+        for _ in range(2000):
+            table.lookup(hit)
+            table.lookup(miss)
+
+    threads = [threading.Thread(target=look_up) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (table.hits, table.misses) == (16000, 16000)
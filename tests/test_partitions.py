@@ -0,0 +1,34 @@
+import pandas as pd
+
+from bikes.data import HOURLY_CSV
+from bikes.partitions import ALL_STATIONS, Slice, add, load_slice, selected
+from bikes.schema import HOURLY_DTYPES
+
+
+def _month(frame, month):
+    return frame[frame['dteday'].astype(str).str.startswith(month)].reset_index(drop=True)
+
+
+def test_all_stations_reads_the_city_wide_series_only(tmp_path):
+    hourly = _month(pd.read_csv(HOURLY_CSV, dtype=HOURLY_DTYPES), "2011-01")
+    add(hourly, "Testville", ALL_STATIONS, root=tmp_path)
+    # Two stations that split the city's rentals between them
+    half = hourly.assign(cnt=hourly['cnt'] // 2)
+    add(half, "Testville", "north", root=tmp_path)
+    add(half.assign(cnt=hourly['cnt'] - half['cnt']), "Testville", "south", root=tmp_path)
+
+    whole = load_slice(Slice("Testville"), root=tmp_path)
+    city_wide = load_slice(Slice("Testville", (ALL_STATIONS,)), root=tmp_path)
+    assert len(whole) == len(city_wide) == len(hourly)
+    assert whole['cnt'].sum() == city_wide['cnt'].sum() == hourly['cnt'].sum()
+    assert [entry['station'] for entry in selected(Slice("Testville"), root=tmp_path)] == [ALL_STATIONS]
+
+    stations = load_slice(Slice("Testville", ("north", "south")), root=tmp_path)
+    assert stations['cnt'].sum() == hourly['cnt'].sum()
+
+
+def test_all_stations_without_a_city_wide_series(tmp_path):
+    hourly = _month(pd.read_csv(HOURLY_CSV, dtype=HOURLY_DTYPES), "2011-02")
+    add(hourly, "Testville", "north", root=tmp_path)
+    add(hourly, "Testville", "south", root=tmp_path)
+    assert len(load_slice(Slice("Testville"), root=tmp_path)) == 2 * len(hourly)
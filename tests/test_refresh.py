@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+import bikes.models
+import bikes.refresh
+from bikes.data import HOURLY_CSV
+from bikes.refresh import refresh_model, refresh_rows
+from bikes.schema import HOURLY_DTYPES
+from bikes.train import PUBLISHED, build_features, publish, save_artifact
+
+
+def test_refresh_rows_with_float_ratio():
+    instants = np.arange(1, 1001)
+    fit_rows, held_rows = refresh_rows(instants, 900, old_ratio=1.5, holdout=0.2, seed=0)
+    recent_fitted = int((instants[fit_rows] > 900).sum())
+    assert recent_fitted + len(held_rows) == 100
+    assert int((instants[fit_rows] <= 900).sum()) == round(1.5 * recent_fitted)
+    assert len(np.unique(fit_rows)) == len(fit_rows)
+
+
+def test_refresh_rows_holds_out_the_newest_recent_rows():
+    instants = np.arange(1, 1001)
+    fit_rows, held_rows = refresh_rows(instants, 900, holdout=0.2, seed=0)
+    assert instants[held_rows].tolist() == list(range(981, 1001))
+    assert instants[fit_rows].max() == 980
+
+
+def test_every_recent_row_is_fitted_across_refreshes(tmp_path, monkeypatch):
+    name = "Model-test"
+    model_file = tmp_path / f"{name}.joblib"
+    monkeypatch.setattr(bikes.refresh, "model_path", lambda model_name: model_file)
+    monkeypatch.setattr(bikes.models, "model_path", lambda model_name: model_file)
+    fitted = []
+    refresh = bikes.refresh.refresh
+    monkeypatch.setattr(bikes.refresh, "refresh",
+                        lambda model, X, y, *args: fitted.append(set(X.index + 1)) or refresh(model, X, y, *args))
+
+    hourly = pd.read_csv(HOURLY_CSV, dtype=HOURLY_DTYPES, nrows=1000)
+    hourly_path = tmp_path / "hourly.csv"
+    artifacts = tmp_path / "artifacts"
+    # A full training on the first 600 hours
+    hourly.iloc[:600].to_csv(hourly_path, index=False)
+    X, y = build_features(hourly.iloc[:600])
+    forest = RandomForestRegressor(n_estimators=5, max_depth=4, random_state=0).fit(X, y)
+    result = {'model': forest, 'cv_results': None, 'real_pred': None,
+              'metadata': {'last_instant': 600, 'inputs_hash': 'full'}}
+    publish(name, save_artifact(name, result, artifacts), artifacts)
+
+    learned = set(range(1, 601))
+    for rows in (700, 800, 850, 1000, 1000):
+        hourly.iloc[:rows].to_csv(hourly_path, index=False)
+        result = refresh_model(name, hourly_path=hourly_path, artifacts_dir=artifacts)
+        publish(name, save_artifact(name, result, artifacts), artifacts)
+        metadata = result['metadata']
+        recent = fitted[-1] - learned
+        # Picks up right after the last hour fitted, and fits everything up to a new one
+        assert min(recent) == metadata['since_instant'] + 1
+        assert recent == set(range(metadata['since_instant'] + 1, metadata['fitted_through'] + 1))
+        assert metadata['held_out_rows'] == rows - metadata['fitted_through']
+        learned |= recent
+    with open(artifacts / name / PUBLISHED) as f:
+        assert json.load(f)['version'].endswith(metadata['inputs_hash'])
+    # Only the newest rows of the last refresh are still waiting to be fitted
+    assert learned == set(range(1, metadata['fitted_through'] + 1))
+    assert metadata['fitted_through'] > 900
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from bikes import smoothing
+
+
+def test_lowess_not_fitted_above_max_points(monkeypatch):
+    def fail(x, y):
+        raise AssertionError("LOWESS fitted on a large scatter")
+
+    monkeypatch.setitem(smoothing.SMOOTHERS, 'lowess', fail)
+    n = smoothing.LOWESS_MAX_POINTS + 1
+    rng = np.random.default_rng(0)
+    curve = smoothing.trendlines(rng.random(n), rng.random(n))
+    assert set(curve['method']) == {'binned'}
+
+
+def test_lowess_fitted_for_small_scatters():
+    x = np.linspace(0, 1, 100)
+    curve = smoothing.trendlines(x, 2 * x)
+    assert set(curve['method']) == {'lowess'}
+    assert len(curve) == 100
+
+
+def test_stored_trendline_falls_back_to_the_stored_method(monkeypatch):
+    x = np.linspace(0, 1, 100)
+    stored = smoothing.trendlines(x, 2 * x)
+    # Store built with LOWESS, page running with a lower limit
+    monkeypatch.setattr(smoothing, "LOWESS_MAX_POINTS", 10)
+    curve, method = smoothing.stored_trendline(stored, len(x))
+    assert method == 'lowess'
+    assert len(curve) == 100
+
+
+def test_stored_trendline_prefers_the_method_for_the_scatter():
+    x = np.linspace(0, 1, 100)
+    both = pd.concat([smoothing.binned(x, x).assign(method='binned'), smoothing.lowess(x, x).assign(method='lowess')])
+    curve, method = smoothing.stored_trendline(both, len(x))
+    assert method == 'lowess' and set(curve['method']) == {'lowess'}
+    curve, method = smoothing.stored_trendline(both, smoothing.LOWESS_MAX_POINTS + 1)
+    assert method == 'binned' and set(curve['method']) == {'binned'}
+    assert smoothing.stored_trendline(both.iloc[:0], len(x))[1] is None
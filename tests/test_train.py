@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bikes.data import HOURLY_CSV
+from bikes.schema import HOURLY_DTYPES
+from bikes.train import build_features, grid_search, halving_search, train
+
+# Three rungs of 3, 6 and 12 trees
+GRID = {'max_depth': [1, 3, 6], 'n_estimators': [12], 'min_samples_leaf': [1, 20]}
+FACTOR = 2
+MIN_TREES = 3
+
+
+@pytest.fixture(scope="module")
+def hourly():
+    return pd.read_csv(HOURLY_CSV, dtype=HOURLY_DTYPES, nrows=1500)
+
+
+def test_halving_finds_the_grid_search_best(tmp_path, hourly):
+    hourly_path = tmp_path / "hourly.csv"
+    hourly.to_csv(hourly_path, index=False)
+    common = dict(grid=GRID, cv=3, n_jobs=1, hourly_path=hourly_path, factor=FACTOR, min_trees=MIN_TREES,
+                  cache_dir=tmp_path / "cache")
+    by_grid = train(search='grid', **common)['metadata']
+    by_halving = train(search='halving', **common)['metadata']
+    assert by_halving['best_params'] == by_grid['best_params']
+    # Same folds and seed: a forest grown rung by rung is the full-size forest
+    assert by_halving['cv_r2'] == pytest.approx(by_grid['cv_r2'], abs=1e-12)
+
+
+def test_halving_reuses_cached_fold_scores(tmp_path, hourly):
+    X, y = build_features(hourly)
+    cache_dir = tmp_path / "cache"
+    first, _, fits = halving_search(X, y, GRID, cv=3, n_jobs=1, factor=FACTOR, min_trees=MIN_TREES,
+                                    cache_dir=cache_dir)
+    assert fits > 0 and not first['cached'].any()
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+    again, _, refits = halving_search(X, y, GRID, cv=3, n_jobs=1, factor=FACTOR, min_trees=MIN_TREES,
+                                      cache_dir=cache_dir)
+    assert refits == 0 and again['cached'].all()
+    columns = ['max_depth', 'n_estimators', 'min_samples_leaf', 'mean_r2', 'rank']
+    pd.testing.assert_frame_equal(again[columns], first[columns])
+
+    # Other data is cached separately
+    _, _, fits = halving_search(X.iloc[:-1], y.iloc[:-1], GRID, cv=3, n_jobs=1, factor=FACTOR,
+                                min_trees=MIN_TREES, cache_dir=cache_dir)
+    assert fits > 0
+
+
+def test_grid_search_scores_every_setting(hourly):
+    X, y = build_features(hourly)
+    cv_results, timeline, fits = grid_search(X, y, GRID, cv=3, n_jobs=1)
+    assert len(cv_results) == 6 and fits == 18
+    assert timeline[0][1] == cv_results['mean_r2'].max()
+    assert np.all(cv_results['rank'] >= 1)